@@ -2,13 +2,20 @@
 import os
 import sys
 import json
+import time
+import hashlib
+import shutil
 import subprocess
 import boto3
+from botocore.exceptions import ClientError
+from decimal import Decimal
 from pathlib import Path
+from shared.transfer import make_client, download_prefix, upload_dir, copy_prefix, delete_prefix
+from shared.instrumentation import StageMetrics
 
-s3 = boto3.client('s3', region_name=os.environ.get('AWS_REGION', 'us-west-2'))
-sfn = boto3.client('stepfunctions', region_name=os.environ.get('AWS_REGION', 'us-west-2'))
-dynamodb = boto3.resource('dynamodb', region_name=os.environ.get('AWS_REGION', 'us-west-2'))
+s3 = make_client()
+sfn = boto3.client('stepfunctions')
+dynamodb = boto3.resource('dynamodb')
 
 BUCKET = os.environ['BUCKET']
 SCENE_ID = os.environ['SCENE_ID']
@@ -16,13 +23,34 @@ INPUT_TYPE = os.environ.get('INPUT_TYPE', 'video')
 SCENES_TABLE = os.environ.get('SCENES_TABLE')
 TASK_TOKEN = os.environ.get('SFN_TASK_TOKEN')
 
+# Matching strategy: exhaustive is O(N^2) pairs, so larger image sets use
+# vocabulary-tree retrieval; video uses sequential matching + loop detection
+EXHAUSTIVE_MAX_IMAGES = int(os.environ.get('EXHAUSTIVE_MAX_IMAGES', '150'))
+SEQUENTIAL_OVERLAP = int(os.environ.get('SEQUENTIAL_OVERLAP', '10'))
+# Longest image edge used for SIFT; larger frames are resized before extraction
+SIFT_MAX_DIM = int(os.environ.get('SIFT_MAX_DIM', '3200'))
+LOOP_DETECTION_MIN_IMAGES = int(os.environ.get('LOOP_DETECTION_MIN_IMAGES', '50'))
+VOCAB_TREE_PATH = os.environ.get('VOCAB_TREE_PATH', '/opt/colmap/vocab_tree.bin')
+
+# SfM back-end: 'incremental' (colmap mapper) or 'global' (GLOMAP on the same database.db)
+SFM_MAPPER = os.environ.get('SFM_MAPPER', 'incremental')
+GLOMAP_BIN = os.environ.get('GLOMAP_BIN', 'glomap')
+
+# Content-addressed cache of sparse models: colmap-cache/{key}/sparse/0/ holds the
+# model reconstructed from one frame set and is never rewritten. manifest.json is
+# written last, so an entry without it is incomplete and is ignored.
+CACHE_PREFIX = 'colmap-cache/'
+CACHE_VERSION = 2
+CAMERA_MODEL = 'SIMPLE_PINHOLE'
+SPARSE_FILES = ('cameras.bin', 'images.bin', 'points3D.bin')
+
 def update_processing_stage(stage: str):
     if SCENES_TABLE:
         table = dynamodb.Table(SCENES_TABLE)
         table.update_item(
             Key={'id': SCENE_ID},
-            UpdateExpression='SET processingStage = :stage',
-            ExpressionAttributeValues={':stage': stage}
+            UpdateExpression='SET processingStage = :stage ADD version :one',
+            ExpressionAttributeValues={':stage': stage, ':one': 1}
         )
 
 def send_success(output: dict):
@@ -35,25 +63,160 @@ def send_failure(error: str, stage: str = 'running_colmap'):
         table = dynamodb.Table(SCENES_TABLE)
         table.update_item(
             Key={'id': SCENE_ID},
-            UpdateExpression='SET #e = :error',
+            UpdateExpression='SET #e = :error ADD version :one',
             ExpressionAttributeNames={'#e': 'error'},
-            ExpressionAttributeValues={':error': f'COLMAP failed at {stage}: {error}'}
+            ExpressionAttributeValues={':error': f'COLMAP failed at {stage}: {error}', ':one': 1}
         )
     if TASK_TOKEN:
         sfn.send_task_failure(taskToken=TASK_TOKEN, error='COLMAPError', cause=error)
 
-def run_colmap(args, stage_name):
+def run_command(cmd, stage_name):
+    """Run a reconstruction command and return its wall time in seconds."""
+    start = time.time()
     try:
-        result = subprocess.run(['colmap'] + args, check=True, capture_output=True, text=True)
+        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
         if result.stdout:
             # Print last 20 lines of stdout for debugging
             lines = result.stdout.strip().split('\n')
             for line in lines[-20:]:
                 print(f"  {line}")
     except subprocess.CalledProcessError as e:
-        print(f"COLMAP {stage_name} stderr: {e.stderr}", file=sys.stderr)
+        print(f"{cmd[0]} {stage_name} stderr: {e.stderr}", file=sys.stderr)
         send_failure(e.stderr or str(e), stage_name)
         sys.exit(1)
+    elapsed = time.time() - start
+    print(f"{cmd[0]} {stage_name} took {elapsed:.1f}s")
+    return elapsed
+
+def run_colmap(args, stage_name):
+    return run_command(['colmap'] + args, stage_name)
+
+def run_mapper(database_path: Path, image_dir: Path, output_dir: Path):
+    """Run the configured SfM back-end into output_dir/<n>/.
+    
+    Returns (mapper actually used, wall time).
+    """
+    mapper = SFM_MAPPER
+    if mapper == 'global' and not shutil.which(GLOMAP_BIN):
+        print(f"WARNING: {GLOMAP_BIN} not found, falling back to incremental mapper")
+        mapper = 'incremental'
+    
+    if mapper == 'global':
+        print("Running global mapping (GLOMAP)...")
+        elapsed = run_command([
+            GLOMAP_BIN, 'mapper',
+            '--database_path', str(database_path),
+            '--image_path', str(image_dir),
+            '--output_path', str(output_dir)
+        ], 'structure from motion')
+    else:
+        print("Running incremental mapping...")
+        elapsed = run_colmap([
+            'mapper',
+            '--database_path', str(database_path),
+            '--image_path', str(image_dir),
+            '--output_path', str(output_dir)
+        ], 'structure from motion')
+    return mapper, elapsed
+
+def choose_matcher(num_images: int, database_path: Path):
+    """Pick the feature matcher for this input type and image count.
+    
+    Returns (strategy name, colmap args).
+    """
+    has_vocab_tree = os.path.exists(VOCAB_TREE_PATH)
+    if INPUT_TYPE == 'video':
+        args = [
+            'sequential_matcher',
+            '--database_path', str(database_path),
+            '--FeatureMatching.use_gpu', '1',
+            '--SequentialMatching.overlap', str(SEQUENTIAL_OVERLAP)
+        ]
+        if has_vocab_tree and num_images >= LOOP_DETECTION_MIN_IMAGES:
+            args += [
+                '--SequentialMatching.loop_detection', '1',
+                '--SequentialMatching.vocab_tree_path', VOCAB_TREE_PATH
+            ]
+            return 'sequential+loop', args
+        return 'sequential', args
+    
+    if num_images > EXHAUSTIVE_MAX_IMAGES:
+        if has_vocab_tree:
+            return 'vocab_tree', [
+                'vocab_tree_matcher',
+                '--database_path', str(database_path),
+                '--FeatureMatching.use_gpu', '1',
+                '--VocabTreeMatching.vocab_tree_path', VOCAB_TREE_PATH
+            ]
+        print(f"WARNING: {VOCAB_TREE_PATH} missing, falling back to exhaustive matching for {num_images} images")
+    return 'exhaustive', [
+        'exhaustive_matcher',
+        '--database_path', str(database_path),
+        '--FeatureMatching.use_gpu', '1'
+    ]
+
+def colmap_cache_key() -> str:
+    """Hash the frame set (names, ETags, sizes) and every option that shapes the model."""
+    frames = []
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=BUCKET, Prefix=f'frames/{SCENE_ID}/'):
+        for obj in page.get('Contents', []):
+            name = os.path.basename(obj['Key'])
+            if name:
+                frames.append([name, obj['ETag'], obj['Size']])
+    options = {
+        'version': CACHE_VERSION,
+        'inputType': INPUT_TYPE,
+        'cameraModel': CAMERA_MODEL,
+        'siftMaxDim': SIFT_MAX_DIM,
+        'exhaustiveMaxImages': EXHAUSTIVE_MAX_IMAGES,
+        'sequentialOverlap': SEQUENTIAL_OVERLAP,
+        'loopDetectionMinImages': LOOP_DETECTION_MIN_IMAGES,
+        'sfmMapper': SFM_MAPPER
+    }
+    payload = json.dumps({'frames': sorted(frames), 'options': options}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def cache_prefix(cache_key: str) -> str:
+    return f'{CACHE_PREFIX}{cache_key}/'
+
+def lookup_cache(cache_key: str) -> bool:
+    """True if colmap-cache/{cache_key}/ holds a complete sparse model."""
+    prefix = cache_prefix(cache_key)
+    try:
+        s3.head_object(Bucket=BUCKET, Key=f'{prefix}manifest.json')
+        for name in SPARSE_FILES:
+            s3.head_object(Bucket=BUCKET, Key=f'{prefix}sparse/0/{name}')
+    except ClientError:
+        return False
+    return True
+
+def store_cache(cache_key: str, sparse_dir: Path):
+    """Publish sparse_dir as the cache entry for cache_key unless one already exists."""
+    if lookup_cache(cache_key):
+        return None
+    prefix = cache_prefix(cache_key)
+    stats = upload_dir(sparse_dir, BUCKET, f'{prefix}sparse/0/', s3=s3)
+    s3.put_object(
+        Bucket=BUCKET,
+        Key=f'{prefix}manifest.json',
+        Body=json.dumps({'cacheKey': cache_key, 'sceneId': SCENE_ID, 'createdAt': int(time.time())}),
+        ContentType='application/json'
+    )
+    return stats
+
+def record_colmap_stats(stats: dict, cache_key: str):
+    """Store the cache key and matcher/mapper choice on the scene item (timings go to metrics.colmap)."""
+    if SCENES_TABLE:
+        table = dynamodb.Table(SCENES_TABLE)
+        table.update_item(
+            Key={'id': SCENE_ID},
+            UpdateExpression='SET colmapStats = :stats, colmapCacheKey = :key',
+            ExpressionAttributeValues={
+                ':stats': json.loads(json.dumps(stats), parse_float=Decimal),
+                ':key': cache_key
+            }
+        )
 
 def main():
     update_processing_stage('running_colmap')
@@ -66,89 +229,102 @@ def main():
     image_dir.mkdir(parents=True, exist_ok=True)
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    try:
-        print(f"Downloading frames for scene {SCENE_ID}...")
-        paginator = s3.get_paginator('list_objects_v2')
-        for page in paginator.paginate(Bucket=BUCKET, Prefix=f'frames/{SCENE_ID}/'):
-            for obj in page.get('Contents', []):
-                key = obj['Key']
-                filename = os.path.basename(key)
-                if filename:
-                    s3.download_file(BUCKET, key, str(image_dir / filename))
-        
-        num_images = len([f for f in image_dir.iterdir() if f.suffix.lower() in ('.jpg', '.jpeg', '.png')])
-        print(f"Downloaded {num_images} frames")
-        
-        if num_images < 3:
-            raise RuntimeError(f"Not enough images: {num_images}")
-        
-        print("Running feature extraction (GPU)...")
-        extract_args = [
-            'feature_extractor',
-            '--database_path', str(database_path),
-            '--image_path', str(image_dir),
-            '--ImageReader.camera_model', 'SIMPLE_PINHOLE',
-            '--FeatureExtraction.use_gpu', '1'
-        ]
-        if INPUT_TYPE == 'video':
-            extract_args += ['--ImageReader.single_camera', '1']
-        run_colmap(extract_args, 'feature extraction')
-        
-        print(f"Running feature matching (GPU, mode={'sequential' if INPUT_TYPE == 'video' else 'exhaustive'})...")
-        if INPUT_TYPE == 'video':
-            run_colmap([
-                'sequential_matcher',
-                '--database_path', str(database_path),
-                '--FeatureMatching.use_gpu', '1',
-                '--SequentialMatching.overlap', '10'
-            ], 'feature matching')
-        else:
-            run_colmap([
-                'exhaustive_matcher',
+    with StageMetrics(SCENE_ID, 'colmap', SCENES_TABLE, gpu=True) as metrics:
+        try:
+            cache_key = colmap_cache_key()
+            scene_prefix = f'colmap/{SCENE_ID}/'
+            if lookup_cache(cache_key):
+                print(f"COLMAP cache hit {cache_key[:12]}")
+                metrics.record('cacheHit', 1)
+                # Output from an earlier run of this scene must not mix with the cached model
+                delete_prefix(BUCKET, scene_prefix, s3=s3)
+                stats = copy_prefix(BUCKET, f'{cache_prefix(cache_key)}sparse/', f'{scene_prefix}sparse/', s3=s3)
+                copy_prefix(BUCKET, f'frames/{SCENE_ID}/', f'{scene_prefix}images/', s3=s3, stats=stats)
+                print(f"Copied cached COLMAP output: {stats}")
+                metrics.add_phase('copy', stats.seconds)
+                record_colmap_stats({'cacheHit': True, 'cachedFrom': cache_prefix(cache_key)}, cache_key)
+                send_success({'sceneId': SCENE_ID, 'status': 'colmap_complete', 'cacheHit': True})
+                return
+
+            print(f"Downloading frames for scene {SCENE_ID}...")
+            stats = download_prefix(
+                BUCKET, f'frames/{SCENE_ID}/', image_dir, s3=s3,
+                key_to_path=lambda rel: image_dir / os.path.basename(rel)
+            )
+            print(f"Downloaded frames: {stats}")
+            metrics.add_phase('download', stats.seconds)
+            metrics.add_transfer('download', stats)
+            metrics.record('cacheHit', 0)
+
+            num_images = len([f for f in image_dir.iterdir() if f.suffix.lower() in ('.jpg', '.jpeg', '.png')])
+            print(f"Downloaded {num_images} frames")
+            metrics.record('numImages', num_images, 'Count')
+
+            if num_images < 3:
+                raise RuntimeError(f"Not enough images: {num_images}")
+
+            print("Running feature extraction (GPU)...")
+            extract_args = [
+                'feature_extractor',
                 '--database_path', str(database_path),
-                '--FeatureMatching.use_gpu', '1'
-            ], 'feature matching')
-        
-        print("Running incremental mapping...")
-        run_colmap([
-            'mapper',
-            '--database_path', str(database_path),
-            '--image_path', str(image_dir),
-            '--output_path', str(output_dir)
-        ], 'structure from motion')
-        
-        # Verify reconstruction was produced
-        if not any(output_dir.iterdir()):
-            raise RuntimeError("No valid reconstruction produced")
-        
-        # Pick the best reconstruction (largest points3D.bin) and move to sparse/0/
-        recon_dirs = sorted(output_dir.iterdir(), key=lambda d: (d / 'points3D.bin').stat().st_size if (d / 'points3D.bin').exists() else 0, reverse=True)
-        best = recon_dirs[0]
-        if best.name != '0':
-            import shutil
-            shutil.rmtree(output_dir / '0')
-            best.rename(output_dir / '0')
-            print(f"Selected reconstruction {best.name} as best (moved to sparse/0/)")
-        # Clean up other reconstructions
-        for d in output_dir.iterdir():
-            if d.name != '0' and d.is_dir():
-                import shutil
-                shutil.rmtree(d)
-        
-        print("Reconstruction complete")
-        
-        print("Uploading COLMAP output...")
-        for file_path in work_dir.rglob('*'):
-            if file_path.is_file():
-                relative_path = file_path.relative_to(work_dir)
-                s3.upload_file(str(file_path), BUCKET, f'colmap/{SCENE_ID}/{relative_path}')
-        
-        send_success({'sceneId': SCENE_ID, 'status': 'colmap_complete'})
-        
-    except Exception as e:
-        print(f"COLMAP failed: {e}", file=sys.stderr)
-        send_failure(str(e), 'initialization')
-        sys.exit(1)
+                '--image_path', str(image_dir),
+                '--ImageReader.camera_model', CAMERA_MODEL,
+                '--FeatureExtraction.use_gpu', '1',
+                '--FeatureExtraction.max_image_size', str(SIFT_MAX_DIM)
+            ]
+            if INPUT_TYPE == 'video':
+                extract_args += ['--ImageReader.single_camera', '1']
+            metrics.add_phase('featureExtraction', run_colmap(extract_args, 'feature extraction'))
+
+            matcher, match_args = choose_matcher(num_images, database_path)
+            print(f"Running feature matching (GPU, mode={matcher})...")
+            metrics.add_phase('featureMatching', run_colmap(match_args, 'feature matching'))
+
+            mapper, mapping_seconds = run_mapper(database_path, image_dir, output_dir)
+            metrics.add_phase('mapping', mapping_seconds)
+
+            # Verify reconstruction was produced
+            if not any(output_dir.iterdir()):
+                raise RuntimeError("No valid reconstruction produced")
+
+            # Pick the best reconstruction (largest points3D.bin) and move to sparse/0/
+            recon_dirs = sorted(output_dir.iterdir(), key=lambda d: (d / 'points3D.bin').stat().st_size if (d / 'points3D.bin').exists() else 0, reverse=True)
+            best = recon_dirs[0]
+            if best.name != '0':
+                shutil.rmtree(output_dir / '0')
+                best.rename(output_dir / '0')
+                print(f"Selected reconstruction {best.name} as best (moved to sparse/0/)")
+            # Clean up other reconstructions
+            for d in output_dir.iterdir():
+                if d.name != '0' and d.is_dir():
+                    shutil.rmtree(d)
+
+            print("Reconstruction complete")
+
+            print("Uploading COLMAP output...")
+            stale = delete_prefix(BUCKET, scene_prefix, s3=s3)
+            if stale:
+                print(f"Deleted {stale} objects from a previous run")
+            stats = upload_dir(work_dir, BUCKET, scene_prefix, s3=s3)
+            print(f"Uploaded COLMAP output: {stats}")
+            metrics.add_phase('upload', stats.seconds)
+            metrics.add_transfer('upload', stats)
+
+            cache_stats = store_cache(cache_key, output_dir / '0')
+            if cache_stats:
+                metrics.add_transfer('upload', cache_stats)
+            record_colmap_stats({
+                'cacheHit': False,
+                'matcher': matcher,
+                'mapper': mapper,
+                'numImages': num_images
+            }, cache_key)
+            send_success({'sceneId': SCENE_ID, 'status': 'colmap_complete'})
+
+        except Exception as e:
+            print(f"COLMAP failed: {e}", file=sys.stderr)
+            send_failure(str(e), 'initialization')
+            sys.exit(1)
 
 if __name__ == '__main__':
     main()
@@ -2,19 +2,52 @@
 import os
 import sys
 import json
+import re
+import time
+import struct
 import subprocess
+import threading
+import multiprocessing
+from collections import deque
+from decimal import Decimal
+from concurrent.futures import ProcessPoolExecutor
 import boto3
 from pathlib import Path
+from shared.transfer import make_client, download_prefix, list_keys
+from shared.instrumentation import StageMetrics
 
-s3 = boto3.client('s3', region_name=os.environ.get('AWS_REGION', 'us-west-2'))
-sfn = boto3.client('stepfunctions', region_name=os.environ.get('AWS_REGION', 'us-west-2'))
-dynamodb = boto3.resource('dynamodb', region_name=os.environ.get('AWS_REGION', 'us-west-2'))
+s3 = make_client()
+sfn = boto3.client('stepfunctions')
+dynamodb = boto3.resource('dynamodb')
 
 BUCKET = os.environ['BUCKET']
 SCENE_ID = os.environ['SCENE_ID']
 ITERATIONS = int(os.environ.get('ITERATIONS', '30000'))
+DENSIFY_UNTIL_ITER = int(os.environ.get('DENSIFY_UNTIL_ITER', '15000'))
+DENSIFICATION_INTERVAL = int(os.environ.get('DENSIFICATION_INTERVAL', '100'))
+# 0 keeps splatfacto's default (uncapped) densification; >0 switches to MCMC with this budget
+MAX_GAUSSIANS = int(os.environ.get('MAX_GAUSSIANS', '0'))
+# Longest image edge fed to training; larger captures are reduced by a power of 2
+TARGET_MAX_DIM = int(os.environ.get('TARGET_MAX_DIM', '1600'))
 SCENES_TABLE = os.environ.get('SCENES_TABLE')
 TASK_TOKEN = os.environ.get('SFN_TASK_TOKEN')
+# 'latest' continues from the checkpoint stored by a previous run
+RESUME_FROM = os.environ.get('RESUME_FROM', '')
+CHECKPOINT_PREFIX = f'outputs/{SCENE_ID}/checkpoints/'
+CHECKPOINT_RE = re.compile(r'step-(\d+)\.ckpt$')
+
+# Live progress: ns-train logs a row every STEPS_PER_LOG steps and the scene item
+# is updated at most every PROGRESS_SECONDS
+STEPS_PER_LOG = int(os.environ.get('STEPS_PER_LOG', '100'))
+PROGRESS_SECONDS = int(os.environ.get('PROGRESS_SECONDS', '30'))
+RATE_WINDOW_SECONDS = 120
+# Kill training when no step is logged for this long, or (if set) when the rate
+# over RATE_WINDOW_SECONDS drops below MIN_ITERS_PER_SECOND, e.g. on a degraded Spot host
+STALL_SECONDS = int(os.environ.get('STALL_SECONDS', '600'))
+MIN_ITERS_PER_SECOND = float(os.environ.get('MIN_ITERS_PER_SECOND', '0'))
+# LocalWriter rows start with "<step> (<percent>%)"; rich may wrap them in ANSI codes
+STEP_RE = re.compile(r'^\s*(\d+) \(\d+(?:\.\d+)?%\)')
+ANSI_RE = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]')
 
 
 def update_processing_stage(stage: str):
@@ -22,8 +55,8 @@ def update_processing_stage(stage: str):
         table = dynamodb.Table(SCENES_TABLE)
         table.update_item(
             Key={'id': SCENE_ID},
-            UpdateExpression='SET processingStage = :stage',
-            ExpressionAttributeValues={':stage': stage}
+            UpdateExpression='SET processingStage = :stage ADD version :one',
+            ExpressionAttributeValues={':stage': stage, ':one': 1}
         )
 
 
@@ -38,106 +71,353 @@ def send_failure(error: str, stage: str = 'training'):
         table = dynamodb.Table(SCENES_TABLE)
         table.update_item(
             Key={'id': SCENE_ID},
-            UpdateExpression='SET #e = :error',
+            UpdateExpression='SET #e = :error ADD version :one',
             ExpressionAttributeNames={'#e': 'error'},
-            ExpressionAttributeValues={':error': f'gsplat failed at {stage}: {error}'}
+            ExpressionAttributeValues={':error': f'gsplat failed at {stage}: {error}', ':one': 1}
         )
     if TASK_TOKEN:
         sfn.send_task_failure(taskToken=TASK_TOKEN, error='TrainingError', cause=error)
 
 
-def download_colmap_output(data_dir: Path):
-    """Download COLMAP output from S3 and restructure for NerfStudio colmap dataparser.
+# COLMAP camera model id -> (param count, leading focal/principal-point params).
+# Only those leading params are in pixels; the remaining distortion terms are unitless.
+CAMERA_MODEL_PARAMS = {
+    0: (3, 3),    # SIMPLE_PINHOLE: f, cx, cy
+    1: (4, 4),    # PINHOLE: fx, fy, cx, cy
+    2: (4, 3),    # SIMPLE_RADIAL: f, cx, cy, k
+    3: (5, 3),    # RADIAL: f, cx, cy, k1, k2
+    4: (8, 4),    # OPENCV
+    5: (8, 4),    # OPENCV_FISHEYE
+    6: (12, 4),   # FULL_OPENCV
+    7: (5, 4),    # FOV
+    8: (4, 3),    # SIMPLE_RADIAL_FISHEYE
+    9: (5, 3),    # RADIAL_FISHEYE
+    10: (12, 4),  # THIN_PRISM_FISHEYE
+    11: (16, 4),  # RAD_TAN_THIN_PRISM_FISHEYE
+}
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png')
+
+
+def read_cameras_bin(path: Path) -> list:
+    """Parse cameras.bin into [camera_id, model_id, width, height, params] rows."""
+    data = path.read_bytes()
+    num_cameras = struct.unpack('<Q', data[:8])[0]
+    offset = 8
+    cameras = []
+    for _ in range(num_cameras):
+        cam_id, model_id = struct.unpack('<II', data[offset:offset + 8])
+        w, h = struct.unpack('<QQ', data[offset + 8:offset + 24])
+        if model_id not in CAMERA_MODEL_PARAMS:
+            raise ValueError(f"Unsupported COLMAP camera model id {model_id}")
+        n_params = CAMERA_MODEL_PARAMS[model_id][0]
+        params = list(struct.unpack(f'<{n_params}d', data[offset + 24:offset + 24 + n_params * 8]))
+        cameras.append([cam_id, model_id, w, h, params])
+        offset += 24 + n_params * 8
+    return cameras
+
+
+def write_cameras_bin(path: Path, cameras: list):
+    out = bytearray(struct.pack('<Q', len(cameras)))
+    for cam_id, model_id, w, h, params in cameras:
+        out += struct.pack('<IIQQ', cam_id, model_id, w, h)
+        out += struct.pack(f'<{len(params)}d', *params)
+    path.write_bytes(bytes(out))
+
+
+def read_image_cameras(path: Path) -> dict:
+    """Map image name -> camera_id from images.bin, skipping the 2D point tracks."""
+    data = path.read_bytes()
+    num_images = struct.unpack('<Q', data[:8])[0]
+    offset = 8
+    image_cameras = {}
+    for _ in range(num_images):
+        # image_id, qvec (4d), tvec (3d), camera_id
+        camera_id = struct.unpack('<I', data[offset + 60:offset + 64])[0]
+        name_end = data.index(b'\0', offset + 64)
+        name = data[offset + 64:name_end].decode()
+        num_points = struct.unpack('<Q', data[name_end + 1:name_end + 9])[0]
+        offset = name_end + 9 + num_points * 24
+        image_cameras[name] = camera_id
+    return image_cameras
+
+
+def choose_downscale_factor(width: int, height: int, target: int = TARGET_MAX_DIM) -> int:
+    """Smallest power of 2 that brings the longest edge within target."""
+    factor = 1
+    while max(width, height) / factor > target:
+        factor *= 2
+    return factor
+
+
+def scale_camera(camera: list, factor: int) -> list:
+    """Shrink a camera by factor, scaling only its pixel-unit params."""
+    cam_id, model_id, w, h, params = camera
+    new_w, new_h = max(1, w // factor), max(1, h // factor)
+    sx, sy = new_w / w, new_h / h
+    n_pixel = CAMERA_MODEL_PARAMS[model_id][1]
+    scaled = list(params)
+    if n_pixel == 3:    # f, cx, cy
+        scaled[0] *= (sx + sy) / 2
+        scaled[1] *= sx
+        scaled[2] *= sy
+    else:               # fx, fy, cx, cy
+        scaled[0] *= sx
+        scaled[1] *= sy
+        scaled[2] *= sx
+        scaled[3] *= sy
+    return [cam_id, model_id, new_w, new_h, scaled]
+
+
+def resize_image(img_path: str, size: tuple) -> float:
+    """Resize one image in place (runs in a worker process); returns seconds spent."""
+    from PIL import Image
+    start = time.time()
+    with Image.open(img_path) as img:
+        if img.size == size:
+            return time.time() - start
+        img.draft(img.mode, size)  # JPEG: decode at reduced DCT scale, much faster for 2^n factors
+        resized = img.resize(size, Image.LANCZOS)
+    resized.save(img_path, quality=95)
+    return time.time() - start
+
+
+def plan_downscale(colmap_sparse: Path):
+    """Choose a power-of-2 factor per camera to fit TARGET_MAX_DIM.
+
+    Factors come from each camera's recorded resolution, so image uploads with
+    mixed sizes are each reduced appropriately. Returns the scaled cameras and
+    {image name: target size} for the images that need resizing.
+    """
+    cameras = read_cameras_bin(colmap_sparse / 'cameras.bin')
+    factors = {cam[0]: choose_downscale_factor(cam[2], cam[3]) for cam in cameras}
+    scaled = [scale_camera(cam, factors[cam[0]]) for cam in cameras]
+    sizes = {cam[0]: (cam[2], cam[3]) for cam in scaled}
+    image_cameras = read_image_cameras(colmap_sparse / 'images.bin')
+    targets = {name: sizes[cam_id] for name, cam_id in image_cameras.items()
+               if factors.get(cam_id, 1) > 1 and Path(name).suffix.lower() in IMAGE_SUFFIXES}
+    print(f"Downscale factors by camera: {sorted(set(factors.values()))}, {len(targets)} images to resize")
+    return scaled, targets
+
+
+def prepare_dataset(data_dir: Path, metrics: StageMetrics) -> int:
+    """Download COLMAP output into the NerfStudio layout, downscaling images as they arrive.
 
     NerfStudio expects:  data_dir/images/  and  data_dir/colmap/sparse/0/
     S3 has:              colmap/{sceneId}/images/  and  colmap/{sceneId}/sparse/0/
+
+    The sparse model is fetched first so each image can be handed to the resize
+    pool as soon as its download completes; training starts once both finish.
     """
     colmap_sparse = data_dir / 'colmap' / 'sparse' / '0'
     images_dir = data_dir / 'images'
     colmap_sparse.mkdir(parents=True, exist_ok=True)
     images_dir.mkdir(parents=True, exist_ok=True)
-
-    paginator = s3.get_paginator('list_objects_v2')
-    for page in paginator.paginate(Bucket=BUCKET, Prefix=f'colmap/{SCENE_ID}/'):
-        for obj in page.get('Contents', []):
-            key = obj['Key']
-            rel = key.replace(f'colmap/{SCENE_ID}/', '')
-            if not rel or rel.endswith('/'):
-                continue
-            # Map S3 paths to NerfStudio layout
-            if rel.startswith('images/'):
-                local = images_dir / rel.replace('images/', '', 1)
-            elif rel.startswith('sparse/0/'):
-                local = colmap_sparse / rel.replace('sparse/0/', '', 1)
-            else:
-                continue  # skip database.db etc.
-            local.parent.mkdir(parents=True, exist_ok=True)
-            s3.download_file(BUCKET, key, str(local))
-
-    num_images = len(list(images_dir.iterdir()))
-    print(f"Downloaded {num_images} images, sparse files: {list(colmap_sparse.iterdir())}")
+    prefix = f'colmap/{SCENE_ID}/'
+    start = time.time()
+
+    stats = download_prefix(BUCKET, f'{prefix}sparse/0/', colmap_sparse, s3=s3)
+    print(f"Downloaded sparse model: {stats}")
+    metrics.add_transfer('download', stats)
+    scaled, targets = plan_downscale(colmap_sparse)
+
+    workers = os.cpu_count() or 1
+    resizes = []
+    # Spawned, not forked: the pool is fed from download threads while boto3 and the
+    # GPU monitor have threads running, and a forked child can inherit a held lock
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        def on_image(key, local_path):
+            size = targets.get(os.path.basename(key))
+            if size:
+                resizes.append(pool.submit(resize_image, str(local_path), size))
+
+        stats = download_prefix(BUCKET, f'{prefix}images/', images_dir, s3=s3, on_complete=on_image)
+        download_seconds = time.time() - start
+        resize_seconds = sum(f.result() for f in resizes)
+    total = time.time() - start
+    metrics.add_transfer('download', stats)
+    metrics.record('resizedImages', len(resizes), 'Count')
+
+    if targets:
+        write_cameras_bin(colmap_sparse / 'cameras.bin', scaled)
+    # Serial path: download everything, then a separate resize pass across all cores
+    serial = download_seconds + resize_seconds / workers
+    num_images = sum(1 for _ in images_dir.iterdir())
+    print(f"Prepared {num_images} images ({stats}), resized {len(resizes)} on {workers} processes: "
+          f"{total:.1f}s pipelined vs ~{serial:.1f}s serial (saved ~{max(0.0, serial - total):.1f}s)")
     return num_images
 
 
-def get_downscale_factor(images_dir: Path, colmap_sparse: Path) -> int:
-    """Return 2 if images exceed 800px on longest edge, else 1.
-    If factor is 2, pre-downscale images in-place and patch cameras.bin."""
-    from PIL import Image
-    factor = 1
-    for img_path in images_dir.iterdir():
-        if img_path.suffix.lower() in ('.jpg', '.jpeg', '.png'):
-            with Image.open(img_path) as img:
-                max_dim = max(img.size)
-                factor = 2 if max_dim > 800 else 1
-                print(f"Image resolution: {img.size[0]}x{img.size[1]}, downscale factor: {factor}")
-            break
-    if factor > 1:
-        print(f"Pre-downscaling images by {factor}x...")
-        for img_path in images_dir.iterdir():
-            if img_path.suffix.lower() in ('.jpg', '.jpeg', '.png'):
-                with Image.open(img_path) as img:
-                    new_size = (img.size[0] // factor, img.size[1] // factor)
-                    img.resize(new_size, Image.LANCZOS).save(img_path, quality=95)
-        # Patch cameras.bin to match downscaled resolution
-        import struct
-        cameras_bin = colmap_sparse / 'cameras.bin'
-        data = cameras_bin.read_bytes()
-        num_cameras = struct.unpack('<Q', data[:8])[0]
-        offset = 8
-        # Model param counts: {0:3, 1:4, 2:4, 3:5, 4:4, 5:5, 6:4, 7:5, 8:12, 9:8}
-        param_counts = {0:3, 1:4, 2:4, 3:5, 4:4, 5:5, 6:4, 7:5, 8:12, 9:8}
-        out = bytearray(data[:8])
-        for _ in range(num_cameras):
-            cam_id, model_id = struct.unpack('<II', data[offset:offset+8])
-            w, h = struct.unpack('<QQ', data[offset+8:offset+24])
-            n_params = param_counts.get(model_id, 4)
-            params = struct.unpack(f'<{n_params}d', data[offset+24:offset+24+n_params*8])
-            # Scale width, height, and focal/principal point params
-            w //= factor
-            h //= factor
-            params = tuple(p / factor for p in params)
-            out += struct.pack('<II', cam_id, model_id)
-            out += struct.pack('<QQ', w, h)
-            out += struct.pack(f'<{n_params}d', *params)
-            offset += 24 + n_params * 8
-        cameras_bin.write_bytes(bytes(out))
-        print(f"Patched cameras.bin: {num_cameras} cameras scaled by 1/{factor}")
-    return factor
+def download_checkpoint(load_dir: Path, metrics: StageMetrics) -> int:
+    """Download the latest stored checkpoint into load_dir and return its step."""
+    checkpoints = [(int(m.group(1)), key) for key, _ in list_keys(BUCKET, CHECKPOINT_PREFIX, s3)
+                   if (m := CHECKPOINT_RE.search(key))]
+    if not checkpoints:
+        raise FileNotFoundError(f"No checkpoint under s3://{BUCKET}/{CHECKPOINT_PREFIX}")
+    step, key = max(checkpoints)
+    load_dir.mkdir(parents=True, exist_ok=True)
+    local_path = load_dir / os.path.basename(key)
+    s3.download_file(BUCKET, key, str(local_path))
+    metrics.add_bytes('download', local_path.stat().st_size)
+    print(f"Resuming from {key} (step {step})")
+    return step
+
+
+class LossReader:
+    """Latest 'Train Loss' scalar from ns-train's TensorBoard event file.
+
+    The console log has no loss column, so the event file is tailed instead;
+    each call only reads records written since the last one.
+    """
 
+    def __init__(self, log_dir: Path):
+        self.log_dir = log_dir
+        self.loss = None
+        self._loader = None
+
+    def latest(self):
+        try:
+            from tensorboard.backend.event_processing.event_file_loader import RawEventFileLoader
+            from tensorboard.compat.proto.event_pb2 import Event
+        except ImportError:
+            return None
+        if self._loader is None:
+            files = sorted(self.log_dir.rglob('events.out.tfevents.*'))
+            if not files:
+                return None
+            self._loader = RawEventFileLoader(str(files[-1]))
+        for record in self._loader.Load():
+            for value in Event.FromString(record).summary.value:
+                if value.tag == 'Train Loss':
+                    self.loss = value.simple_value
+        return self.loss
+
+
+class TrainingProgress:
+    """Follow ns-train's logged steps and write throttled progress to the scene.
+
+    The rate and ETA are measured from wall time over RATE_WINDOW_SECONDS rather
+    than taken from ns-train, whose percent ignores a resumed checkpoint's offset.
+    """
 
-def run_training(data_dir: Path, output_dir: Path, num_images: int):
-    """Run ns-train splatfacto."""
-    get_downscale_factor(data_dir / 'images', data_dir / 'colmap' / 'sparse' / '0')
+    def __init__(self, start_step: int, total_steps: int, log_dir: Path):
+        self.start_step = start_step
+        self.total_steps = total_steps
+        self.step = start_step
+        self.last_step_at = None
+        self.failure = None
+        self._samples = deque()
+        self._written_at = 0.0
+        self._loss = LossReader(log_dir)
+
+    def feed(self, line: str):
+        match = STEP_RE.match(ANSI_RE.sub('', line))
+        if not match:
+            return
+        now = time.time()
+        step = int(match.group(1))
+        if self.last_step_at is None or step > self.step:
+            self.last_step_at = now
+        self.step = step
+        self._samples.append((now, step))
+        while len(self._samples) > 2 and now - self._samples[0][0] > RATE_WINDOW_SECONDS:
+            self._samples.popleft()
+        if now - self._written_at >= PROGRESS_SECONDS:
+            self.write(now)
+
+    def rate(self) -> float:
+        """Iterations per second over the recent window."""
+        if len(self._samples) < 2:
+            return 0.0
+        (t0, s0), (t1, s1) = self._samples[0], self._samples[-1]
+        return (s1 - s0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def check(self):
+        """Reason to stop training, or None while it is healthy."""
+        if self.last_step_at is None:
+            return None  # still loading the dataset
+        idle = time.time() - self.last_step_at
+        if idle > STALL_SECONDS:
+            return f"Training stalled at step {self.step}: no progress for {idle:.0f}s"
+        window = self._samples[-1][0] - self._samples[0][0]
+        if MIN_ITERS_PER_SECOND and window >= RATE_WINDOW_SECONDS and self.rate() < MIN_ITERS_PER_SECOND:
+            return f"Training too slow at step {self.step}: {self.rate():.2f} it/s < {MIN_ITERS_PER_SECOND}"
+        return None
+
+    def as_dict(self, now: float) -> dict:
+        rate = self.rate()
+        progress = {
+            'step': self.step,
+            'totalSteps': self.total_steps,
+            'percent': round(100 * self.step / self.total_steps, 1),
+            'itersPerSecond': round(rate, 2),
+            'etaSeconds': round((self.total_steps - self.step) / rate) if rate else None,
+            'updatedAt': int(now),
+        }
+        loss = self._loss.latest()
+        if loss is not None:
+            progress['loss'] = round(loss, 5)
+        return progress
+
+    def write(self, now: float = None):
+        now = now or time.time()
+        self._written_at = now
+        progress = self.as_dict(now)
+        print(f"Progress: {json.dumps(progress)}")
+        if not SCENES_TABLE:
+            return
+        try:
+            dynamodb.Table(SCENES_TABLE).update_item(
+                Key={'id': SCENE_ID},
+                UpdateExpression='SET trainingProgress = :progress ADD version :one',
+                ExpressionAttributeValues={
+                    ':progress': json.loads(json.dumps(progress), parse_float=Decimal),
+                    ':one': 1
+                }
+            )
+        except Exception as e:
+            print(f"WARNING: failed to record training progress: {e}")
+
+
+def watch_training(proc: subprocess.Popen, progress: TrainingProgress, done: threading.Event):
+    """Kill ns-train once progress.check() reports a stall or slow host."""
+    while not done.wait(PROGRESS_SECONDS):
+        reason = progress.check()
+        if reason:
+            print(f"ERROR: {reason}; stopping ns-train", file=sys.stderr)
+            progress.failure = reason
+            proc.kill()
+            return
+
+
+def run_training(data_dir: Path, output_dir: Path, num_images: int, load_dir: Path = None, start_step: int = 0):
+    """Run ns-train splatfacto, optionally continuing from a checkpoint in load_dir.
+
+    NerfStudio resumes at checkpoint step + 1 and trains --max-num-iterations
+    more steps, so only the remainder up to ITERATIONS is requested.
+    """
+    num_iterations = ITERATIONS - start_step
     args = [
         'ns-train', 'splatfacto',
         '--timestamp', SCENE_ID,
         '--output-dir', str(output_dir),
         '--viewer.quit-on-train-completion', 'True',
-        '--logging.local-writer.enable', 'False',
+        '--vis', 'tensorboard',
+        '--logging.local-writer.enable', 'True',
+        '--logging.local-writer.max-log-size', '0',
+        '--logging.steps-per-log', str(STEPS_PER_LOG),
         '--logging.profiler', 'none',
-        '--max-num-iterations', str(ITERATIONS),
+        '--max-num-iterations', str(num_iterations),
         '--pipeline.model.use_scale_regularization', 'True',
+        '--pipeline.model.stop-split-at', str(DENSIFY_UNTIL_ITER),
+        '--pipeline.model.refine-every', str(DENSIFICATION_INTERVAL),
     ]
+    if MAX_GAUSSIANS > 0:
+        args += [
+            '--pipeline.model.strategy', 'mcmc',
+            '--pipeline.model.max-gs-num', str(MAX_GAUSSIANS),
+        ]
+    if load_dir:
+        args += ['--load-dir', str(load_dir)]
     if num_images > 500:
         args += ['--pipeline.datamanager.cache-images', 'disk']
     # Check if points3D.bin is empty (header-only = 8 bytes); use random init if so
@@ -152,7 +432,29 @@ def run_training(data_dir: Path, output_dir: Path, num_images: int):
     if empty_points:
         args += ['--load-3D-points', 'False']
     print(f"Running: {' '.join(args)}")
-    subprocess.run(args, check=True)
+    progress = TrainingProgress(start_step, ITERATIONS, output_dir)
+    proc = subprocess.Popen(
+        args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+        env={**os.environ, 'PYTHONUNBUFFERED': '1'}
+    )
+    done = threading.Event()
+    watchdog = threading.Thread(target=watch_training, args=(proc, progress, done), daemon=True)
+    watchdog.start()
+    try:
+        for line in proc.stdout:
+            sys.stdout.write(line)
+            progress.feed(line)
+        returncode = proc.wait()
+    finally:
+        done.set()
+        if proc.poll() is None:
+            proc.kill()
+    if progress.failure:
+        raise RuntimeError(progress.failure)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, args)
+    progress.step = ITERATIONS
+    progress.write()
 
 
 def run_export(output_dir: Path, export_dir: Path):
@@ -176,7 +478,28 @@ def run_export(output_dir: Path, export_dir: Path):
     subprocess.run(args, check=True)
 
 
-def upload_output(export_dir: Path):
+def count_gaussians(ply: Path) -> int:
+    """Read the vertex count from the PLY header."""
+    with open(ply, 'rb') as f:
+        for line in f:
+            if line.startswith(b'element vertex'):
+                return int(line.split()[2])
+            if line.strip() == b'end_header':
+                break
+    return 0
+
+
+def record_training_stats(gaussian_count: int):
+    if SCENES_TABLE:
+        table = dynamodb.Table(SCENES_TABLE)
+        table.update_item(
+            Key={'id': SCENE_ID},
+            UpdateExpression='SET gaussianCount = :count',
+            ExpressionAttributeValues={':count': gaussian_count}
+        )
+
+
+def upload_output(export_dir: Path, metrics: StageMetrics):
     """Upload splat.ply to the expected S3 path."""
     ply = export_dir / 'splat.ply'
     if not ply.exists():
@@ -184,6 +507,31 @@ def upload_output(export_dir: Path):
     dest = f'outputs/{SCENE_ID}/point_cloud/iteration_{ITERATIONS}/point_cloud.ply'
     print(f"Uploading {ply} → s3://{BUCKET}/{dest}")
     s3.upload_file(str(ply), BUCKET, dest)
+    metrics.add_bytes('upload', ply.stat().st_size)
+
+
+def upload_checkpoint(output_dir: Path, metrics: StageMetrics):
+    """Store the final checkpoint under outputs/{sceneId}/checkpoints/, replacing older ones."""
+    checkpoints = sorted(output_dir.rglob('nerfstudio_models/step-*.ckpt'))
+    if not checkpoints:
+        print("WARNING: ns-train produced no checkpoint")
+        return
+    ckpt = checkpoints[-1]
+    step = int(CHECKPOINT_RE.search(ckpt.name).group(1))
+    key = f'{CHECKPOINT_PREFIX}{ckpt.name}'
+    print(f"Uploading checkpoint {ckpt} → s3://{BUCKET}/{key}")
+    s3.upload_file(str(ckpt), BUCKET, key)
+    metrics.add_bytes('upload', ckpt.stat().st_size)
+    for old_key, _ in list(list_keys(BUCKET, CHECKPOINT_PREFIX, s3)):
+        if old_key != key:
+            s3.delete_object(Bucket=BUCKET, Key=old_key)
+    if SCENES_TABLE:
+        table = dynamodb.Table(SCENES_TABLE)
+        table.update_item(
+            Key={'id': SCENE_ID},
+            UpdateExpression='SET checkpointKey = :key, checkpointStep = :step',
+            ExpressionAttributeValues={':key': key, ':step': step}
+        )
 
 
 def main():
@@ -193,27 +541,49 @@ def main():
     output_dir = data_dir / 'nerfstudio_output'
     export_dir = data_dir / 'export'
 
-    try:
-        print(f"Downloading COLMAP output for scene {SCENE_ID}...")
-        num_images = download_colmap_output(data_dir)
-
-        print(f"Starting NerfStudio splatfacto training: {ITERATIONS} iterations")
-        run_training(data_dir, output_dir, num_images)
-
-        print("Exporting gaussian splat...")
-        run_export(output_dir, export_dir)
-
-        print("Uploading output...")
-        upload_output(export_dir)
-
-        send_success({'sceneId': SCENE_ID, 'iterations': ITERATIONS, 'status': 'training_complete'})
-
-    except Exception as e:
-        import traceback
-        print(f"gsplat failed: {e}", file=sys.stderr)
-        traceback.print_exc()
-        send_failure(str(e), 'training')
-        sys.exit(1)
+    with StageMetrics(SCENE_ID, 'training', SCENES_TABLE, gpu=True) as metrics:
+        try:
+            print(f"Preparing dataset for scene {SCENE_ID}...")
+            with metrics.phase('prepareDataset'):
+                num_images = prepare_dataset(data_dir, metrics)
+            metrics.record('numImages', num_images, 'Count')
+
+            load_dir, start_step = None, 0
+            if RESUME_FROM:
+                load_dir = data_dir / 'checkpoint'
+                with metrics.phase('downloadCheckpoint'):
+                    start_step = download_checkpoint(load_dir, metrics) + 1
+                if start_step >= ITERATIONS:
+                    raise ValueError(f"Checkpoint is already at step {start_step}, nothing to train up to {ITERATIONS}")
+
+            print(f"Starting NerfStudio splatfacto training: steps {start_step}-{ITERATIONS}")
+            with metrics.phase('training'):
+                run_training(data_dir, output_dir, num_images, load_dir, start_step)
+            metrics.record('iterations', ITERATIONS - start_step, 'Count')
+            metrics.record('iterationsPerSecond', round((ITERATIONS - start_step) / metrics.phases['training'], 2), 'Count/Second')
+            with metrics.phase('uploadCheckpoint'):
+                upload_checkpoint(output_dir, metrics)
+
+            print("Exporting gaussian splat...")
+            with metrics.phase('export'):
+                run_export(output_dir, export_dir)
+            gaussian_count = count_gaussians(export_dir / 'splat.ply')
+            print(f"Trained {gaussian_count} gaussians")
+            metrics.record('gaussianCount', gaussian_count, 'Count')
+            record_training_stats(gaussian_count)
+
+            print("Uploading output...")
+            with metrics.phase('upload'):
+                upload_output(export_dir, metrics)
+
+            send_success({'sceneId': SCENE_ID, 'iterations': ITERATIONS, 'resumedAt': start_step, 'status': 'training_complete'})
+
+        except Exception as e:
+            import traceback
+            print(f"gsplat failed: {e}", file=sys.stderr)
+            traceback.print_exc()
+            send_failure(str(e), 'training')
+            sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -54,6 +54,7 @@ module "api" {
   scenes_table         = module.storage.scenes_table
   scenes_table_arn     = module.storage.scenes_table_arn
   state_machine_arn    = module.pipeline.state_machine_arn
+  shared_layer_arn     = module.pipeline.shared_layer_arn
 }
 
 module "cdn" {
@@ -8,6 +8,7 @@ variable "assets_bucket_arn" {}
 variable "scenes_table" {}
 variable "scenes_table_arn" {}
 variable "state_machine_arn" {}
+variable "shared_layer_arn" {}
 
 data "aws_region" "current" {}
 data "aws_caller_identity" "current" {}
@@ -78,18 +79,24 @@ resource "aws_iam_role_policy" "lambda" {
       },
       {
         Effect   = "Allow"
-        Action   = ["s3:GetObject", "s3:PutObject", "s3:ListBucket", "s3:DeleteObject"]
+        Action   = ["s3:GetObject", "s3:PutObject", "s3:ListBucket", "s3:DeleteObject", "s3:AbortMultipartUpload", "s3:ListMultipartUploadParts"]
         Resource = [var.assets_bucket_arn, "${var.assets_bucket_arn}/*"]
       },
       {
         Effect   = "Allow"
-        Action   = ["dynamodb:GetItem", "dynamodb:PutItem", "dynamodb:UpdateItem", "dynamodb:DeleteItem", "dynamodb:Query", "dynamodb:Scan"]
+        Action   = ["dynamodb:GetItem", "dynamodb:BatchGetItem", "dynamodb:PutItem", "dynamodb:BatchWriteItem", "dynamodb:UpdateItem", "dynamodb:DeleteItem", "dynamodb:Query", "dynamodb:Scan"]
         Resource = [var.scenes_table_arn, "${var.scenes_table_arn}/index/*"]
       },
       {
         Effect   = "Allow"
         Action   = ["states:StartExecution"]
         Resource = var.state_machine_arn
+      },
+      {
+        # scenes hands large deletions to an async invocation of itself
+        Effect   = "Allow"
+        Action   = ["lambda:InvokeFunction"]
+        Resource = "arn:aws:lambda:${local.region}:${local.account_id}:function:${var.project}-scenes"
       }
     ]
   })
@@ -137,8 +144,9 @@ resource "aws_lambda_function" "scenes" {
   role             = aws_iam_role.lambda.arn
   handler          = "scenes.handler"
   runtime          = "python3.13"
-  timeout          = 30
+  timeout          = 120 # async large-scene deletes; API Gateway still caps requests at 30s
   source_code_hash = data.archive_file.scenes.output_base64sha256
+  layers           = [var.shared_layer_arn]
   tags             = var.common_tags
 
   environment {
@@ -163,6 +171,7 @@ resource "aws_lambda_function" "jobs" {
     variables = {
       SCENES_TABLE      = var.scenes_table
       STATE_MACHINE_ARN = var.state_machine_arn
+      ASSETS_BUCKET     = var.assets_bucket
     }
   }
 }
@@ -222,6 +231,30 @@ resource "aws_apigatewayv2_route" "upload" {
   authorizer_id      = aws_apigatewayv2_authorizer.cognito.id
 }
 
+resource "aws_apigatewayv2_route" "upload_parts" {
+  api_id             = aws_apigatewayv2_api.main.id
+  route_key          = "POST /upload/parts"
+  target             = "integrations/${aws_apigatewayv2_integration.upload.id}"
+  authorization_type = "JWT"
+  authorizer_id      = aws_apigatewayv2_authorizer.cognito.id
+}
+
+resource "aws_apigatewayv2_route" "upload_complete" {
+  api_id             = aws_apigatewayv2_api.main.id
+  route_key          = "POST /upload/complete"
+  target             = "integrations/${aws_apigatewayv2_integration.upload.id}"
+  authorization_type = "JWT"
+  authorizer_id      = aws_apigatewayv2_authorizer.cognito.id
+}
+
+resource "aws_apigatewayv2_route" "upload_abort" {
+  api_id             = aws_apigatewayv2_api.main.id
+  route_key          = "POST /upload/abort"
+  target             = "integrations/${aws_apigatewayv2_integration.upload.id}"
+  authorization_type = "JWT"
+  authorizer_id      = aws_apigatewayv2_authorizer.cognito.id
+}
+
 resource "aws_apigatewayv2_route" "scenes_list" {
   api_id    = aws_apigatewayv2_api.main.id
   route_key = "GET /scenes"
@@ -236,12 +269,27 @@ resource "aws_apigatewayv2_route" "scenes_mine" {
   authorizer_id      = aws_apigatewayv2_authorizer.cognito.id
 }
 
+# One long-poll for every in-progress scene on the jobs list
+resource "aws_apigatewayv2_route" "scenes_mine_events" {
+  api_id             = aws_apigatewayv2_api.main.id
+  route_key          = "GET /scenes/mine/events"
+  target             = "integrations/${aws_apigatewayv2_integration.scenes.id}"
+  authorization_type = "JWT"
+  authorizer_id      = aws_apigatewayv2_authorizer.cognito.id
+}
+
 resource "aws_apigatewayv2_route" "scenes_get" {
   api_id    = aws_apigatewayv2_api.main.id
   route_key = "GET /scenes/{id}"
   target    = "integrations/${aws_apigatewayv2_integration.scenes.id}"
 }
 
+resource "aws_apigatewayv2_route" "scenes_events" {
+  api_id    = aws_apigatewayv2_api.main.id
+  route_key = "GET /scenes/{id}/events"
+  target    = "integrations/${aws_apigatewayv2_integration.scenes.id}"
+}
+
 resource "aws_apigatewayv2_route" "scenes_create" {
   api_id             = aws_apigatewayv2_api.main.id
   route_key          = "POST /scenes"
@@ -266,6 +314,14 @@ resource "aws_apigatewayv2_route" "jobs" {
   authorizer_id      = aws_apigatewayv2_authorizer.cognito.id
 }
 
+resource "aws_apigatewayv2_route" "jobs_batch" {
+  api_id             = aws_apigatewayv2_api.main.id
+  route_key          = "POST /jobs/batch"
+  target             = "integrations/${aws_apigatewayv2_integration.jobs.id}"
+  authorization_type = "JWT"
+  authorizer_id      = aws_apigatewayv2_authorizer.cognito.id
+}
+
 output "api_url" {
   value = aws_apigatewayv2_api.main.api_endpoint
 }
@@ -64,7 +64,7 @@ resource "aws_iam_role_policy" "batch_job" {
     Statement = [
       {
         Effect   = "Allow"
-        Action   = ["s3:GetObject", "s3:PutObject", "s3:ListBucket"]
+        Action   = ["s3:GetObject", "s3:PutObject", "s3:ListBucket", "s3:DeleteObject"]
         Resource = [var.assets_bucket_arn, "${var.assets_bucket_arn}/*"]
       },
       {
@@ -17,6 +17,16 @@ data "aws_availability_zones" "available" { state = "available" }
 locals {
   account_id = data.aws_caller_identity.current.account_id
   region     = data.aws_region.current.name
+
+  # Image sizing and matching limits shared by the containers and the scheduler's
+  # estimates; set only here so the two cannot drift apart
+  reconstruction_env = {
+    TARGET_MAX_DIM        = "1600"
+    SIFT_MAX_DIM          = "3200"
+    EXHAUSTIVE_MAX_IMAGES = "150"
+    SEQUENTIAL_OVERLAP    = "10"
+  }
+  reconstruction_env_list = [for name, value in local.reconstruction_env : { name = name, value = value }]
 }
 
 # VPC
@@ -153,6 +163,35 @@ resource "aws_batch_compute_environment" "gpu" {
   depends_on = [aws_iam_role_policy_attachment.batch_service]
 }
 
+# Cheaper L4 tier for COLMAP and fast-lane scenes; training of standard and
+# large scenes stays on the L40S environment above
+resource "aws_batch_compute_environment" "gpu_small" {
+  name         = "${var.project}-gpu-small-v1"
+  type         = "MANAGED"
+  service_role = aws_iam_role.batch_service.arn
+  tags         = var.common_tags
+
+  compute_resources {
+    type                = "SPOT"
+    allocation_strategy = "SPOT_PRICE_CAPACITY_OPTIMIZED"
+    min_vcpus           = 0
+    max_vcpus           = 32
+    instance_type       = ["g6.xlarge", "g6.2xlarge"]
+    subnets             = aws_subnet.private[*].id
+    security_group_ids  = [aws_security_group.batch.id]
+    instance_role       = aws_iam_instance_profile.batch.arn
+    spot_iam_fleet_role = aws_iam_role.spot_fleet.arn
+    tags                = var.common_tags
+
+    launch_template {
+      launch_template_id = aws_launch_template.gpu.id
+      version            = "$Latest"
+    }
+  }
+
+  depends_on = [aws_iam_role_policy_attachment.batch_service]
+}
+
 resource "aws_launch_template" "gpu" {
   name = "${var.project}-gpu-lt"
   tags = var.common_tags
@@ -179,6 +218,37 @@ resource "aws_batch_job_queue" "gpu" {
   }
 }
 
+# Small scenes jump ahead of everything else on the L4 tier
+resource "aws_batch_job_queue" "fast" {
+  name     = "${var.project}-fast-queue"
+  state    = "ENABLED"
+  priority = 10
+  tags     = var.common_tags
+
+  compute_environment_order {
+    order               = 1
+    compute_environment = aws_batch_compute_environment.gpu_small.arn
+  }
+}
+
+# COLMAP runs on the L4 tier and only spills onto L40S capacity when it is full
+resource "aws_batch_job_queue" "colmap" {
+  name     = "${var.project}-colmap-queue"
+  state    = "ENABLED"
+  priority = 5
+  tags     = var.common_tags
+
+  compute_environment_order {
+    order               = 1
+    compute_environment = aws_batch_compute_environment.gpu_small.arn
+  }
+
+  compute_environment_order {
+    order               = 2
+    compute_environment = aws_batch_compute_environment.gpu.arn
+  }
+}
+
 resource "aws_batch_job_definition" "colmap" {
   name = "${var.project}-colmap"
   type = "container"
@@ -186,12 +256,19 @@ resource "aws_batch_job_definition" "colmap" {
 
   container_properties = jsonencode({
     image                = "${aws_ecr_repository.colmap.repository_url}:latest"
-    vcpus                = 4
-    memory               = 16384
-    command              = ["python3", "run.py"]
-    jobRoleArn           = aws_iam_role.batch_job.arn
-    resourceRequirements = [{ type = "GPU", value = "1" }]
-    environment          = [{ name = "BUCKET", value = var.assets_bucket }]
+    command    = ["python3", "run.py"]
+    jobRoleArn = aws_iam_role.batch_job.arn
+    # Defaults for direct submissions; the pipeline overrides them per scene (see schedule.py)
+    resourceRequirements = [
+      { type = "VCPU", value = "4" },
+      { type = "MEMORY", value = "14336" },
+      { type = "GPU", value = "1" }
+    ]
+    environment = concat([
+      { name = "BUCKET", value = var.assets_bucket },
+      # boto3 resolves its region from this; containers carry no fallback of their own
+      { name = "AWS_DEFAULT_REGION", value = local.region }
+    ], local.reconstruction_env_list)
   })
 }
 
@@ -202,12 +279,18 @@ resource "aws_batch_job_definition" "gaussian_splatting" {
 
   container_properties = jsonencode({
     image                = "${aws_ecr_repository.gaussian_splatting.repository_url}:latest"
-    vcpus                = 8
-    memory               = 32768
-    command              = ["python", "run.py"]
-    jobRoleArn           = aws_iam_role.batch_job.arn
-    resourceRequirements = [{ type = "GPU", value = "1" }]
-    environment          = [{ name = "BUCKET", value = var.assets_bucket }]
+    command    = ["python", "run.py"]
+    jobRoleArn = aws_iam_role.batch_job.arn
+    resourceRequirements = [
+      { type = "VCPU", value = "8" },
+      { type = "MEMORY", value = "32768" },
+      { type = "GPU", value = "1" }
+    ]
+    environment = concat([
+      { name = "BUCKET", value = var.assets_bucket },
+      # boto3 resolves its region from this; containers carry no fallback of their own
+      { name = "AWS_DEFAULT_REGION", value = local.region }
+    ], local.reconstruction_env_list)
   })
 }
 
@@ -224,6 +307,12 @@ data "archive_file" "convert" {
   output_path = "${path.module}/dist/convert.zip"
 }
 
+data "archive_file" "schedule" {
+  type        = "zip"
+  source_file = "${path.module}/../../../services/api/src/handlers/schedule.py"
+  output_path = "${path.module}/dist/schedule.zip"
+}
+
 data "archive_file" "handle_failure" {
   type        = "zip"
   source_file = "${path.module}/../../../services/api/src/handlers/handle_failure.py"
@@ -258,7 +347,7 @@ resource "aws_iam_role_policy" "lambda" {
       },
       {
         Effect   = "Allow"
-        Action   = ["s3:GetObject", "s3:PutObject", "s3:ListBucket", "s3:CopyObject"]
+        Action   = ["s3:GetObject", "s3:PutObject", "s3:ListBucket", "s3:CopyObject", "s3:DeleteObject"]
         Resource = [var.assets_bucket_arn, "${var.assets_bucket_arn}/*"]
       },
       {
@@ -276,12 +365,17 @@ resource "aws_lambda_function" "extract_frames" {
   role             = aws_iam_role.lambda.arn
   handler          = "extract_frames.handler"
   runtime          = "python3.13"
-  timeout          = 300
-  memory_size      = 1024
+  timeout          = 900  # upload.MAX_VIDEO_SIZE (2GB) is sized to fit this
+  memory_size      = 3008 # CPU scales with memory; ffmpeg decode is the bottleneck
   source_code_hash = data.archive_file.extract_frames.output_base64sha256
   tags             = var.common_tags
 
-  layers = [aws_lambda_layer_version.ffmpeg.arn, aws_lambda_layer_version.shared.arn]
+  # Room for the largest accepted upload (upload.MAX_VIDEO_SIZE) plus its frames
+  ephemeral_storage {
+    size = 10240
+  }
+
+  layers = [aws_lambda_layer_version.ffmpeg.arn, aws_lambda_layer_version.python_deps.arn, aws_lambda_layer_version.shared.arn]
 
   environment {
     variables = {
@@ -303,7 +397,7 @@ resource "aws_lambda_layer_version" "python_deps" {
   layer_name          = "${var.project}-python-deps"
   compatible_runtimes = ["python3.13", "python3.12", "python3.11"]
   source_code_hash    = filebase64sha256("${path.module}/dist/python-deps-layer.zip")
-  description         = "Python dependencies (numpy, plyfile)"
+  description         = "Python dependencies (numpy, scipy)"
 }
 
 resource "aws_lambda_layer_version" "shared" {
@@ -325,6 +419,11 @@ resource "aws_lambda_function" "convert" {
   source_code_hash = data.archive_file.convert.output_base64sha256
   tags             = var.common_tags
 
+  # The PLY is memory-mapped from /tmp, so scene size is bounded by disk, not RAM
+  ephemeral_storage {
+    size = 10240
+  }
+
   layers = [aws_lambda_layer_version.python_deps.arn, aws_lambda_layer_version.shared.arn]
 
   environment {
@@ -335,6 +434,29 @@ resource "aws_lambda_function" "convert" {
   }
 }
 
+resource "aws_lambda_function" "schedule" {
+  filename         = data.archive_file.schedule.output_path
+  function_name    = "${var.project}-schedule"
+  role             = aws_iam_role.lambda.arn
+  handler          = "schedule.handler"
+  runtime          = "python3.13"
+  timeout          = 30
+  source_code_hash = data.archive_file.schedule.output_base64sha256
+  tags             = var.common_tags
+
+  layers = [aws_lambda_layer_version.shared.arn]
+
+  environment {
+    variables = merge(local.reconstruction_env, {
+      ASSETS_BUCKET = var.assets_bucket
+      SCENES_TABLE  = var.scenes_table
+      GPU_QUEUE     = aws_batch_job_queue.gpu.arn
+      FAST_QUEUE    = aws_batch_job_queue.fast.arn
+      COLMAP_QUEUE  = aws_batch_job_queue.colmap.arn
+    })
+  }
+}
+
 resource "aws_lambda_function" "handle_failure" {
   filename         = data.archive_file.handle_failure.output_path
   function_name    = "${var.project}-handle-failure"
@@ -377,6 +499,7 @@ resource "aws_iam_role_policy" "sfn" {
         Action = ["lambda:InvokeFunction"]
         Resource = [
           aws_lambda_function.extract_frames.arn,
+          aws_lambda_function.schedule.arn,
           aws_lambda_function.convert.arn,
           aws_lambda_function.handle_failure.arn
         ]
@@ -407,10 +530,17 @@ resource "aws_sfn_state_machine" "pipeline" {
       CheckInputType = {
         Type = "Choice"
         Choices = [
+          {
+            And = [
+              { Variable = "$.colmapCached", IsPresent = true },
+              { Variable = "$.colmapCached", BooleanEquals = true }
+            ]
+            Next = "ScheduleJobs"
+          },
           {
             Variable    = "$.inputType"
             StringEquals = "images"
-            Next        = "RunCOLMAP"
+            Next        = "ScheduleJobs"
           }
         ]
         Default = "ExtractFrames"
@@ -428,23 +558,63 @@ resource "aws_sfn_state_machine" "pipeline" {
           "iterations.$"            = "$.Payload.iterations"
           "densifyUntilIter.$"      = "$.Payload.densifyUntilIter"
           "densificationInterval.$" = "$.Payload.densificationInterval"
+          "maxGaussians.$"          = "$.Payload.maxGaussians"
+          "sfmMapper.$"             = "$.Payload.sfmMapper"
+          "resumeFrom.$"            = "$.Payload.resumeFrom"
+          "compression.$"           = "$.Payload.compression"
+          "chunkedSplat.$"          = "$.Payload.chunkedSplat"
+          "pruneMinOpacity.$"       = "$.Payload.pruneMinOpacity"
+          "pruneScaleSigma.$"       = "$.Payload.pruneScaleSigma"
+          "pruneOutliers.$"         = "$.Payload.pruneOutliers"
         }
-        Next  = "RunCOLMAP"
+        Next  = "ScheduleJobs"
         Catch = [{ ErrorEquals = ["States.ALL"], Next = "HandleFailure", ResultPath = "$.error" }]
       }
+      # Sizes the Batch jobs from frame count, resolution and iterations
+      ScheduleJobs = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.schedule.arn
+          "Payload.$"  = "$"
+        }
+        ResultSelector = {
+          "colmap.$"   = "$.Payload.colmap"
+          "training.$" = "$.Payload.training"
+          "tier.$"     = "$.Payload.tier"
+        }
+        ResultPath = "$.schedule"
+        Next       = "CheckColmapCached"
+        Catch      = [{ ErrorEquals = ["States.ALL"], Next = "HandleFailure", ResultPath = "$.error" }]
+      }
+      CheckColmapCached = {
+        Type = "Choice"
+        Choices = [
+          {
+            And = [
+              { Variable = "$.colmapCached", IsPresent = true },
+              { Variable = "$.colmapCached", BooleanEquals = true }
+            ]
+            Next = "Run3DGS"
+          }
+        ]
+        Default = "RunCOLMAP"
+      }
       RunCOLMAP = {
         Type     = "Task"
         Resource = "arn:aws:states:::batch:submitJob.sync"
         Parameters = {
           JobName       = "colmap"
           JobDefinition = aws_batch_job_definition.colmap.arn
-          JobQueue      = aws_batch_job_queue.gpu.arn
+          "JobQueue.$"  = "$.schedule.colmap.jobQueue"
           ContainerOverrides = {
+            "ResourceRequirements.$" = "$.schedule.colmap.resourceRequirements"
             Environment = [
               { Name = "SCENE_ID", "Value.$" = "$.sceneId" },
               { Name = "BUCKET", Value = var.assets_bucket },
               { Name = "SCENES_TABLE", Value = var.scenes_table },
-              { Name = "INPUT_TYPE", "Value.$" = "$.inputType" }
+              { Name = "INPUT_TYPE", "Value.$" = "$.inputType" },
+              { Name = "SFM_MAPPER", "Value.$" = "$.sfmMapper" }
             ]
           }
         }
@@ -458,15 +628,18 @@ resource "aws_sfn_state_machine" "pipeline" {
         Parameters = {
           JobName       = "gaussian-splatting"
           JobDefinition = aws_batch_job_definition.gaussian_splatting.arn
-          JobQueue      = aws_batch_job_queue.gpu.arn
+          "JobQueue.$"  = "$.schedule.training.jobQueue"
           ContainerOverrides = {
+            "ResourceRequirements.$" = "$.schedule.training.resourceRequirements"
             Environment = [
               { Name = "SCENE_ID", "Value.$" = "$.sceneId" },
               { Name = "BUCKET", Value = var.assets_bucket },
               { Name = "SCENES_TABLE", Value = var.scenes_table },
               { Name = "ITERATIONS", "Value.$" = "States.Format('{}', $.iterations)" },
               { Name = "DENSIFY_UNTIL_ITER", "Value.$" = "States.Format('{}', $.densifyUntilIter)" },
-              { Name = "DENSIFICATION_INTERVAL", "Value.$" = "States.Format('{}', $.densificationInterval)" }
+              { Name = "DENSIFICATION_INTERVAL", "Value.$" = "States.Format('{}', $.densificationInterval)" },
+              { Name = "MAX_GAUSSIANS", "Value.$" = "States.Format('{}', $.maxGaussians)" },
+              { Name = "RESUME_FROM", "Value.$" = "$.resumeFrom" }
             ]
           }
         }
@@ -511,6 +684,10 @@ output "state_machine_arn" {
   value = aws_sfn_state_machine.pipeline.arn
 }
 
+output "shared_layer_arn" {
+  value = aws_lambda_layer_version.shared.arn
+}
+
 output "colmap_ecr_url" {
   value = aws_ecr_repository.colmap.repository_url
 }
@@ -1,3 +1,15 @@
-from .helpers import update_processing_stage
+from .helpers import update_processing_stage, emit_metric, emit_metrics
+from .transfer import (
+    TransferConfig, TransferStats, make_client, list_keys,
+    download_files, upload_files, download_prefix, upload_dir, copy_prefix,
+    delete_prefix
+)
+from .instrumentation import StageMetrics, GpuMemoryMonitor, peak_host_memory_mib
 
-__all__ = ['update_processing_stage']
+__all__ = [
+    'update_processing_stage', 'emit_metric', 'emit_metrics',
+    'TransferConfig', 'TransferStats', 'make_client', 'list_keys',
+    'download_files', 'upload_files', 'download_prefix', 'upload_dir', 'copy_prefix',
+    'delete_prefix',
+    'StageMetrics', 'GpuMemoryMonitor', 'peak_host_memory_mib'
+]
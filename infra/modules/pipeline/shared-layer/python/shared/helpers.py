@@ -1,4 +1,6 @@
 import os
+import json
+import time
 import boto3
 
 dynamodb = boto3.resource('dynamodb')
@@ -9,6 +11,31 @@ def update_processing_stage(scene_id: str, stage: str, table_name: str = None):
     table = dynamodb.Table(table_name)
     table.update_item(
         Key={'id': scene_id},
-        UpdateExpression='SET processingStage = :stage',
-        ExpressionAttributeValues={':stage': stage}
+        UpdateExpression='SET processingStage = :stage ADD version :one',
+        ExpressionAttributeValues={':stage': stage, ':one': 1}
     )
+
+def emit_metric(name: str, value: float, unit: str = 'None', namespace: str = 'SplatLibrary/Pipeline', **dimensions):
+    """Log a metric in CloudWatch Embedded Metric Format (no API call needed)."""
+    emit_metrics({name: value}, {name: unit}, namespace, **dimensions)
+
+def emit_metrics(values: dict, units: dict = None, namespace: str = 'SplatLibrary/Pipeline',
+                 properties: dict = None, **dimensions):
+    """Log several metrics sharing one set of dimensions as a single EMF record.
+    
+    properties are logged alongside for Logs Insights but are not metrics.
+    """
+    units = units or {}
+    print(json.dumps({
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': namespace,
+                'Dimensions': [list(dimensions)],
+                'Metrics': [{'Name': name, 'Unit': units.get(name, 'None')} for name in values]
+            }]
+        },
+        **(properties or {}),
+        **values,
+        **dimensions
+    }))
@@ -0,0 +1,159 @@
+"""Per-stage pipeline telemetry shared by the pipeline Lambdas and Batch containers.
+
+StageMetrics times a stage and its sub-phases and tracks peak host and GPU
+memory and S3 bytes. On exit it writes everything to the scene item under
+metrics.<stage> and logs it as one CloudWatch EMF record with a Stage dimension.
+"""
+import os
+import json
+import time
+import resource
+import threading
+import subprocess
+from contextlib import contextmanager
+from decimal import Decimal
+from .helpers import dynamodb, emit_metrics
+
+GPU_POLL_SECONDS = 2
+
+
+class GpuMemoryMonitor:
+    """Poll nvidia-smi in the background and keep the peak memory used (MiB)."""
+
+    def __init__(self, interval: float = GPU_POLL_SECONDS):
+        self.interval = interval
+        self.peak_mib = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+
+    def _poll(self):
+        while not self._stop.is_set():
+            try:
+                out = subprocess.run(
+                    ['nvidia-smi', '--query-gpu=memory.used', '--format=csv,noheader,nounits'],
+                    capture_output=True, text=True, timeout=10
+                ).stdout
+                used = sum(int(line) for line in out.split() if line.strip().isdigit())
+                self.peak_mib = max(self.peak_mib, used)
+            except (OSError, subprocess.SubprocessError):
+                return
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(timeout=self.interval + 10)
+
+
+def peak_host_memory_mib() -> int:
+    """Peak RSS of this process or its largest finished child process, in MiB.
+
+    Covers the whole process lifetime, so in a warm Lambda it is the peak over
+    every invocation the instance has served.
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) // 1024  # ru_maxrss is KiB on Linux
+
+
+class StageMetrics:
+    """Context manager collecting one stage's telemetry for a scene.
+
+        with StageMetrics(scene_id, 'colmap', gpu=True) as metrics:
+            with metrics.phase('featureExtraction'):
+                ...
+            metrics.add_transfer('download', stats)
+
+    Telemetry never fails the stage: write errors are logged and swallowed.
+    """
+
+    def __init__(self, scene_id: str, stage: str, table_name: str = None, gpu: bool = False):
+        self.scene_id = scene_id
+        self.stage = stage
+        self.table_name = table_name or os.environ.get('SCENES_TABLE')
+        self.phases = {}
+        self.values = {'s3BytesDownloaded': 0, 's3BytesUploaded': 0}
+        self.units = {'s3BytesDownloaded': 'Bytes', 's3BytesUploaded': 'Bytes'}
+        self._gpu = GpuMemoryMonitor() if gpu else None
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.time()
+        if self._gpu:
+            self._gpu.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._gpu:
+            self._gpu.__exit__(exc_type, exc, tb)
+            self.record('peakGpuMemoryMiB', self._gpu.peak_mib, 'Megabytes')
+        self.record('wallSeconds', round(time.time() - self._start, 3), 'Seconds')
+        self.record('peakHostMemoryMiB', peak_host_memory_mib(), 'Megabytes')
+        try:
+            self.flush(failed=exc_type is not None)
+        except Exception as e:
+            print(f"WARNING: failed to record {self.stage} metrics: {e}")
+        return False
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a sub-phase; repeated phases accumulate."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.time() - start)
+
+    def add_phase(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def record(self, name: str, value, unit: str = 'None'):
+        self.values[name] = value
+        self.units[name] = unit
+
+    def add_bytes(self, direction: str, nbytes: int):
+        """Count bytes moved to ('upload') or from ('download') S3."""
+        key = 's3BytesUploaded' if direction == 'upload' else 's3BytesDownloaded'
+        self.values[key] += nbytes
+
+    def add_transfer(self, direction: str, stats):
+        """Count a shared.transfer TransferStats."""
+        self.add_bytes(direction, stats.bytes)
+
+    def as_dict(self, failed: bool = False) -> dict:
+        return {
+            **self.values,
+            'phases': {name: round(seconds, 3) for name, seconds in self.phases.items()},
+            'failed': failed,
+            'recordedAt': int(time.time()),
+        }
+
+    def flush(self, failed: bool = False):
+        summary = self.as_dict(failed)
+        print(f"{self.stage} metrics: {json.dumps(summary)}")
+
+        values = dict(self.values)
+        units = dict(self.units)
+        for name, seconds in self.phases.items():
+            values[f'{name}Seconds'] = round(seconds, 3)
+            units[f'{name}Seconds'] = 'Seconds'
+        emit_metrics(values, units, properties={'sceneId': self.scene_id, 'failed': failed}, Stage=self.stage)
+
+        if self.table_name:
+            table = dynamodb.Table(self.table_name)
+            # A nested SET needs the parent map to exist first; METRICS is a reserved word
+            table.update_item(
+                Key={'id': self.scene_id},
+                UpdateExpression='SET #m = if_not_exists(#m, :empty)',
+                ExpressionAttributeNames={'#m': 'metrics'},
+                ExpressionAttributeValues={':empty': {}}
+            )
+            table.update_item(
+                Key={'id': self.scene_id},
+                UpdateExpression='SET #m.#stage = :metrics',
+                ExpressionAttributeNames={'#m': 'metrics', '#stage': self.stage},
+                ExpressionAttributeValues={':metrics': json.loads(json.dumps(summary), parse_float=Decimal)}
+            )
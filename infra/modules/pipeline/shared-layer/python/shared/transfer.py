@@ -0,0 +1,238 @@
+"""Concurrent S3 transfers shared by the pipeline Lambdas and Batch containers."""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import (ClientError, ConnectionError as BotoConnectionError, HTTPClientError,
+                                 IncompleteReadError, ResponseStreamingError)
+from s3transfer.exceptions import RetriesExceededError
+
+MB = 1024 * 1024
+
+# Files transferred at once; each file may additionally use multipart threads
+MAX_WORKERS = int(os.environ.get('S3_TRANSFER_WORKERS', '16'))
+MAX_ATTEMPTS = int(os.environ.get('S3_TRANSFER_ATTEMPTS', '5'))
+
+# Worth retrying a whole file for; anything else (AccessDenied, NoSuchKey, 404...) fails at once
+TRANSIENT_ERROR_CODES = {
+    'Throttling', 'ThrottlingException', 'SlowDown', 'RequestTimeout', 'RequestTimeoutException',
+    'RequestLimitExceeded', 'InternalError', 'ServiceUnavailable',
+}
+TRANSIENT_EXCEPTIONS = (BotoConnectionError, HTTPClientError, IncompleteReadError, ResponseStreamingError,
+                        RetriesExceededError)
+
+DEFAULT_CONFIG = TransferConfig(
+    multipart_threshold=int(os.environ.get('S3_MULTIPART_THRESHOLD_MB', '16')) * MB,
+    multipart_chunksize=int(os.environ.get('S3_MULTIPART_CHUNKSIZE_MB', '16')) * MB,
+    max_concurrency=int(os.environ.get('S3_MULTIPART_CONCURRENCY', '8')),
+)
+
+
+def make_client(region_name: str = None, workers: int = MAX_WORKERS):
+    """S3 client with adaptive retries and a connection pool sized for `workers`.
+    
+    The region comes from boto3's own lookup (AWS_REGION / AWS_DEFAULT_REGION)
+    unless region_name is given.
+    """
+    return boto3.client(
+        's3',
+        region_name=region_name,
+        config=Config(
+            retries={'max_attempts': MAX_ATTEMPTS, 'mode': 'adaptive'},
+            max_pool_connections=workers + DEFAULT_CONFIG.max_concurrency,
+        ),
+    )
+
+
+class TransferStats:
+    """Thread-safe file/byte counters for one or more transfers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.files = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def add(self, nbytes: int):
+        with self._lock:
+            self.files += 1
+            self.bytes += nbytes
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            'files': self.files,
+            'bytes': self.bytes,
+            'seconds': round(self.seconds, 3),
+            'bytesPerSecond': round(self.bytes_per_second),
+        }
+
+    def __str__(self):
+        return (f"{self.files} files, {self.bytes / MB:.1f} MB in {self.seconds:.1f}s "
+                f"({self.bytes_per_second / MB:.1f} MB/s)")
+
+
+def is_transient(error: BaseException) -> bool:
+    """True for throttling, 5xx and connection errors, including ones boto3 re-wraps
+    (upload_file turns a ClientError into S3UploadFailedError)."""
+    while error is not None:
+        if isinstance(error, TRANSIENT_EXCEPTIONS):
+            return True
+        if isinstance(error, ClientError):
+            status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+            return error.response.get('Error', {}).get('Code') in TRANSIENT_ERROR_CODES or status >= 500
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def _with_retries(fn, *args):
+    """Retry a whole-file transfer on transient errors; botocore retries individual requests only."""
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == MAX_ATTEMPTS or not is_transient(e):
+                raise
+            delay = min(2 ** attempt * 0.25, 5)
+            print(f"S3 transfer failed ({e}), retrying in {delay:.1f}s ({attempt}/{MAX_ATTEMPTS})")
+            time.sleep(delay)
+
+
+def _run(jobs, fn, workers: int, stats: TransferStats, on_complete=None) -> TransferStats:
+    """Run fn(*job) for every job on a thread pool, consuming `jobs` lazily.
+
+    At most 2 * workers jobs are in flight, so `jobs` may be a generator that
+    yields files as they are produced. on_complete(*job) runs once after each
+    successful transfer, outside the retries, so its side effects never repeat.
+    """
+    stats = stats or TransferStats()
+    start = time.time()
+
+    def run(*job):
+        result = _with_retries(fn, *job)
+        if on_complete:
+            on_complete(*job)
+        return result
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        try:
+            for job in jobs:
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in done:
+                        stats.add(f.result())
+                pending.add(pool.submit(run, *job))
+            for f in pending:
+                stats.add(f.result())
+        finally:
+            stats.seconds += time.time() - start
+    return stats
+
+
+def list_keys(bucket: str, prefix: str, s3=None):
+    """Yield (key, size) for every object under prefix."""
+    s3 = s3 or make_client()
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            if not obj['Key'].endswith('/'):
+                yield obj['Key'], obj['Size']
+
+
+def download_files(bucket: str, pairs, s3=None, workers: int = MAX_WORKERS,
+                   config: TransferConfig = DEFAULT_CONFIG, stats: TransferStats = None,
+                   on_complete=None) -> TransferStats:
+    """Download (key, local_path) pairs concurrently.
+
+    on_complete(key, local_path) is called from the worker thread as soon as each
+    file lands, so callers can start processing it while the rest download.
+    """
+    s3 = s3 or make_client(workers=workers)
+
+    def download(key, local_path):
+        Path(local_path).parent.mkdir(parents=True, exist_ok=True)
+        s3.download_file(bucket, key, str(local_path), Config=config)
+        return os.path.getsize(local_path)
+
+    return _run(pairs, download, workers, stats, on_complete)
+
+
+def upload_files(bucket: str, pairs, s3=None, workers: int = MAX_WORKERS,
+                 config: TransferConfig = DEFAULT_CONFIG, stats: TransferStats = None,
+                 extra_args: dict = None) -> TransferStats:
+    """Upload (local_path, key) pairs concurrently. `pairs` may be a generator."""
+    s3 = s3 or make_client(workers=workers)
+
+    def upload(local_path, key):
+        s3.upload_file(str(local_path), bucket, key, Config=config, ExtraArgs=extra_args)
+        return os.path.getsize(local_path)
+
+    return _run(pairs, upload, workers, stats)
+
+
+def download_prefix(bucket: str, prefix: str, dest_dir, s3=None, key_to_path=None, **kwargs) -> TransferStats:
+    """Download every object under prefix into dest_dir.
+
+    key_to_path maps the key (relative to prefix) to a local path, or None to
+    skip it; by default the relative key is joined onto dest_dir.
+    """
+    s3 = s3 or make_client()
+    dest_dir = Path(dest_dir)
+    key_to_path = key_to_path or (lambda rel: dest_dir / rel)
+
+    def pairs():
+        for key, _ in list_keys(bucket, prefix, s3):
+            local_path = key_to_path(key[len(prefix):])
+            if local_path is not None:
+                yield key, local_path
+
+    return download_files(bucket, pairs(), s3=s3, **kwargs)
+
+
+def upload_dir(local_dir, bucket: str, prefix: str, s3=None, **kwargs) -> TransferStats:
+    """Upload every file under local_dir to prefix, keeping relative paths."""
+    local_dir = Path(local_dir)
+    pairs = ((p, f'{prefix}{p.relative_to(local_dir).as_posix()}')
+             for p in sorted(local_dir.rglob('*')) if p.is_file())
+    return upload_files(bucket, pairs, s3=s3, **kwargs)
+
+
+def copy_prefix(bucket: str, src_prefix: str, dst_prefix: str, s3=None, workers: int = MAX_WORKERS,
+                config: TransferConfig = DEFAULT_CONFIG, stats: TransferStats = None) -> TransferStats:
+    """Server-side copy of every object under src_prefix to dst_prefix."""
+    s3 = s3 or make_client(workers=workers)
+
+    def copy(key, size):
+        s3.copy({'Bucket': bucket, 'Key': key}, bucket, dst_prefix + key[len(src_prefix):], Config=config)
+        return size
+
+    return _run(list_keys(bucket, src_prefix, s3), copy, workers, stats)
+
+
+def delete_prefix(bucket: str, prefix: str, s3=None) -> int:
+    """Delete every object under prefix, one delete_objects call per listed page of 1000.
+
+    Raises if S3 reports any key it failed to delete; returns the count.
+    """
+    s3 = s3 or make_client()
+    deleted = 0
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, PaginationConfig={'PageSize': 1000}):
+        keys = [{'Key': obj['Key']} for obj in page.get('Contents', [])]
+        if not keys:
+            continue
+        response = s3.delete_objects(Bucket=bucket, Delete={'Objects': keys, 'Quiet': True})
+        if response.get('Errors'):
+            error = response['Errors'][0]
+            raise RuntimeError(f"Failed to delete {len(response['Errors'])} objects under {prefix}: "
+                               f"{error.get('Key')} ({error.get('Code')})")
+        deleted += len(keys)
+    return deleted
@@ -19,12 +19,27 @@ resource "aws_s3_bucket_cors_configuration" "assets" {
   bucket = aws_s3_bucket.assets.id
   cors_rule {
     allowed_headers = ["*"]
-    allowed_methods = ["GET", "PUT", "POST"]
+    allowed_methods = ["GET", "HEAD", "PUT", "POST"]
     allowed_origins = ["*"]
+    # Range-request clients need to read these on cross-origin responses
+    expose_headers  = ["ETag", "Content-Range", "Accept-Ranges", "Content-Length"]
     max_age_seconds = 3000
   }
 }
 
+resource "aws_s3_bucket_lifecycle_configuration" "assets" {
+  bucket = aws_s3_bucket.assets.id
+  rule {
+    id     = "abort-incomplete-multipart-uploads"
+    status = "Enabled"
+    filter {}
+    # Resumable video uploads keep their parts until completed or aborted
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 7
+    }
+  }
+}
+
 resource "aws_dynamodb_table" "scenes" {
   name         = "${var.project}-scenes-${var.environment}"
   billing_mode = "PAY_PER_REQUEST"
@@ -43,17 +58,26 @@ resource "aws_dynamodb_table" "scenes" {
     name = "status"
     type = "S"
   }
+  attribute {
+    name = "createdAt"
+    type = "N"
+  }
 
+  # Newest-first listings; each projects only the fields its list view renders
   global_secondary_index {
-    name            = "userId-index"
-    hash_key        = "userId"
-    projection_type = "ALL"
+    name               = "userId-createdAt-index"
+    hash_key           = "userId"
+    range_key          = "createdAt"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["name", "status", "processingStage", "inputType", "completedAt", "thumbnailKey", "version"]
   }
 
   global_secondary_index {
-    name            = "status-index"
-    hash_key        = "status"
-    projection_type = "ALL"
+    name               = "status-createdAt-index"
+    hash_key           = "status"
+    range_key          = "createdAt"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["name", "thumbnailKey", "gaussianCount"]
   }
 }
 
@@ -2,26 +2,94 @@ import { config } from '../config';
 
 const API = config.apiUrl;
 
+export type SfmMapper = 'incremental' | 'global';
+
+export type Compression = 'none' | 'quantized' | 'quantized-sh';
+
+export interface SplatLod {
+  percent: number;
+  key: string;
+  count: number;
+  bytes: number;
+}
+
 export interface Scene {
   id: string;
   name: string;
   userId: string;
   description?: string;
-  status: 'pending' | 'processing' | 'completed' | 'failed';
+  status: 'pending' | 'processing' | 'completed' | 'failed' | 'deleting';
   processingStage?: 'pending' | 'extracting_frames' | 'running_colmap' | 'training_3dgs' | 'converting' | 'completed' | 'failed';
   inputType?: 'video' | 'images';
   error?: string;
-  settings?: { iterations?: number; fps?: number; densifyUntilIter?: number; densificationInterval?: number };
+  settings?: { iterations?: number; fps?: number; maxFrames?: number; densifyUntilIter?: number; densificationInterval?: number; maxGaussians?: number; sfmMapper?: SfmMapper; resumeFrom?: '' | 'latest'; compression?: Compression; chunkedSplat?: boolean; pruneMinOpacity?: number; pruneScaleSigma?: number; pruneOutliers?: boolean };
   thumbnailKey: string;
   splatKey: string;
   videoKey?: string;
   createdAt: number;
   completedAt?: number;
   gaussianCount?: number;
+  checkpointStep?: number;
+  metrics?: Record<string, StageMetrics>;
+  trainingProgress?: TrainingProgress;
+  lods?: SplatLod[];
+  compressedSplat?: { key?: string; format?: string; bytes?: number };
+  pruneStats?: { before?: number; after?: number; opacity?: number; scale?: number; outliers?: number };
+  chunkedSplat?: { key?: string; format?: string; chunkSize?: number; chunks?: number; bytes?: number };
+  version?: number;
+}
+
+/** Live progress written by the training container while ns-train runs. */
+export interface TrainingProgress {
+  step: number;
+  totalSteps: number;
+  percent: number;
+  itersPerSecond: number;
+  etaSeconds?: number | null;
+  loss?: number;
+  updatedAt: number;
+}
+
+/** Telemetry for one pipeline stage, keyed by stage name on Scene.metrics. */
+export interface StageMetrics {
+  wallSeconds?: number;
+  phases?: Record<string, number>;
+  peakHostMemoryMiB?: number;
+  peakGpuMemoryMiB?: number;
+  s3BytesDownloaded?: number;
+  s3BytesUploaded?: number;
+  failed?: boolean;
+  recordedAt?: number;
+  [name: string]: unknown;
+}
+
+export interface SceneEvent {
+  changed: boolean;
+  version: number;
+  scene?: Scene;
+}
+
+export interface MySceneEvents {
+  changed: boolean;
+  scenes: Scene[];
+  deleted: string[];
+}
+
+export interface ScenePage {
+  items: Scene[];
+  nextToken: string | null;
+}
+
+function pageQuery(nextToken?: string | null, limit?: number): string {
+  const params = new URLSearchParams();
+  if (limit) params.set('limit', String(limit));
+  if (nextToken) params.set('nextToken', nextToken);
+  const qs = params.toString();
+  return qs ? `?${qs}` : '';
 }
 
-export async function fetchScenes(): Promise<Scene[]> {
-  const res = await fetch(`${API}/scenes`);
+export async function fetchScenes(nextToken?: string | null, limit?: number): Promise<ScenePage> {
+  const res = await fetch(`${API}/scenes${pageQuery(nextToken, limit)}`);
   if (!res.ok) throw new Error('Failed to fetch scenes');
   return res.json();
 }
@@ -32,33 +100,97 @@ export async function fetchScene(id: string): Promise<Scene> {
   return res.json();
 }
 
-export async function fetchMyScenes(token: string): Promise<Scene[]> {
-  const res = await fetch(`${API}/scenes/mine`, {
+// Long-polls until the scene's version passes `since`; null once the scene is gone
+export async function fetchSceneEvents(id: string, since: number, signal?: AbortSignal): Promise<SceneEvent | null> {
+  const res = await fetch(`${API}/scenes/${id}/events?since=${since}`, { signal });
+  if (res.status === 404) return null;
+  if (!res.ok) throw new Error('Failed to fetch scene events');
+  return res.json();
+}
+
+// One long-poll for several of the caller's scenes; `since` maps scene id to the last seen version
+export async function fetchMySceneEvents(
+  token: string,
+  since: Record<string, number>,
+  from: number,
+  signal?: AbortSignal
+): Promise<MySceneEvents> {
+  const pairs = Object.entries(since).map(([id, version]) => `${id}:${version}`).join(',');
+  const res = await fetch(`${API}/scenes/mine/events?since=${encodeURIComponent(pairs)}&from=${from}`, {
+    headers: { Authorization: `Bearer ${token}` },
+    signal
+  });
+  if (!res.ok) throw new Error('Failed to fetch scene events');
+  return res.json();
+}
+
+export async function fetchMyScenes(token: string, nextToken?: string | null, limit?: number): Promise<ScenePage> {
+  const res = await fetch(`${API}/scenes/mine${pageQuery(nextToken, limit)}`, {
     headers: { Authorization: `Bearer ${token}` }
   });
   if (!res.ok) throw new Error('Failed to fetch jobs');
   return res.json();
 }
 
-export async function getUploadUrl(
-  filename: string,
-  contentType: string,
-  token: string
-): Promise<{ sceneId: string; uploadUrl: string; key: string }> {
-  const res = await fetch(`${API}/upload`, {
+export interface UploadPart {
+  partNumber: number;
+  url: string;
+}
+
+// Videos above the server's multipart threshold come back with per-part URLs
+// instead of a single uploadUrl
+export interface VideoUpload {
+  sceneId: string;
+  key: string;
+  uploadUrl?: string;
+  uploadId?: string;
+  partSize?: number;
+  parts?: UploadPart[];
+}
+
+export interface MultipartStatus {
+  partSize: number;
+  uploaded: { partNumber: number; etag: string; size: number }[];
+  parts: UploadPart[];
+}
+
+async function postUpload<T>(path: string, body: unknown, token: string, error: string): Promise<T> {
+  const res = await fetch(`${API}${path}`, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
       Authorization: `Bearer ${token}`
     },
-    body: JSON.stringify({ filename, contentType })
+    body: JSON.stringify(body)
   });
-  if (!res.ok) throw new Error('Failed to get upload URL');
-  return res.json();
+  if (!res.ok) throw new Error(error);
+  return res.status === 204 ? (undefined as T) : res.json();
+}
+
+export async function getUploadUrl(
+  filename: string,
+  contentType: string,
+  size: number,
+  token: string
+): Promise<VideoUpload> {
+  return postUpload('/upload', { filename, contentType, size }, token, 'Failed to get upload URL');
+}
+
+// Lists the parts S3 already has and re-signs the missing ones (at the size given when the upload started)
+export async function resumeUpload(key: string, uploadId: string, token: string): Promise<MultipartStatus> {
+  return postUpload('/upload/parts', { key, uploadId }, token, 'Failed to resume upload');
+}
+
+export async function completeUpload(key: string, uploadId: string, token: string): Promise<void> {
+  await postUpload('/upload/complete', { key, uploadId }, token, 'Failed to complete upload');
+}
+
+export async function abortUpload(key: string, uploadId: string, token: string): Promise<void> {
+  await postUpload('/upload/abort', { key, uploadId }, token, 'Failed to abort upload');
 }
 
 export async function getImageUploadUrls(
-  files: { filename: string; contentType: string }[],
+  files: { filename: string; contentType: string; size: number }[],
   token: string
 ): Promise<{ sceneId: string; uploads: { filename: string; uploadUrl: string; key: string }[] }> {
   const res = await fetch(`${API}/upload`, {
@@ -89,16 +221,34 @@ export async function createScene(
   return res.json();
 }
 
+export interface JobRequest {
+  sceneId: string;
+  inputType?: 'video' | 'images';
+  videoKey?: string;
+  fps?: number;
+  maxFrames?: number;
+  iterations?: number;
+  densifyUntilIter?: number;
+  densificationInterval?: number;
+  maxGaussians?: number;
+  sfmMapper?: SfmMapper;
+  resumeFrom?: '' | 'latest';
+  compression?: Compression;
+  chunkedSplat?: boolean;
+  pruneMinOpacity?: number;
+  pruneScaleSigma?: number;
+  pruneOutliers?: boolean;
+}
+
+export interface BatchJobResult {
+  sceneId: string;
+  status: 'processing' | 'rejected' | 'failed';
+  executionArn?: string;
+  error?: string;
+}
+
 export async function startProcessing(
-  data: { 
-    sceneId: string; 
-    inputType?: 'video' | 'images';
-    videoKey?: string;
-    fps?: number;
-    iterations?: number;
-    densifyUntilIter?: number;
-    densificationInterval?: number;
-  },
+  data: JobRequest,
   token: string
 ): Promise<{ executionArn: string }> {
   const res = await fetch(`${API}/jobs`, {
@@ -113,6 +263,23 @@ export async function startProcessing(
   return res.json();
 }
 
+// Creates missing scenes and starts up to 100 jobs; 207 means some entries failed
+export async function startBatch(
+  jobs: (JobRequest & { name?: string })[],
+  token: string
+): Promise<{ started: number; failed: number; results: BatchJobResult[] }> {
+  const res = await fetch(`${API}/jobs/batch`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Authorization: `Bearer ${token}`
+    },
+    body: JSON.stringify({ jobs })
+  });
+  if (res.status !== 202 && res.status !== 207) throw new Error('Failed to start batch');
+  return res.json();
+}
+
 export async function deleteScene(id: string, token: string): Promise<void> {
   const res = await fetch(`${API}/scenes/${id}`, {
     method: 'DELETE',
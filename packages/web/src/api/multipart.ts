@@ -0,0 +1,75 @@
+import { abortUpload, resumeUpload, UploadPart, VideoUpload } from './client';
+
+const PART_CONCURRENCY = 4;
+const MAX_ROUNDS = 3;
+
+function putBlob(url: string, body: Blob, onProgress: (loaded: number) => void, contentType?: string): Promise<void> {
+  return new Promise((resolve, reject) => {
+    const xhr = new XMLHttpRequest();
+    xhr.upload.onprogress = (e) => onProgress(e.loaded);
+    xhr.onload = () => xhr.status >= 200 && xhr.status < 300 ? resolve() : reject(new Error(`Upload failed: ${xhr.status}`));
+    xhr.onerror = () => reject(new Error('Upload failed'));
+    xhr.open('PUT', url);
+    if (contentType) xhr.setRequestHeader('Content-Type', contentType);
+    xhr.send(body);
+  });
+}
+
+/**
+ * Upload a video from getUploadUrl, reporting overall progress as 0-100.
+ *
+ * Multipart uploads send PART_CONCURRENCY parts at once. Failed parts are retried
+ * with fresh URLs from /upload/parts, so a dropped connection only costs the
+ * parts in flight. The caller completes the upload; it is aborted here on failure.
+ */
+export async function uploadVideo(
+  file: File,
+  upload: VideoUpload,
+  token: string,
+  onProgress: (percent: number) => void
+): Promise<void> {
+  if (!upload.uploadId) {
+    await putBlob(upload.uploadUrl!, file, (loaded) => onProgress(Math.round((loaded / file.size) * 100)), file.type);
+    return;
+  }
+
+  const uploadId = upload.uploadId;
+  const partSize = upload.partSize!;
+  const loaded = new Map<number, number>();
+  const report = () => {
+    const sent = [...loaded.values()].reduce((sum, n) => sum + n, 0);
+    onProgress(Math.round((sent / file.size) * 100));
+  };
+
+  let pending: UploadPart[] = upload.parts!;
+  try {
+    for (let round = 0; pending.length > 0; round++) {
+      if (round > 0) {
+        if (round >= MAX_ROUNDS) throw new Error('Upload failed after retries');
+        const status = await resumeUpload(upload.key, uploadId, token);
+        status.uploaded.forEach((p) => loaded.set(p.partNumber, p.size));
+        pending = status.parts;
+      }
+
+      const failed: UploadPart[] = [];
+      const queue = [...pending];
+      const worker = async () => {
+        for (let part = queue.shift(); part; part = queue.shift()) {
+          const start = (part.partNumber - 1) * partSize;
+          const blob = file.slice(start, Math.min(start + partSize, file.size));
+          try {
+            await putBlob(part.url, blob, (n) => { loaded.set(part!.partNumber, n); report(); });
+          } catch {
+            loaded.delete(part.partNumber);
+            failed.push(part);
+          }
+        }
+      };
+      await Promise.all(Array.from({ length: PART_CONCURRENCY }, worker));
+      pending = failed;
+    }
+  } catch (error) {
+    await abortUpload(upload.key, uploadId, token).catch(() => undefined);
+    throw error;
+  }
+}
@@ -1,6 +1,7 @@
 import { useState, useCallback, useRef } from 'react';
 import { fetchAuthSession } from 'aws-amplify/auth';
-import { getUploadUrl, getImageUploadUrls, createScene, startProcessing } from '../../api/client';
+import { getUploadUrl, getImageUploadUrls, completeUpload, createScene, startProcessing, SfmMapper, Compression } from '../../api/client';
+import { uploadVideo } from '../../api/multipart';
 
 type InputType = 'video' | 'images';
 
@@ -15,13 +16,18 @@ interface UploadFormProps {
 
 const DEFAULTS = {
   fps: 3,
+  maxFrames: 100,
   iterations: 7000,
   densifyUntilIter: 5000,
-  densificationInterval: 100
+  densificationInterval: 100,
+  maxGaussians: 0,
+  sfmMapper: 'incremental' as SfmMapper,
+  compression: 'none' as Compression
 };
 
 const IMAGE_ACCEPT = '.jpg,.jpeg,.png';
 const MAX_IMAGE_SIZE = 50 * 1024 * 1024;
+const MAX_VIDEO_SIZE = 2 * 1024 * 1024 * 1024; // upload.MAX_VIDEO_SIZE
 const UPLOAD_CONCURRENCY = 5;
 
 export default function UploadForm({ onUploadStart }: UploadFormProps) {
@@ -50,7 +56,7 @@ export default function UploadForm({ onUploadStart }: UploadFormProps) {
       handleImageFiles(e.dataTransfer.files);
     } else {
       const droppedFile = e.dataTransfer.files[0];
-      if (droppedFile?.type.startsWith('video/')) setFile(droppedFile);
+      if (droppedFile?.type.startsWith('video/') && droppedFile.size <= MAX_VIDEO_SIZE) setFile(droppedFile);
     }
   }, [inputType, handleImageFiles]);
 
@@ -70,7 +76,7 @@ export default function UploadForm({ onUploadStart }: UploadFormProps) {
       const token = session.tokens?.idToken?.toString()!;
 
       if (inputType === 'images') {
-        const files = imageFiles.map(f => ({ filename: f.name, contentType: f.type || 'image/jpeg' }));
+        const files = imageFiles.map(f => ({ filename: f.name, contentType: f.type || 'image/jpeg', size: f.size }));
         const { sceneId, uploads } = await getImageUploadUrls(files, token);
 
         onUploadStart({ sceneId, status: 'uploading', progress: 0, inputType: 'images' });
@@ -79,11 +85,12 @@ export default function UploadForm({ onUploadStart }: UploadFormProps) {
         let completed = 0;
         const total = uploads.length;
         const queue = uploads.map((u, i) => async () => {
-          await fetch(u.uploadUrl, {
+          const res = await fetch(u.uploadUrl, {
             method: 'PUT',
             body: imageFiles[i],
             headers: { 'Content-Type': imageFiles[i].type || 'image/jpeg' }
           });
+          if (!res.ok) throw new Error(`Upload failed: ${res.status}`);
           completed++;
           onUploadStart({ sceneId, status: 'uploading', progress: Math.round((completed / total) * 100), inputType: 'images' });
         });
@@ -97,22 +104,14 @@ export default function UploadForm({ onUploadStart }: UploadFormProps) {
         await startProcessing({ sceneId, inputType: 'images', ...settings }, token);
         onUploadStart({ sceneId, status: 'processing', progress: 100, inputType: 'images' });
       } else {
-        const { sceneId, uploadUrl, key } = await getUploadUrl(file!.name, file!.type, token);
+        const upload = await getUploadUrl(file!.name, file!.type, file!.size, token);
+        const { sceneId, key } = upload;
         onUploadStart({ sceneId, status: 'uploading', progress: 0, inputType: 'video' });
 
-        await new Promise<void>((resolve, reject) => {
-          const xhr = new XMLHttpRequest();
-          xhr.upload.onprogress = (e) => {
-            if (e.lengthComputable) {
-              onUploadStart({ sceneId, status: 'uploading', progress: Math.round((e.loaded / e.total) * 100), inputType: 'video' });
-            }
-          };
-          xhr.onload = () => xhr.status >= 200 && xhr.status < 300 ? resolve() : reject(new Error(`Upload failed: ${xhr.status}`));
-          xhr.onerror = () => reject(new Error('Upload failed'));
-          xhr.open('PUT', uploadUrl);
-          xhr.setRequestHeader('Content-Type', file!.type);
-          xhr.send(file);
+        await uploadVideo(file!, upload, token, (progress) => {
+          onUploadStart({ sceneId, status: 'uploading', progress, inputType: 'video' });
         });
+        if (upload.uploadId) await completeUpload(key, upload.uploadId, token);
         await createScene({ sceneId, name, videoKey: key, inputType: 'video' }, token);
         await startProcessing({ sceneId, inputType: 'video', videoKey: key, ...settings }, token);
         onUploadStart({ sceneId, status: 'processing', progress: 100, inputType: 'video' });
@@ -199,7 +198,8 @@ export default function UploadForm({ onUploadStart }: UploadFormProps) {
               if (inputType === 'images') {
                 if (e.target.files) handleImageFiles(e.target.files);
               } else {
-                setFile(e.target.files?.[0] || null);
+                const selected = e.target.files?.[0];
+                setFile(selected && selected.size <= MAX_VIDEO_SIZE ? selected : null);
               }
               e.target.value = '';
             }}
@@ -245,7 +245,7 @@ export default function UploadForm({ onUploadStart }: UploadFormProps) {
                 </p>
                 <p className="text-text-muted text-sm mt-1">
                   {inputType === 'video'
-                    ? 'MP4, MOV, or WebM • 30-60 seconds recommended'
+                    ? 'MP4, MOV, or WebM • 2GB max • 30-60 seconds recommended'
                     : 'JPG or PNG • 50MB max per image • 20+ images recommended'}
                 </p>
               </div>
@@ -296,6 +296,19 @@ export default function UploadForm({ onUploadStart }: UploadFormProps) {
                   <p className="text-text-muted text-xs mt-1">Frames extracted per second</p>
                 </div>
               )}
+              {inputType === 'video' && (
+                <div>
+                  <label className="label text-xs">Max Frames</label>
+                  <input
+                    type="number"
+                    value={settings.maxFrames}
+                    onChange={(e) => setSettings(s => ({ ...s, maxFrames: Number(e.target.value) }))}
+                    className="input text-sm"
+                    min={20} max={500} step={10}
+                  />
+                  <p className="text-text-muted text-xs mt-1">Sharpest keyframes kept</p>
+                </div>
+              )}
               <div>
                 <label className="label text-xs">Training Iterations</label>
                 <input
@@ -329,6 +342,42 @@ export default function UploadForm({ onUploadStart }: UploadFormProps) {
                 />
                 <p className="text-text-muted text-xs mt-1">Iterations between densification</p>
               </div>
+              <div>
+                <label className="label text-xs">Max Gaussians</label>
+                <input
+                  type="number"
+                  value={settings.maxGaussians}
+                  onChange={(e) => setSettings(s => ({ ...s, maxGaussians: Number(e.target.value) }))}
+                  className="input text-sm"
+                  min={0} max={5000000} step={100000}
+                />
+                <p className="text-text-muted text-xs mt-1">Caps splat size and GPU memory (0 = no cap)</p>
+              </div>
+              <div>
+                <label className="label text-xs">SfM Mapper</label>
+                <select
+                  value={settings.sfmMapper}
+                  onChange={(e) => setSettings(s => ({ ...s, sfmMapper: e.target.value as SfmMapper }))}
+                  className="input text-sm"
+                >
+                  <option value="incremental">Incremental (COLMAP)</option>
+                  <option value="global">Global (GLOMAP)</option>
+                </select>
+                <p className="text-text-muted text-xs mt-1">Global is faster on large captures</p>
+              </div>
+              <div>
+                <label className="label text-xs">Compressed Output</label>
+                <select
+                  value={settings.compression}
+                  onChange={(e) => setSettings(s => ({ ...s, compression: e.target.value as Compression }))}
+                  className="input text-sm"
+                >
+                  <option value="none">Off</option>
+                  <option value="quantized">Quantized</option>
+                  <option value="quantized-sh">Quantized + SH</option>
+                </select>
+                <p className="text-text-muted text-xs mt-1">Smaller download for the viewer</p>
+              </div>
             </div>
             <button
               type="button"
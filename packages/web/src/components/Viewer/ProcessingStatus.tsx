@@ -1,7 +1,10 @@
+import type { TrainingProgress } from '../../api/client';
+
 interface ProcessingStatusProps {
   stage?: string;
   error?: string;
   inputType?: 'video' | 'images';
+  progress?: TrainingProgress;
   onViewSplat: () => void;
 }
 
@@ -18,6 +21,12 @@ const IMAGE_STAGES = [
   { key: 'converting', label: 'Convert', description: 'Converting to viewable format...' },
 ];
 
+function formatEta(seconds: number): string {
+  if (seconds < 60) return 'under a minute';
+  const minutes = Math.round(seconds / 60);
+  return minutes < 60 ? `${minutes} min` : `${Math.floor(minutes / 60)} h ${minutes % 60} min`;
+}
+
 const StageIcon = ({ stage, className }: { stage: string; className?: string }) => {
   const icons: Record<string, JSX.Element> = {
     extracting_frames: <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M7 4v16M17 4v16M3 8h4m10 0h4M3 12h18M3 16h4m10 0h4" />,
@@ -32,7 +41,7 @@ const StageIcon = ({ stage, className }: { stage: string; className?: string })
   );
 };
 
-export default function ProcessingStatus({ stage, error, inputType = 'video', onViewSplat }: ProcessingStatusProps) {
+export default function ProcessingStatus({ stage, error, inputType = 'video', progress, onViewSplat }: ProcessingStatusProps) {
   const STAGES = inputType === 'images' ? IMAGE_STAGES : VIDEO_STAGES;
   const currentIndex = STAGES.findIndex(s => s.key === stage);
   const isCompleted = stage === 'completed';
@@ -79,6 +88,7 @@ export default function ProcessingStatus({ stage, error, inputType = 'video', on
 
   const resolvedIndex = currentIndex === -1 ? 0 : currentIndex;
   const currentStage = STAGES[resolvedIndex];
+  const training = stage === 'training_3dgs' && progress ? progress : undefined;
 
   return (
     <div className="flex flex-col items-center justify-center py-8 gap-6 w-full px-8">
@@ -125,7 +135,20 @@ export default function ProcessingStatus({ stage, error, inputType = 'video', on
       <div className="text-center">
         <p className="text-text-primary font-medium mb-2">{currentStage.label}</p>
         <p className="text-text-secondary text-sm">{currentStage.description}</p>
-        <p className="text-text-muted text-xs mt-2">This may take several minutes.</p>
+        {training ? (
+          <div className="w-72 mx-auto mt-3">
+            <div className="h-1.5 bg-surface-border rounded-full overflow-hidden">
+              <div className="h-full bg-accent-cyan transition-all duration-700 ease-out" style={{ width: `${training.percent}%` }} />
+            </div>
+            <p className="text-text-muted text-xs mt-2 font-mono">
+              Step {training.step.toLocaleString()} / {training.totalSteps.toLocaleString()} · {training.itersPerSecond} it/s
+              {training.etaSeconds != null && ` · ${formatEta(training.etaSeconds)} left`}
+              {training.loss != null && ` · loss ${training.loss.toFixed(4)}`}
+            </p>
+          </div>
+        ) : (
+          <p className="text-text-muted text-xs mt-2">This may take several minutes.</p>
+        )}
         <div className="flex items-center justify-center gap-1.5 mt-3">
           <span className="w-1.5 h-1.5 rounded-full bg-accent-cyan animate-bounce [animation-delay:0ms]" />
           <span className="w-1.5 h-1.5 rounded-full bg-accent-cyan animate-bounce [animation-delay:150ms]" />
@@ -1,14 +1,34 @@
 import { useEffect, useRef, useState } from 'react';
 import * as THREE from 'three';
-import { SplatMesh } from '@sparkjsdev/spark';
+import { SplatMesh, SplatFileType } from '@sparkjsdev/spark';
 import { OrbitControls } from 'three/examples/jsm/controls/OrbitControls.js';
 import { config } from '../../config';
+import type { SplatLod } from '../../api/client';
+import { decodeSplatc } from './splatc';
 
 interface SplatViewerProps {
   splatKey: string;
+  lods?: SplatLod[];
+  compressedKey?: string;
 }
 
-export default function SplatViewer({ splatKey }: SplatViewerProps) {
+async function createSplat(key: string): Promise<SplatMesh> {
+  const url = `${config.cdnUrl}/${key}`;
+  if (!key.endsWith('.splatc')) return new SplatMesh({ url });
+  const res = await fetch(url);
+  if (!res.ok) throw new Error(`Failed to fetch ${key}`);
+  return new SplatMesh({ fileBytes: decodeSplatc(await res.arrayBuffer()), fileType: SplatFileType.SPLAT });
+}
+
+// Bytes [start, end) of key; a server that ignores Range sends the whole file
+async function fetchRange(key: string, start: number, end: number): Promise<Uint8Array> {
+  const res = await fetch(`${config.cdnUrl}/${key}`, { headers: { Range: `bytes=${start}-${end - 1}` } });
+  if (!res.ok) throw new Error(`Failed to fetch ${key}`);
+  const body = new Uint8Array(await res.arrayBuffer());
+  return res.status === 206 ? body : body.slice(start, end);
+}
+
+export default function SplatViewer({ splatKey, lods, compressedKey }: SplatViewerProps) {
   const containerRef = useRef<HTMLDivElement>(null);
   const rendererRef = useRef<THREE.WebGLRenderer | null>(null);
   const [loading, setLoading] = useState(true);
@@ -30,13 +50,58 @@ export default function SplatViewer({ splatKey }: SplatViewerProps) {
     const controls = new OrbitControls(camera, renderer.domElement);
     controls.enableDamping = true;
 
-    const splatUrl = `${config.cdnUrl}/${splatKey}`;
+    // Coarse levels first: each one replaces the previous once it has loaded.
+    // LOD levels are byte prefixes of one importance-ordered file, so each step
+    // only fetches the bytes past the previous level. The full level comes from
+    // the compressed file when one was produced.
+    const sorted = lods?.length ? [...lods].sort((a, b) => a.percent - b.percent) : [];
+    const prefixes = compressedKey ? sorted.filter(l => l.percent < 100) : sorted;
+    const loaders: (() => Promise<SplatMesh>)[] = [];
+    let head = new Uint8Array(0);
+    let headKey = '';
+    for (const lod of prefixes) {
+      loaders.push(async () => {
+        const start = lod.key === headKey ? head.length : 0;
+        const rest = await fetchRange(lod.key, start, lod.bytes);
+        const next = new Uint8Array(start + rest.length);
+        next.set(head.subarray(0, start));
+        next.set(rest, start);
+        head = next;
+        headKey = lod.key;
+        return new SplatMesh({ fileBytes: head.slice(), fileType: SplatFileType.SPLAT });
+      });
+    }
+    if (compressedKey || !prefixes.length) {
+      loaders.push(() => createSplat(compressedKey ?? splatKey));
+    }
+    let current: SplatMesh | null = null;
+    let disposed = false;
 
-    const splat = new SplatMesh({ url: splatUrl });
-    // NerfStudio exports with Z-up; rotate -90° around X to convert to Three.js Y-up
-    splat.rotation.x = -Math.PI / 2;
-    scene.add(splat);
-    setLoading(false);
+    const loadLevels = async () => {
+      for (const load of loaders) {
+        const splat = await load();
+        // NerfStudio exports with Z-up; rotate -90° around X to convert to Three.js Y-up
+        splat.rotation.x = -Math.PI / 2;
+        await splat.initialized;
+        if (disposed) {
+          splat.dispose();
+          return;
+        }
+        scene.add(splat);
+        if (current) {
+          scene.remove(current);
+          current.dispose();
+        }
+        current = splat;
+        setLoading(false);
+      }
+    };
+    loadLevels().catch((e) => {
+      if (!disposed) {
+        setError(e instanceof Error ? e.message : String(e));
+        setLoading(false);
+      }
+    });
 
     let animationId: number;
     const animate = () => {
@@ -54,6 +119,8 @@ export default function SplatViewer({ splatKey }: SplatViewerProps) {
     window.addEventListener('resize', handleResize);
 
     return () => {
+      disposed = true;
+      current?.dispose();
       cancelAnimationFrame(animationId);
       window.removeEventListener('resize', handleResize);
       controls.dispose();
@@ -61,7 +128,7 @@ export default function SplatViewer({ splatKey }: SplatViewerProps) {
       container.removeChild(renderer.domElement);
       rendererRef.current = null;
     };
-  }, [splatKey]);
+  }, [splatKey, lods, compressedKey]);
 
   return (
     <div ref={containerRef} className="w-full h-full min-h-viewer bg-black rounded-lg relative">
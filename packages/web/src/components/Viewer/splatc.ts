@@ -0,0 +1,70 @@
+// Decoder for the compressed .splatc format written by the convert Lambda.
+// Output is the 32-byte-per-Gaussian .splat layout the viewer already renders.
+
+const MAGIC = 'SPLC';
+const VERSION = 1;
+const HEADER_BYTES = 36;
+const SPLAT_BYTES = 32;
+
+export function decodeSplatc(buffer: ArrayBuffer): Uint8Array {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== MAGIC) throw new Error('Not a compressed splat file');
+  const version = view.getUint16(4, true);
+  if (version !== VERSION) throw new Error(`Unsupported compressed splat version ${version}`);
+
+  const count = view.getUint32(8, true);
+  const chunk = view.getUint32(12, true);
+  const scaleMin = view.getFloat32(20, true);
+  const scaleMax = view.getFloat32(24, true);
+  const numChunks = Math.ceil(count / chunk);
+
+  let offset = HEADER_BYTES;
+  const bounds = new Float32Array(buffer.slice(offset, offset + numChunks * 24));
+  offset += numChunks * 24;
+  const positions = new Uint16Array(buffer.slice(offset, offset + count * 6));
+  offset += count * 6;
+  const scales = new Uint8Array(buffer, offset, count * 3);
+  offset += count * 3;
+  const rotations = new Uint32Array(buffer.slice(offset, offset + count * 4));
+  offset += count * 4;
+  const rgba = new Uint8Array(buffer, offset, count * 4);
+  // Optional SH coefficients follow; the .splat layout has no room for them
+
+  const out = new Uint8Array(count * SPLAT_BYTES);
+  const floats = new Float32Array(out.buffer);
+  const scaleStep = (scaleMax - scaleMin) / 255;
+  const rest = [0, 0, 0];
+  const q = [0, 0, 0, 0];
+
+  for (let i = 0; i < count; i++) {
+    const b = Math.floor(i / chunk) * 6;
+    const f = i * 8;
+    for (let a = 0; a < 3; a++) {
+      const lo = bounds[b + a];
+      floats[f + a] = lo + (positions[i * 3 + a] / 65535) * (bounds[b + 3 + a] - lo);
+      floats[f + 3 + a] = Math.exp(scaleMin + scales[i * 3 + a] * scaleStep);
+    }
+
+    const o = i * SPLAT_BYTES;
+    out.set(rgba.subarray(i * 4, i * 4 + 4), o + 24);
+
+    // Smallest-three quaternion: 2-bit index of the largest component + 3 x 10 bits
+    const packed = rotations[i];
+    const largest = packed >>> 30;
+    rest[0] = (((packed >>> 20) & 1023) / 1023 * 2 - 1) / Math.SQRT2;
+    rest[1] = (((packed >>> 10) & 1023) / 1023 * 2 - 1) / Math.SQRT2;
+    rest[2] = ((packed & 1023) / 1023 * 2 - 1) / Math.SQRT2;
+    let sum = 0;
+    for (let k = 0, r = 0; k < 4; k++) {
+      if (k === largest) continue;
+      q[k] = rest[r++];
+      sum += q[k] * q[k];
+    }
+    q[largest] = Math.sqrt(Math.max(0, 1 - sum));
+    for (let k = 0; k < 4; k++) {
+      out[o + 28 + k] = Math.min(255, Math.max(0, Math.floor((q[k] * 0.5 + 0.5) * 255)));
+    }
+  }
+  return out;
+}
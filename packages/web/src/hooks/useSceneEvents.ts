@@ -0,0 +1,106 @@
+import { useEffect, useRef } from 'react';
+import { fetchAuthSession } from 'aws-amplify/auth';
+import { fetchMySceneEvents, fetchSceneEvents, Scene } from '../api/client';
+
+const RETRY_DELAY_MS = 5000;
+// The server's per-request limit for /scenes/mine/events
+const MAX_WATCHED_SCENES = 100;
+
+// 'deleting' is watched too, so an async delete is seen through to removal
+export function isInProgress(scene: Scene): boolean {
+  return scene.status === 'pending' || scene.status === 'processing' || scene.status === 'deleting';
+}
+
+function retryDelay() {
+  return new Promise((resolve) => setTimeout(resolve, RETRY_DELAY_MS));
+}
+
+// Long-polls every in-progress scene and passes each changed item to onChange,
+// stopping once a scene completes, fails or is deleted
+export function useSceneEvents(scenes: Scene[] | undefined, onChange: (scene: Scene) => void) {
+  const onChangeRef = useRef(onChange);
+  onChangeRef.current = onChange;
+
+  const active = (scenes ?? []).filter(isInProgress);
+  const activeRef = useRef(active);
+  activeRef.current = active;
+  const activeIds = active.map((scene) => scene.id).join(',');
+
+  useEffect(() => {
+    if (!activeIds) return;
+    const controller = new AbortController();
+
+    const watch = async (scene: Scene) => {
+      let since = scene.version ?? 0;
+      while (!controller.signal.aborted) {
+        try {
+          const event = await fetchSceneEvents(scene.id, since, controller.signal);
+          if (!event) return;
+          if (event.changed && event.scene) {
+            since = event.version;
+            onChangeRef.current(event.scene);
+            if (!isInProgress(event.scene)) return;
+          }
+        } catch {
+          if (controller.signal.aborted) return;
+          await retryDelay();
+        }
+      }
+    };
+
+    activeRef.current.forEach(watch);
+    return () => controller.abort();
+  }, [activeIds]);
+}
+
+// Watches the caller's in-progress scenes through a single long-poll, however
+// many there are, reporting changed items to onChange and removed ids to onDelete
+export function useMySceneEvents(
+  scenes: Scene[] | undefined,
+  onChange: (scene: Scene) => void,
+  onDelete: (sceneId: string) => void
+) {
+  const onChangeRef = useRef(onChange);
+  onChangeRef.current = onChange;
+  const onDeleteRef = useRef(onDelete);
+  onDeleteRef.current = onDelete;
+
+  const active = (scenes ?? []).filter(isInProgress).slice(0, MAX_WATCHED_SCENES);
+  const activeRef = useRef(active);
+  activeRef.current = active;
+  const activeIds = active.map((scene) => scene.id).join(',');
+
+  useEffect(() => {
+    if (!activeIds) return;
+    const controller = new AbortController();
+    const since: Record<string, number> = {};
+    activeRef.current.forEach((scene) => { since[scene.id] = scene.version ?? 0; });
+    const from = Math.min(...activeRef.current.map((scene) => scene.createdAt));
+
+    const watch = async () => {
+      while (!controller.signal.aborted && Object.keys(since).length > 0) {
+        try {
+          const session = await fetchAuthSession();
+          const token = session.tokens?.idToken?.toString();
+          if (!token) throw new Error('Not authenticated');
+          const event = await fetchMySceneEvents(token, since, from, controller.signal);
+          for (const scene of event.scenes) {
+            since[scene.id] = scene.version ?? 0;
+            onChangeRef.current(scene);
+            if (!isInProgress(scene)) delete since[scene.id];
+          }
+          for (const id of event.deleted) {
+            delete since[id];
+            onDeleteRef.current(id);
+          }
+        } catch {
+          if (controller.signal.aborted) return;
+          await retryDelay();
+        }
+      }
+    };
+
+    watch();
+    return () => controller.abort();
+  }, [activeIds]);
+}
@@ -1,10 +1,12 @@
-import { useQuery } from '@tanstack/react-query';
+import { useInfiniteQuery } from '@tanstack/react-query';
 import { fetchScenes } from '../api/client';
 
 export function useScenes() {
-  return useQuery({
+  return useInfiniteQuery({
     queryKey: ['scenes'],
-    queryFn: fetchScenes,
+    queryFn: ({ pageParam }) => fetchScenes(pageParam),
+    initialPageParam: null as string | null,
+    getNextPageParam: (lastPage) => lastPage.nextToken,
     staleTime: 30000
   });
 }
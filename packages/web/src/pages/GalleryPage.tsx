@@ -3,7 +3,8 @@ import { useScenes } from '../hooks/useScenes';
 import SceneCard from '../components/Gallery/SceneCard';
 
 export default function GalleryPage() {
-  const { data: scenes, isLoading, error } = useScenes();
+  const { data, isLoading, error, hasNextPage, fetchNextPage, isFetchingNextPage } = useScenes();
+  const scenes = data?.pages.flatMap(page => page.items);
 
   return (
     <div className="container-page">
@@ -13,7 +14,7 @@ export default function GalleryPage() {
           <p className="text-text-secondary mt-2">Browse and explore 3D gaussian splat scenes</p>
         </div>
         {scenes && scenes.length > 0 && (
-          <span className="badge-info font-mono">{scenes.length} scenes</span>
+          <span className="badge-info font-mono">{scenes.length}{hasNextPage ? '+' : ''} scenes</span>
         )}
       </div>
 
@@ -50,13 +51,22 @@ export default function GalleryPage() {
           </Link>
         </div>
       ) : (
-        <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-          {scenes?.map((scene, i) => (
-            <div key={scene.id} className={`animate-fade-up opacity-0`} style={{ animationDelay: `${i * 0.1}s` }}>
-              <SceneCard scene={scene} />
+        <>
+          <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
+            {scenes?.map((scene, i) => (
+              <div key={scene.id} className={`animate-fade-up opacity-0`} style={{ animationDelay: `${(i % 24) * 0.1}s` }}>
+                <SceneCard scene={scene} />
+              </div>
+            ))}
+          </div>
+          {hasNextPage && (
+            <div className="flex justify-center mt-8">
+              <button onClick={() => fetchNextPage()} disabled={isFetchingNextPage} className="btn-secondary">
+                {isFetchingNextPage ? 'Loading...' : 'Load more'}
+              </button>
             </div>
-          ))}
-        </div>
+          )}
+        </>
       )}
     </div>
   );
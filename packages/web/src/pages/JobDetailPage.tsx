@@ -1,21 +1,20 @@
 import { useParams, Link } from 'react-router-dom';
-import { useQuery } from '@tanstack/react-query';
+import { useQuery, useQueryClient } from '@tanstack/react-query';
 import { fetchScene } from '../api/client';
+import { useSceneEvents } from '../hooks/useSceneEvents';
 import ProcessingStatus from '../components/Viewer/ProcessingStatus';
 
 export default function JobDetailPage() {
   const { id } = useParams<{ id: string }>();
+  const queryClient = useQueryClient();
 
   const { data: scene, isLoading, isFetching } = useQuery({
     queryKey: ['scene', id],
     queryFn: () => fetchScene(id!),
     enabled: !!id,
     retry: 3,
-    refetchInterval: (query) => {
-      const status = query.state.data?.status;
-      return status === 'processing' || status === 'pending' ? 10000 : false;
-    },
   });
+  useSceneEvents(scene ? [scene] : undefined, (updated) => queryClient.setQueryData(['scene', id], updated));
 
   if (isLoading || (!scene && isFetching)) {
     return (
@@ -70,6 +69,7 @@ export default function JobDetailPage() {
             stage={scene.processingStage || 'pending'}
             error={scene.error}
             inputType={scene.inputType}
+            progress={scene.trainingProgress}
             onViewSplat={() => window.location.href = `/scene/${scene.id}`}
           />
         </div>
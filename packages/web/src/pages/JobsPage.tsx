@@ -1,8 +1,9 @@
-import { useQuery } from '@tanstack/react-query';
+import { InfiniteData, useInfiniteQuery, useQueryClient } from '@tanstack/react-query';
 import { Link, useNavigate } from 'react-router-dom';
 import { Authenticator, useAuthenticator } from '@aws-amplify/ui-react';
 import { fetchAuthSession } from 'aws-amplify/auth';
-import { fetchMyScenes, Scene } from '../api/client';
+import { fetchMyScenes, Scene, ScenePage } from '../api/client';
+import { useMySceneEvents } from '../hooks/useSceneEvents';
 
 function relativeTime(scene: Scene): string {
   const now = Date.now() / 1000;
@@ -28,6 +29,9 @@ function StatusBadge({ scene }: { scene: Scene }) {
   if (scene.status === 'failed') {
     return <span className="badge-error">Failed</span>;
   }
+  if (scene.status === 'deleting') {
+    return <span className="badge-warning animate-pulse">Deleting</span>;
+  }
   const stageLabels: Record<string, string> = {
     pending: 'Pending',
     extracting_frames: 'Extract',
@@ -41,19 +45,35 @@ function StatusBadge({ scene }: { scene: Scene }) {
 
 function JobsList() {
   const navigate = useNavigate();
-  const { data: scenes, isLoading, error } = useQuery({
+  const queryClient = useQueryClient();
+  const { data, isLoading, error, hasNextPage, fetchNextPage, isFetchingNextPage } = useInfiniteQuery({
     queryKey: ['myScenes'],
-    queryFn: async () => {
+    queryFn: async ({ pageParam }) => {
       const session = await fetchAuthSession();
       const token = session.tokens?.idToken?.toString();
       if (!token) throw new Error('Not authenticated');
-      return fetchMyScenes(token);
-    },
-    refetchInterval: (query) => {
-      const data = query.state.data;
-      if (data?.some(s => s.status === 'pending' || s.status === 'processing')) return 10000;
-      return false;
+      return fetchMyScenes(token, pageParam);
     },
+    initialPageParam: null as string | null,
+    getNextPageParam: (lastPage) => lastPage.nextToken,
+  });
+  const scenes = data?.pages.flatMap(page => page.items);
+  useMySceneEvents(scenes, (updated) => {
+    queryClient.setQueryData<InfiniteData<ScenePage>>(['myScenes'], (old) => old && {
+      ...old,
+      pages: old.pages.map(page => ({
+        ...page,
+        items: page.items.map(s => s.id === updated.id ? updated : s),
+      })),
+    });
+  }, (deletedId) => {
+    queryClient.setQueryData<InfiniteData<ScenePage>>(['myScenes'], (old) => old && {
+      ...old,
+      pages: old.pages.map(page => ({
+        ...page,
+        items: page.items.filter(s => s.id !== deletedId),
+      })),
+    });
   });
 
   if (isLoading) {
@@ -111,6 +131,13 @@ function JobsList() {
           ))}
         </tbody>
       </table>
+      {hasNextPage && (
+        <div className="flex justify-center p-4 border-t border-surface-border/50">
+          <button onClick={() => fetchNextPage()} disabled={isFetchingNextPage} className="btn-secondary">
+            {isFetchingNextPage ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -6,6 +6,7 @@ import { fetchAuthSession } from 'aws-amplify/auth';
 import SplatViewer from '../components/Viewer/SplatViewer';
 import ProcessingStatus from '../components/Viewer/ProcessingStatus';
 import { fetchScene, deleteScene } from '../api/client';
+import { useSceneEvents } from '../hooks/useSceneEvents';
 
 export default function ScenePage() {
   const { id } = useParams<{ id: string }>();
@@ -23,12 +24,9 @@ export default function ScenePage() {
   const { data: scene, isLoading, error } = useQuery({
     queryKey: ['scene', id],
     queryFn: () => fetchScene(id!),
-    enabled: !!id,
-    refetchInterval: (query) => {
-      const status = query.state.data?.status;
-      return status === 'processing' || status === 'pending' ? 10000 : false;
-    }
+    enabled: !!id
   });
+  useSceneEvents(scene ? [scene] : undefined, (updated) => queryClient.setQueryData(['scene', id], updated));
 
   const deleteMutation = useMutation({
     mutationFn: async () => {
@@ -162,10 +160,11 @@ export default function ScenePage() {
               stage={debugStage || scene.processingStage || 'pending'} 
               error={scene.error}
               inputType={scene.inputType}
+              progress={scene.trainingProgress}
               onViewSplat={() => setShowViewer(true)} 
             />
           ) : (
-            <SplatViewer splatKey={scene.splatKey} />
+            <SplatViewer splatKey={scene.splatKey} lods={scene.lods} compressedKey={scene.compressedSplat?.key} />
           )}
         </div>
       </div>
@@ -1,10 +1,15 @@
 import os
-import struct
+import re
+import gzip
+import shutil
+import tempfile
 import time
+import struct
+import contextlib
 import boto3
 import numpy as np
-from plyfile import PlyData
 from shared.helpers import update_processing_stage
+from shared.instrumentation import StageMetrics
 
 s3 = boto3.client('s3')
 dynamodb = boto3.resource('dynamodb')
@@ -14,60 +19,573 @@ TABLE = os.environ['SCENES_TABLE']
 def handler(event, context):
     scene_id = event['sceneId']
     iterations = event.get('iterations', 7000)
+    compression = event.get('compression', 'none')
+    chunked_splat = event.get('chunkedSplat', False)
+    min_opacity = float(event.get('pruneMinOpacity', 0))
+    scale_sigma = float(event.get('pruneScaleSigma', 0))
+    remove_outliers = event.get('pruneOutliers', False)
     
     update_processing_stage(scene_id, 'converting')
     
-    ply_key = f'outputs/{scene_id}/point_cloud/iteration_{iterations}/point_cloud.ply'
-    local_ply = f'/tmp/{scene_id}.ply'
-    s3.download_file(BUCKET, ply_key, local_ply)
+    # Everything lands in a per-invocation directory so warm containers start with an empty /tmp
+    with tempfile.TemporaryDirectory() as tmp, StageMetrics(scene_id, 'convert', TABLE) as metrics:
+        ply_key = f'outputs/{scene_id}/point_cloud/iteration_{iterations}/point_cloud.ply'
+        local_ply = os.path.join(tmp, 'input.ply')
+        with metrics.phase('download'):
+            s3.download_file(BUCKET, ply_key, local_ply)
+        metrics.add_bytes('download', os.path.getsize(local_ply))
     
-    splat_key = f'outputs/{scene_id}/scene.ply'
-    s3.upload_file(local_ply, BUCKET, splat_key)
+        prune_stats = {}
+        if min_opacity > 0 or scale_sigma > 0 or remove_outliers:
+            pruned_ply = os.path.join(tmp, 'pruned.ply')
+            with metrics.phase('prune'):
+                prune_stats = prune_ply(local_ply, pruned_ply, min_opacity, scale_sigma, remove_outliers)
+            print(f"Pruned {prune_stats['before'] - prune_stats['after']} of {prune_stats['before']} gaussians: {prune_stats}")
+            local_ply = pruned_ply
+        # The encoders need at least one Gaussian for their bounds; fail with the cause instead
+        if len(read_ply_vertices(local_ply)) == 0:
+            if prune_stats:
+                raise ValueError(f"Pruning removed all {prune_stats['before']} Gaussians ({prune_stats}); "
+                                 'lower pruneMinOpacity or pruneScaleSigma')
+            raise ValueError('Training produced no Gaussians')
     
-    thumbnail_key = f'outputs/{scene_id}/thumbnail.jpg'
-    first_frame = s3.list_objects_v2(Bucket=BUCKET, Prefix=f'frames/{scene_id}/', MaxKeys=1)
-    frame_key = first_frame['Contents'][0]['Key']
-    s3.copy_object(
-        Bucket=BUCKET,
-        CopySource=f'{BUCKET}/{frame_key}',
-        Key=thumbnail_key
-    )
+        ply_out_key = f'outputs/{scene_id}/scene.ply'
+        upload(metrics, local_ply, ply_out_key)
+    
+        local_splat = os.path.join(tmp, 'scene.splat')
+        with metrics.phase('splat'):
+            gaussian_count = convert_ply_to_splat(local_ply, local_splat)
+        metrics.record('gaussianCount', gaussian_count, 'Count')
+        splat_key = f'outputs/{scene_id}/scene.splat'
+        upload(metrics, local_splat, splat_key)
+    
+        if gaussian_count >= LOD_MIN_GAUSSIANS:
+            # One importance-ordered file; each level is a byte prefix the viewer fetches with a Range request
+            local_lod = os.path.join(tmp, 'lod.splat')
+            percents = LOD_PERCENTS + (100,)
+            with metrics.phase('lods'):
+                counts = write_splat_lods(local_ply, local_lod, percents)
+            lod_key = f'outputs/{scene_id}/lod/scene.splat'
+            upload(metrics, local_lod, lod_key)
+            os.remove(local_lod)
+            lods = [{'percent': pct, 'key': lod_key, 'count': count, 'bytes': count * SPLAT_DTYPE.itemsize}
+                    for pct, count in zip(percents, counts)]
+        else:
+            lods = [{'percent': 100, 'key': splat_key, 'count': gaussian_count, 'bytes': os.path.getsize(local_splat)}]
+    
+        compressed = {}
+        if compression != 'none':
+            local_splatc = os.path.join(tmp, 'scene.splatc')
+            with metrics.phase('compressed'):
+                write_compressed_splat(local_ply, local_splatc, include_sh=compression == 'quantized-sh')
+            splatc_key = f'outputs/{scene_id}/scene.splatc'
+            # Stored gzipped; browsers inflate it transparently from Content-Encoding
+            upload(metrics, local_splatc, splatc_key, {
+                'ContentType': 'application/octet-stream',
+                'ContentEncoding': 'gzip'
+            })
+            compressed = {'key': splatc_key, 'format': f'splatc-v{SPLATC_VERSION}', 'bytes': os.path.getsize(local_splatc)}
+            print(f"Compressed splat: {compressed['bytes']} bytes vs {os.path.getsize(local_splat)} .splat")
+    
+        chunked = {}
+        if chunked_splat:
+            local_chunked = os.path.join(tmp, 'scene.chunked.splat')
+            with metrics.phase('chunked'):
+                num_chunks = write_chunked_splat(local_ply, local_chunked)
+            chunked_key = f'outputs/{scene_id}/scene.chunked.splat'
+            upload(metrics, local_chunked, chunked_key, {'ContentType': 'application/octet-stream'})
+            chunked = {
+                'key': chunked_key,
+                'format': f'splatk-v{SPLATK_VERSION}',
+                'chunkSize': SPLATK_CHUNK,
+                'chunks': num_chunks,
+                'bytes': os.path.getsize(local_chunked)
+            }
+    
+        thumbnail_key = f'outputs/{scene_id}/thumbnail.jpg'
+        first_frame = s3.list_objects_v2(Bucket=BUCKET, Prefix=f'frames/{scene_id}/', MaxKeys=1)
+        frame_key = first_frame['Contents'][0]['Key']
+        s3.copy_object(
+            Bucket=BUCKET,
+            CopySource=f'{BUCKET}/{frame_key}',
+            Key=thumbnail_key
+        )
     
     table = dynamodb.Table(TABLE)
     table.update_item(
         Key={'id': scene_id},
-        UpdateExpression='SET #s = :status, processingStage = :stage, splatKey = :splat, thumbnailKey = :thumb, completedAt = :time',
+        UpdateExpression='SET #s = :status, processingStage = :stage, splatKey = :splat, plyKey = :ply, thumbnailKey = :thumb, gaussianCount = :count, lods = :lods, compressedSplat = :compressed, chunkedSplat = :chunked, pruneStats = :prune, completedAt = :time ADD version :one',
         ExpressionAttributeNames={'#s': 'status'},
         ExpressionAttributeValues={
             ':status': 'completed',
             ':stage': 'completed',
+            ':one': 1,
             ':splat': splat_key,
+            ':ply': ply_out_key,
             ':thumb': thumbnail_key,
+            ':count': gaussian_count,
+            ':lods': lods,
+            ':compressed': compressed,
+            ':chunked': chunked,
+            ':prune': prune_stats,
             ':time': int(time.time())
         }
     )
     
     return {'sceneId': scene_id, 'status': 'completed', 'splatKey': splat_key}
 
-def convert_ply_to_splat(input_path: str, output_path: str):
-    plydata = PlyData.read(input_path)
-    vertex = plydata['vertex']
+def upload(metrics: StageMetrics, local_path: str, key: str, extra_args: dict = None):
+    """Upload one output, counting its time and bytes against the convert stage."""
+    with metrics.phase('upload'):
+        s3.upload_file(local_path, BUCKET, key, ExtraArgs=extra_args)
+    metrics.add_bytes('upload', os.path.getsize(local_path))
+
+# One record per Gaussian in the antimatter15 .splat layout (32 bytes).
+SPLAT_DTYPE = np.dtype([
+    ('position', '<f4', 3),
+    ('scale', '<f4', 3),
+    ('color', 'u1', 4),
+    ('rotation', 'u1', 4),
+])
+
+# Gaussians gathered per encode pass; bounds working memory independent of scene size
+CHUNK_SIZE = 1 << 18
+
+# Coarse levels of detail, as percentages of the Gaussians ranked by importance;
+# all are prefixes of one lod/scene.splat. Smaller scenes only get scene.splat
+LOD_PERCENTS = (10, 30)
+LOD_MIN_GAUSSIANS = 100_000
+
+# Statistical outlier removal: neighbours per Gaussian and cutoff in std devs
+PRUNE_NEIGHBORS = 16
+PRUNE_STD_RATIO = 2.0
+
+PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8'
+}
+PLY_ENDIAN = {'binary_little_endian': '<', 'binary_big_endian': '>'}
+
+def read_ply_vertices(path: str) -> np.memmap:
+    """Memory-map the vertex element of a binary PLY.
+    
+    Only the header is parsed; vertex data stays on disk and is paged in as
+    columns are touched, so f_rest_* coefficients are never read.
+    """
+    with open(path, 'rb') as f:
+        if f.readline().strip() != b'ply':
+            raise ValueError(f'{path} is not a PLY file')
+        endian = None
+        element = None
+        count = 0
+        fields = []
+        while True:
+            line = f.readline()
+            if not line:
+                raise ValueError(f'Truncated PLY header in {path}')
+            tokens = line.decode('ascii').split()
+            if not tokens or tokens[0] == 'comment':
+                continue
+            if tokens[0] == 'end_header':
+                break
+            if tokens[0] == 'format':
+                if tokens[1] not in PLY_ENDIAN:
+                    raise ValueError(f'Unsupported PLY format: {tokens[1]}')
+                endian = PLY_ENDIAN[tokens[1]]
+            elif tokens[0] == 'element':
+                if element == 'vertex':
+                    break  # later elements follow the vertex block
+                if int(tokens[2]) and tokens[1] != 'vertex':
+                    raise ValueError(f'Unsupported PLY element before vertex: {tokens[1]}')
+                element = tokens[1]
+                count = int(tokens[2])
+            elif tokens[0] == 'property' and element == 'vertex':
+                if tokens[1] == 'list':
+                    raise ValueError('List properties are not supported on vertex')
+                fields.append((tokens[2], endian + PLY_TYPES[tokens[1]]))
+        # Skip any remaining header lines after the vertex element
+        while not line.startswith(b'end_header'):
+            line = f.readline()
+            if not line:
+                raise ValueError(f'Truncated PLY header in {path}')
+        offset = f.tell()
+    
+    if element != 'vertex' or endian is None:
+        raise ValueError(f'No binary vertex element in {path}')
+    return np.memmap(path, dtype=np.dtype(fields), mode='r', offset=offset, shape=(count,))
+
+def prune_ply(input_path: str, output_path: str, min_opacity: float = 0,
+              scale_sigma: float = 0, remove_outliers: bool = False) -> dict:
+    """Copy input_path to output_path without near-transparent and outlier Gaussians.
+    
+    - min_opacity: drop Gaussians whose sigmoid(opacity) is below it
+    - scale_sigma: drop Gaussians whose largest log-scale is more than this many
+      robust standard deviations (1.4826 x MAD) above the median
+    - remove_outliers: drop statistical position outliers, whose mean distance
+      to their PRUNE_NEIGHBORS nearest survivors exceeds the mean by
+      PRUNE_STD_RATIO standard deviations (needs scipy)
+    
+    Returns before/after counts and how many each rule removed.
+    """
+    vertex = read_ply_vertices(input_path)
+    num_gaussians = len(vertex)
+    keep = np.ones(num_gaussians, dtype=bool)
+    stats = {'before': num_gaussians}
+    
+    if min_opacity > 0:
+        logit = np.log(min_opacity / (1 - min_opacity))
+        for start in range(0, num_gaussians, CHUNK_SIZE):
+            chunk = slice(start, start + CHUNK_SIZE)
+            keep[chunk] &= vertex['opacity'][chunk] >= logit
+        stats['opacity'] = int(num_gaussians - keep.sum())
+    
+    if scale_sigma > 0 and keep.any():
+        max_log_scale = np.empty(num_gaussians, dtype=np.float32)
+        for start in range(0, num_gaussians, CHUNK_SIZE):
+            chunk = slice(start, start + CHUNK_SIZE)
+            max_log_scale[chunk] = np.maximum.reduce([vertex[f'scale_{i}'][chunk] for i in range(3)])
+        median = np.median(max_log_scale[keep])
+        mad = np.median(np.abs(max_log_scale[keep] - median)) * 1.4826
+        outliers = keep & (max_log_scale > median + scale_sigma * mad)
+        keep &= ~outliers
+        stats['scale'] = int(outliers.sum())
+        del max_log_scale
+    
+    if remove_outliers:
+        stats['outliers'] = remove_position_outliers(vertex, keep)
+    
+    stats['after'] = int(keep.sum())
+    with open(input_path, 'rb') as f:
+        header = f.read(vertex.offset).decode('ascii')
+        f.seek(vertex.offset + num_gaussians * vertex.dtype.itemsize)
+        trailer = f.read()
+    header = re.sub(r'element vertex \d+', f'element vertex {stats["after"]}', header, count=1)
+    with open(output_path, 'wb') as f:
+        f.write(header.encode('ascii'))
+        for start in range(0, num_gaussians, CHUNK_SIZE):
+            chunk = slice(start, start + CHUNK_SIZE)
+            vertex[chunk][keep[chunk]].tofile(f)
+        f.write(trailer)
+    return stats
+
+def remove_position_outliers(vertex: np.ndarray, keep: np.ndarray) -> int:
+    """Clear keep for statistical position outliers among the kept Gaussians."""
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        print("scipy not available, skipping statistical outlier removal")
+        return 0
+    indices = np.flatnonzero(keep)
+    if len(indices) <= PRUNE_NEIGHBORS:
+        return 0
+    positions = np.stack([vertex[n][indices] for n in ('x', 'y', 'z')], axis=-1).astype(np.float32)
+    distances, _ = cKDTree(positions).query(positions, k=PRUNE_NEIGHBORS + 1, workers=-1)
+    mean_distance = distances[:, 1:].mean(axis=1)
+    outliers = mean_distance > mean_distance.mean() + PRUNE_STD_RATIO * mean_distance.std()
+    keep[indices[outliers]] = False
+    return int(outliers.sum())
+
+def gather_gaussians(vertex: np.ndarray, indices: np.ndarray):
+    """Read the encoder columns for the given vertex indices."""
+    def cols(*names):
+        return np.stack([vertex[n][indices] for n in names], axis=-1)
+    
+    positions = cols('x', 'y', 'z')
+    scales = cols('scale_0', 'scale_1', 'scale_2')
+    rotations = cols('rot_0', 'rot_1', 'rot_2', 'rot_3')
+    opacity = vertex['opacity'][indices]
+    sh_dc = cols('f_dc_0', 'f_dc_1', 'f_dc_2')
+    return positions, scales, rotations, opacity, sh_dc
+
+def convert_ply_to_splat(input_path: str, output_path: str) -> int:
+    """Convert a 3DGS PLY to .splat and return the number of Gaussians written.
     
-    positions = np.stack([vertex['x'], vertex['y'], vertex['z']], axis=-1)
-    scales = np.stack([vertex['scale_0'], vertex['scale_1'], vertex['scale_2']], axis=-1)
-    rotations = np.stack([vertex['rot_0'], vertex['rot_1'], vertex['rot_2'], vertex['rot_3']], axis=-1)
-    opacity = vertex['opacity']
-    sh_dc = np.stack([vertex['f_dc_0'], vertex['f_dc_1'], vertex['f_dc_2']], axis=-1)
+    Apart from the sort key and permutation (12 bytes per Gaussian), memory
+    use is bounded by CHUNK_SIZE regardless of scene size.
+    """
+    vertex = read_ply_vertices(input_path)
+    num_gaussians = len(vertex)
     
-    scales_sum = np.exp(scales).sum(axis=-1)
+    scales_sum = np.empty(num_gaussians, dtype=np.float32)
+    for start in range(0, num_gaussians, CHUNK_SIZE):
+        chunk = slice(start, start + CHUNK_SIZE)
+        scales = np.stack([vertex[f'scale_{i}'][chunk] for i in range(3)], axis=-1)
+        scales_sum[chunk] = np.exp(scales).sum(axis=-1)
     sort_indices = np.argsort(-scales_sum)
+    del scales_sum
+    
+    with open(output_path, 'wb') as f:
+        for start in range(0, num_gaussians, CHUNK_SIZE):
+            rows = gather_gaussians(vertex, sort_indices[start:start + CHUNK_SIZE])
+            encode_splat_records(*rows).tofile(f)
+    return num_gaussians
+
+def importance_order(vertex: np.ndarray) -> np.ndarray:
+    """Vertex indices by descending importance, sigmoid(opacity) x volume.
+    
+    Ranked in log space (sum of log-scales minus log(1 + e^-opacity)) so large
+    scales or opacities cannot overflow; the order is the same.
+    """
+    num_gaussians = len(vertex)
+    log_importance = np.empty(num_gaussians, dtype=np.float32)
+    for start in range(0, num_gaussians, CHUNK_SIZE):
+        chunk = slice(start, start + CHUNK_SIZE)
+        log_volume = sum(vertex[f'scale_{i}'][chunk].astype(np.float32) for i in range(3))
+        log_alpha = -np.logaddexp(0, -vertex['opacity'][chunk].astype(np.float32))
+        log_importance[chunk] = log_volume + log_alpha
+    return np.argsort(-log_importance, kind='stable')
+
+def write_splat_lods(input_path: str, output_path: str, percents) -> list:
+    """Write a .splat in descending importance order and return each level's count.
+    
+    The level for a percent is the first count records of the file, so a
+    coarser level is byte-for-byte the head of a finer one and the largest
+    percent decides how much is written.
+    """
+    vertex = read_ply_vertices(input_path)
+    order = importance_order(vertex)
+    counts = [max(1, len(vertex) * pct // 100) for pct in percents]
+    
+    with open(output_path, 'wb') as f:
+        for start in range(0, max(counts), CHUNK_SIZE):
+            rows = gather_gaussians(vertex, order[start:min(start + CHUNK_SIZE, max(counts))])
+            encode_splat_records(*rows).tofile(f)
+    return counts
+
+def encode_splat_records(positions, scales, rotations, opacity, sh_dc) -> np.ndarray:
+    """Pack already-ordered Gaussian attributes into SPLAT_DTYPE records.
+    
+    Colours and rotations are truncated to uint8 exactly like the original
+    per-row struct.pack encoder, so output is byte-identical.
+    """
+    records = np.empty(len(positions), dtype=SPLAT_DTYPE)
+    records['position'] = positions
+    records['scale'] = np.exp(scales)
+    
+    color = (sh_dc * 0.28209479177387814 + 0.5).clip(0, 1)
+    alpha = 1 / (1 + np.exp(-opacity))
+    records['color'][:, :3] = (color * 255).astype(np.uint8)
+    records['color'][:, 3] = (alpha * 255).astype(np.uint8)
+    
+    # Row-wise dot via matmul uses the same kernel as np.linalg.norm on a
+    # single row; axis-wise norm sums in a different order and can flip a
+    # truncated byte.
+    norms = np.sqrt(rotations[:, None, :] @ rotations[:, :, None])[:, 0]
+    rot = rotations / norms
+    records['rotation'] = ((rot * 0.5 + 0.5) * 255).astype(np.uint8)
+    return records
+
+# Compressed splat (.splatc): gzip stream of a fixed header, a per-chunk
+# position bounds table and column-major quantized attributes.
+SPLATC_MAGIC = b'SPLC'
+SPLATC_VERSION = 1
+SPLATC_FLAG_SH = 1
+SPLATC_CHUNK = 256  # Gaussians per position-quantization chunk
+# magic, version, flags, count, chunk size, SH coefficients per channel,
+# reserved, log-scale min/max, SH min/max
+SPLATC_HEADER = struct.Struct('<4sHHIIHHffff')
+SQRT2 = np.float32(np.sqrt(2))
+
+def morton_order(positions: np.ndarray, bits: int = 10) -> np.ndarray:
+    """Indices that sort positions along a Z-order curve over their bounding box."""
+    lo = positions.min(axis=0)
+    extent = np.maximum(positions.max(axis=0) - lo, 1e-9)
+    q = ((positions - lo) / extent * ((1 << bits) - 1)).astype(np.uint32)
+    
+    def spread(v):
+        v = (v | (v << 16)) & 0x030000FF
+        v = (v | (v << 8)) & 0x0300F00F
+        v = (v | (v << 4)) & 0x030C30C3
+        return (v | (v << 2)) & 0x09249249
+    
+    codes = spread(q[:, 0]) | (spread(q[:, 1]) << 1) | (spread(q[:, 2]) << 2)
+    return np.argsort(codes, kind='stable')
+
+def quantize(values: np.ndarray, lo, hi, levels: int) -> np.ndarray:
+    span = np.where(hi > lo, hi - lo, 1)
+    return np.rint((np.clip(values, lo, hi) - lo) / span * levels)
+
+def pack_smallest_three(rotations: np.ndarray) -> np.ndarray:
+    """Pack quaternions as the index of the largest component plus three 10-bit others."""
+    q = rotations / np.linalg.norm(rotations, axis=-1, keepdims=True)
+    largest = np.abs(q).argmax(axis=-1)
+    q *= np.where(q[np.arange(len(q)), largest] < 0, -1, 1)[:, None]
+    keep = np.ones_like(q, dtype=bool)
+    keep[np.arange(len(q)), largest] = False
+    rest = q[keep].reshape(-1, 3)
+    packed = quantize(rest * SQRT2, -1, 1, 1023).astype(np.uint32)
+    return (largest.astype(np.uint32) << 30) | (packed[:, 0] << 20) | (packed[:, 1] << 10) | packed[:, 2]
+
+def unpack_smallest_three(packed: np.ndarray) -> np.ndarray:
+    largest = (packed >> 30).astype(np.intp)
+    rest = np.stack([(packed >> s) & 1023 for s in (20, 10, 0)], axis=-1) / 1023 * 2 - 1
+    rest = rest / SQRT2
+    q = np.empty((len(packed), 4), dtype=np.float32)
+    keep = np.ones_like(q, dtype=bool)
+    keep[np.arange(len(q)), largest] = False
+    q[keep] = rest.ravel()
+    q[np.arange(len(q)), largest] = np.sqrt(np.clip(1 - (rest ** 2).sum(axis=-1), 0, 1))
+    return q
+
+def sh_rest_fields(vertex: np.ndarray) -> list:
+    """f_rest_* property names in index order (channel-major, as 3DGS writes them)."""
+    return sorted((n for n in vertex.dtype.names if n.startswith('f_rest_')), key=lambda n: int(n[7:]))
+
+def read_positions(vertex: np.ndarray) -> np.ndarray:
+    """Every position as float32 (12 bytes per Gaussian), read CHUNK_SIZE rows at a time."""
+    positions = np.empty((len(vertex), 3), dtype=np.float32)
+    for start in range(0, len(vertex), CHUNK_SIZE):
+        chunk = slice(start, start + CHUNK_SIZE)
+        positions[chunk] = np.stack([vertex[n][chunk] for n in ('x', 'y', 'z')], axis=-1)
+    return positions
+
+def column_range(vertex: np.ndarray, names) -> tuple:
+    """(min, max) over the named columns, read CHUNK_SIZE rows at a time."""
+    lo, hi = np.inf, -np.inf
+    for start in range(0, len(vertex), CHUNK_SIZE):
+        chunk = slice(start, start + CHUNK_SIZE)
+        for name in names:
+            column = vertex[name][chunk]
+            lo, hi = min(lo, float(column.min())), max(hi, float(column.max()))
+    return (lo, hi) if lo <= hi else (0.0, 0.0)
+
+def ordered_blocks(order: np.ndarray, chunk: int):
+    """Slices of order of about CHUNK_SIZE that never split a chunk of `chunk` Gaussians."""
+    block = chunk * max(1, CHUNK_SIZE // chunk)
+    for start in range(0, len(order), block):
+        yield start, order[start:start + block]
+
+def write_compressed_splat(input_path: str, output_path: str, include_sh: bool = False) -> int:
+    """Write a gzip-compressed .splatc and return the number of Gaussians.
+    
+    Gaussians are Morton-ordered so each SPLATC_CHUNK run is spatially compact,
+    then stored as: positions as uint16 within their chunk's bounds, log-scales
+    as uint8 over the scene range, rotations as smallest-three uint32, RGBA as
+    uint8 and, with include_sh, the f_rest_* coefficients as uint8.
+    
+    Apart from the Morton sort (positions, keys and permutation), memory use is
+    bounded by CHUNK_SIZE: each section is quantized block by block into its own
+    temporary file, and the files are then concatenated into the gzip stream.
+    """
+    vertex = read_ply_vertices(input_path)
+    num_gaussians = len(vertex)
+    order = morton_order(read_positions(vertex))
+    
+    # Quantization ranges do not depend on order, so they are read sequentially
+    scale_min, scale_max = column_range(vertex, [f'scale_{i}' for i in range(3)])
+    sh_fields = sh_rest_fields(vertex) if include_sh else []
+    flags, sh_min, sh_max = 0, 0.0, 0.0
+    if sh_fields:
+        sh_min, sh_max = column_range(vertex, sh_fields)
+        flags |= SPLATC_FLAG_SH
+    
+    bounds = []
+    with contextlib.ExitStack() as stack:
+        section_names = ('positions', 'scales', 'rotations', 'rgba') + (('sh',) if sh_fields else ())
+        sections = {name: stack.enter_context(tempfile.TemporaryFile(dir=os.path.dirname(output_path) or None))
+                    for name in section_names}
+        for _, indices in ordered_blocks(order, SPLATC_CHUNK):
+            positions, scales, rotations, opacity, sh_dc = gather_gaussians(vertex, indices)
+            starts = np.arange(0, len(indices), SPLATC_CHUNK)
+            chunk_min = np.minimum.reduceat(positions, starts, axis=0)
+            chunk_max = np.maximum.reduceat(positions, starts, axis=0)
+            bounds.append(np.concatenate([chunk_min, chunk_max], axis=-1))
+            chunk_of = np.arange(len(indices)) // SPLATC_CHUNK
+            quantize(positions, chunk_min[chunk_of], chunk_max[chunk_of], 65535).astype('<u2').tofile(sections['positions'])
+            quantize(scales, scale_min, scale_max, 255).astype(np.uint8).tofile(sections['scales'])
+            pack_smallest_three(rotations).astype('<u4').tofile(sections['rotations'])
+            
+            rgba = np.empty((len(indices), 4), dtype=np.uint8)
+            rgba[:, :3] = np.rint((sh_dc * 0.28209479177387814 + 0.5).clip(0, 1) * 255)
+            rgba[:, 3] = np.rint(1 / (1 + np.exp(-opacity)) * 255)
+            rgba.tofile(sections['rgba'])
+            if sh_fields:
+                sh = np.stack([vertex[n][indices] for n in sh_fields], axis=-1)
+                quantize(sh, sh_min, sh_max, 255).astype(np.uint8).tofile(sections['sh'])
+        
+        with gzip.open(output_path, 'wb', compresslevel=6) as f:
+            f.write(SPLATC_HEADER.pack(
+                SPLATC_MAGIC, SPLATC_VERSION, flags, num_gaussians, SPLATC_CHUNK,
+                len(sh_fields) // 3, 0, scale_min, scale_max, sh_min, sh_max
+            ))
+            if bounds:
+                f.write(np.concatenate(bounds).astype('<f4').tobytes())
+            for name in section_names:
+                sections[name].seek(0)
+                shutil.copyfileobj(sections[name], f, 1 << 20)
+    return num_gaussians
+
+def read_compressed_splat(path: str) -> dict:
+    """Reference decoder for .splatc; returns float attributes in Morton order."""
+    with gzip.open(path, 'rb') as f:
+        data = f.read()
+    (magic, version, flags, count, chunk, sh_per_channel, _,
+     scale_min, scale_max, sh_min, sh_max) = SPLATC_HEADER.unpack_from(data)
+    if magic != SPLATC_MAGIC:
+        raise ValueError(f'{path} is not a compressed splat')
+    if version != SPLATC_VERSION:
+        raise ValueError(f'Unsupported compressed splat version {version}')
+    
+    offset = SPLATC_HEADER.size
+    def take(dtype, shape):
+        nonlocal offset
+        arr = np.frombuffer(data, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+        offset += arr.nbytes
+        return arr
+    
+    num_chunks = -(-count // chunk)
+    bounds = take('<f4', (num_chunks, 6))
+    chunk_of = np.arange(count) // chunk
+    lo, hi = bounds[chunk_of, :3], bounds[chunk_of, 3:]
+    positions = lo + take('<u2', (count, 3)) / 65535 * (hi - lo)
+    scales = scale_min + take('u1', (count, 3)) / 255 * (scale_max - scale_min)
+    rotations = unpack_smallest_three(take('<u4', (count,)))
+    rgba = take('u1', (count, 4))
+    result = {'positions': positions, 'scales': scales, 'rotations': rotations, 'rgba': rgba}
+    if flags & SPLATC_FLAG_SH:
+        q_sh = take('u1', (count, sh_per_channel * 3))
+        result['sh_rest'] = sh_min + q_sh / 255 * (sh_max - sh_min)
+    return result
+
+# Chunked .splat for range requests: header, then one bounding box per chunk,
+# then plain 32-byte .splat records in Morton order. Chunk i occupies bytes
+# [data_offset + i * SPLATK_CHUNK * 32, ...) so a client can fetch the header
+# and table once and then request only the chunks it needs.
+SPLATK_MAGIC = b'SPLK'
+SPLATK_VERSION = 1
+SPLATK_CHUNK = 4096  # 128 KiB of records per chunk
+# magic, version, reserved, count, chunk size, number of chunks, data offset
+SPLATK_HEADER = struct.Struct('<4sHHIIII')
+
+def write_chunked_splat(input_path: str, output_path: str) -> int:
+    """Write a Morton-ordered, chunk-indexed .splat and return the number of chunks.
+    
+    Records are encoded CHUNK_SIZE at a time; the bounding-box table is filled
+    in as chunks are written and patched into place at the end.
+    """
+    vertex = read_ply_vertices(input_path)
+    num_gaussians = len(vertex)
+    order = morton_order(read_positions(vertex))
+    
+    num_chunks = -(-num_gaussians // SPLATK_CHUNK)
+    table = np.zeros((num_chunks, 6), dtype='<f4')
+    data_offset = SPLATK_HEADER.size + table.nbytes
     
     with open(output_path, 'wb') as f:
-        for idx in sort_indices:
-            f.write(struct.pack('fff', *positions[idx]))
-            f.write(struct.pack('fff', *np.exp(scales[idx])))
-            color = (sh_dc[idx] * 0.28209479177387814 + 0.5).clip(0, 1)
-            alpha = 1 / (1 + np.exp(-opacity[idx]))
-            f.write(struct.pack('BBBB', int(color[0]*255), int(color[1]*255), int(color[2]*255), int(alpha*255)))
-            rot = rotations[idx] / np.linalg.norm(rotations[idx])
-            f.write(struct.pack('BBBB', *[int((r*0.5+0.5)*255) for r in rot]))
+        f.write(SPLATK_HEADER.pack(
+            SPLATK_MAGIC, SPLATK_VERSION, 0, num_gaussians, SPLATK_CHUNK, num_chunks, data_offset
+        ))
+        f.write(table.tobytes())
+        for start, indices in ordered_blocks(order, SPLATK_CHUNK):
+            rows = gather_gaussians(vertex, indices)
+            positions = rows[0]
+            starts = np.arange(0, len(indices), SPLATK_CHUNK)
+            first = start // SPLATK_CHUNK
+            table[first:first + len(starts), :3] = np.minimum.reduceat(positions, starts, axis=0)
+            table[first:first + len(starts), 3:] = np.maximum.reduceat(positions, starts, axis=0)
+            encode_splat_records(*rows).tofile(f)
+        f.seek(SPLATK_HEADER.size)
+        f.write(table.tobytes())
+    return num_chunks
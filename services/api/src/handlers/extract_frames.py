@@ -1,62 +1,190 @@
 import os
+import re
 import subprocess
-import boto3
+import tempfile
+import time
+import numpy as np
 from shared.helpers import update_processing_stage
+from shared.instrumentation import StageMetrics
+from shared.transfer import make_client, upload_files, delete_prefix
 
-s3 = boto3.client('s3')
+s3 = make_client()
 BUCKET = os.environ['ASSETS_BUCKET']
 
+# Keyframe selection: candidates are decoded at KEYFRAME_OVERSAMPLE x the
+# requested fps and the sharpest non-redundant one per timeline bin is kept
+KEYFRAME_OVERSAMPLE = 3
+MAX_CANDIDATES = 3000
+SCORE_SIZE = (160, 120)  # grayscale thumbnail used for scoring
+MIN_FRAME_DIFF = 2.0     # mean abs gray-level difference below which a frame is redundant
+
 def handler(event, context):
     scene_id = event['sceneId']
     video_key = event['videoKey']
     fps = event.get('fps', 3)
-    max_frames = 100
+    max_frames = event.get('maxFrames', 100)
     
     update_processing_stage(scene_id, 'extracting_frames')
     
-    local_video = f'/tmp/{scene_id}.mp4'
-    s3.download_file(BUCKET, video_key, local_video)
+    # Per-invocation scratch space; a warm container must not accumulate 2GB videos
+    with tempfile.TemporaryDirectory() as tmp, StageMetrics(scene_id, 'extract_frames') as metrics:
+        local_video = os.path.join(tmp, 'video.mp4')
+        with metrics.phase('download'):
+            s3.download_file(BUCKET, video_key, local_video)
+        metrics.add_bytes('download', os.path.getsize(local_video))
+    
+        # Duration comes from the container header; nothing is decoded here
+        info = probe_video(local_video)
+        duration = info['duration']
+        metrics.record('videoSeconds', round(duration, 3), 'Seconds')
+        print(f"Video: {duration:.1f}s, {info.get('width')}x{info.get('height')} {info.get('codec')} @ {info.get('fps')} fps")
+        if duration > 0 and fps * duration > max_frames:
+            fps = round(max_frames / duration, 2)
+            print(f"Capped fps to {fps} for {duration:.0f}s video (max {max_frames} frames)")
+    
+        num_bins = max(1, min(max_frames, round(fps * duration))) if duration > 0 else max_frames
+        bin_seconds = duration / num_bins if duration > 0 else 1 / fps
+        candidate_fps = fps * KEYFRAME_OVERSAMPLE
+        if info.get('fps'):
+            candidate_fps = min(candidate_fps, info['fps'])
+        if duration > 0:
+            candidate_fps = min(candidate_fps, MAX_CANDIDATES / duration)
+        candidate_fps = round(candidate_fps, 3)
+        print(f"Selecting up to {num_bins} keyframes from candidates at {candidate_fps} fps")
+    
+        frames_dir = os.path.join(tmp, 'frames')
+        os.makedirs(frames_dir)
+    
+        # Frames from an earlier run would leak into COLMAP and its cache key
+        stale = delete_prefix(BUCKET, f'frames/{scene_id}/', s3=s3)
+        if stale:
+            print(f"Deleted {stale} frames from a previous run")
+    
+        # Single decode pass; keyframes are uploaded while ffmpeg is still decoding
+        start = time.time()
+        with metrics.phase('extract'):
+            keyframes = select_keyframes(local_video, frames_dir, candidate_fps, num_bins, bin_seconds)
+            frames = ((path, f'frames/{scene_id}/{os.path.basename(path)}') for path in keyframes)
+            stats = upload_files(BUCKET, frames, s3=s3)
+        elapsed = time.time() - start
+        metrics.add_transfer('upload', stats)
+        print(f"Extracted and uploaded keyframes in {elapsed:.1f}s: {stats}")
+        frame_count = stats.files
+        metrics.record('framesExtracted', frame_count, 'Count')
+        if duration > 0:
+            metrics.record('extractionSecondsPerVideoSecond', round(elapsed / duration, 4))
     
-    # Get video duration and cap fps to stay under max_frames
+    # Job settings were defaulted once by the jobs API; pass them through as-is
+    return {
+        **event,
+        'framesPrefix': f'frames/{scene_id}/',
+        'frameCount': frame_count,
+        'fps': fps,
+        'maxFrames': max_frames
+    }
+
+def probe_video(path: str) -> dict:
+    """Read duration and video stream metadata from the container header.
+    
+    `ffmpeg -i` with no output only opens the input, so this returns in
+    milliseconds regardless of clip length (it exits non-zero by design).
+    """
     probe = subprocess.run(
-        ['/opt/bin/ffmpeg', '-i', local_video, '-f', 'null', '-'],
+        ['/opt/bin/ffmpeg', '-hide_banner', '-i', path],
         capture_output=True, text=True
     )
+    info = {'duration': 0}
     # ffmpeg prints duration in stderr like "Duration: 00:01:30.00"
-    import re
-    duration = 0
     m = re.search(r'Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)', probe.stderr)
     if m:
-        duration = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3))
-    if duration > 0 and fps * duration > max_frames:
-        fps = round(max_frames / duration, 2)
-        print(f"Capped fps to {fps} for {duration:.0f}s video (max {max_frames} frames)")
-    
-    frames_dir = f'/tmp/{scene_id}_frames'
-    os.makedirs(frames_dir, exist_ok=True)
-    
-    subprocess.run([
-        '/opt/bin/ffmpeg', '-i', local_video,
-        '-vf', f'fps={fps}',
-        '-q:v', '2',
-        f'{frames_dir}/frame_%04d.jpg'
-    ], check=True)
-    
-    frame_count = 0
-    for filename in os.listdir(frames_dir):
-        s3.upload_file(
-            f'{frames_dir}/{filename}',
-            BUCKET,
-            f'frames/{scene_id}/{filename}'
-        )
-        frame_count += 1
+        info['duration'] = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3))
+    # e.g. "Stream #0:0(und): Video: h264 (High) (avc1 / 0x31637661), yuv420p, 1920x1080 [SAR 1:1 DAR 16:9], 30 fps"
+    m = re.search(r'Stream #\S+: Video: (\w+).*?, (\d{2,5})x(\d{2,5})', probe.stderr)
+    if m:
+        info.update(codec=m.group(1), width=int(m.group(2)), height=int(m.group(3)))
+    m = re.search(r'Stream #\S+: Video: .*?([\d.]+) fps', probe.stderr)
+    if m:
+        info['fps'] = float(m.group(1))
+    return info
+
+def sharpness(gray: np.ndarray) -> float:
+    """Variance of the 4-neighbour Laplacian; low values mean motion blur or defocus."""
+    lap = (gray[1:-1, :-2] + gray[1:-1, 2:] + gray[:-2, 1:-1] + gray[2:, 1:-1]
+           - 4 * gray[1:-1, 1:-1])
+    return float(lap.var())
+
+def select_keyframes(video_path: str, frames_dir: str, candidate_fps: float, num_bins: int, bin_seconds: float):
+    """Decode candidates once and yield the best JPEG of each timeline bin.
     
-    return {
-        'sceneId': scene_id,
-        'framesPrefix': f'frames/{scene_id}/',
-        'frameCount': frame_count,
-        'fps': fps,
-        'iterations': event.get('iterations', 30000),
-        'densifyUntilIter': event.get('densifyUntilIter', 15000),
-        'densificationInterval': event.get('densificationInterval', 100)
-    }
+    ffmpeg writes full-size JPEG candidates and, from the same decode, a
+    small grayscale copy of each to stdout for scoring. Within a bin the
+    sharpest candidate wins; candidates nearly identical to the previous
+    keyframe are dropped, so a static camera yields no extra frames. A bin
+    is emitted once the next bin starts and its JPEG is on disk; the losing
+    candidates of a closed bin are deleted as soon as ffmpeg has finished
+    writing them, so /tmp holds about one bin of full-size JPEGs at a time.
+    """
+    width, height = SCORE_SIZE
+    pattern = f'{frames_dir}/frame_%04d.jpg'
+    cmd = [
+        '/opt/bin/ffmpeg', '-hide_banner', '-loglevel', 'error',
+        '-i', video_path,
+        '-filter_complex', f'[0:v]fps={candidate_fps},split=2[full][small];'
+                           f'[small]scale={width}:{height},format=gray[score]',
+        '-map', '[full]', '-q:v', '2', pattern,
+        '-map', '[score]', '-f', 'rawvideo', 'pipe:1'
+    ]
+    frame_bytes = width * height
+    
+    with tempfile.TemporaryFile(mode='w+') as stderr:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+        
+        chosen = []   # keyframe indices whose JPEG may still be being written
+        discard = []  # losing candidates of closed bins, deleted once fully written
+        in_bin = []   # candidate indices of the current bin
+        last_kept = None
+        best = None  # (score, index, gray) for the current bin
+        current_bin = 0
+        index = 0
+        while True:
+            buf = proc.stdout.read(frame_bytes)
+            if len(buf) < frame_bytes:
+                break
+            index += 1
+            gray = np.frombuffer(buf, dtype=np.uint8).reshape(height, width).astype(np.float32)
+            
+            frame_bin = min(int((index - 1) / candidate_fps / bin_seconds), num_bins - 1)
+            if frame_bin != current_bin:
+                if best:
+                    last_kept = best[2]
+                    chosen.append(best[1])
+                discard.extend(i for i in in_bin if not best or i != best[1])
+                in_bin = []
+                best = None
+                current_bin = frame_bin
+            in_bin.append(index)
+            # Frame N is fully written once frame N+1 exists; never block here,
+            # ffmpeg may be waiting for us to drain stdout
+            while discard and os.path.exists(pattern % (discard[0] + 1)):
+                os.remove(pattern % discard.pop(0))
+            while chosen and os.path.exists(pattern % (chosen[0] + 1)):
+                yield pattern % chosen.pop(0)
+            
+            if last_kept is not None and np.abs(gray - last_kept).mean() < MIN_FRAME_DIFF:
+                continue
+            score = sharpness(gray)
+            if best is None or score > best[0]:
+                best = (score, index, gray)
+        
+        proc.wait()
+        if proc.returncode != 0:
+            stderr.seek(0)
+            raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr.read())
+        if best:
+            chosen.append(best[1])
+        discard.extend(i for i in in_bin if not best or i != best[1])
+        for i in discard:
+            if os.path.exists(pattern % i):
+                os.remove(pattern % i)
+        for i in chosen:
+            yield pattern % i
@@ -48,12 +48,13 @@ def handler(event, context):
     table = dynamodb.Table(TABLE)
     table.update_item(
         Key={'id': scene_id},
-        UpdateExpression='SET #s = :status, processingStage = :stage, #e = :error',
+        UpdateExpression='SET #s = :status, processingStage = :stage, #e = :error ADD version :one',
         ExpressionAttributeNames={'#s': 'status', '#e': 'error'},
         ExpressionAttributeValues={
             ':status': 'failed',
             ':stage': 'failed',
-            ':error': error_message
+            ':error': error_message,
+            ':one': 1
         }
     )
     
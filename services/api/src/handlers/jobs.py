@@ -1,63 +1,353 @@
 import json
 import os
+import time
+import uuid
 import boto3
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from botocore.config import Config
+from botocore.exceptions import ClientError
 
-sfn = boto3.client('stepfunctions')
+sfn = boto3.client('stepfunctions', config=Config(retries={'max_attempts': 8, 'mode': 'adaptive'}))
 dynamodb = boto3.resource('dynamodb')
+s3 = boto3.client('s3')
 
 STATE_MACHINE_ARN = os.environ['STATE_MACHINE_ARN']
 TABLE = os.environ['SCENES_TABLE']
+BUCKET = os.environ.get('ASSETS_BUCKET')
+
+MAX_BATCH_JOBS = 100
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '8'))
 
 # Quality-focused defaults
 DEFAULTS = {
     'fps': 3,
+    'maxFrames': 100,
     'iterations': 7000,
     'densifyUntilIter': 5000,
-    'densificationInterval': 100
+    'densificationInterval': 100,
+    'maxGaussians': 0,
+    'sfmMapper': 'incremental',
+    'resumeFrom': '',
+    'compression': 'none',
+    'chunkedSplat': False,
+    'pruneMinOpacity': 0.005,
+    'pruneScaleSigma': 0,
+    'pruneOutliers': False
 }
+SFM_MAPPERS = ('incremental', 'global')
+RESUME_OPTIONS = ('', 'latest')
+COMPRESSION_OPTIONS = ('none', 'quantized', 'quantized-sh')
+# Settings that change the frame set or sparse model; the rest only affect training
+COLMAP_SETTINGS = ('fps', 'maxFrames', 'sfmMapper')
 
-def handler(event, context):
-    body = json.loads(event.get('body', '{}'))
-    scene_id = body['sceneId']
-    input_type = body.get('inputType', 'video')
-    
-    # Extract settings with defaults
+def colmap_is_cached(item: dict, input_type: str, settings: dict) -> bool:
+    """True if the scene already has a sparse model built from identical inputs."""
+    if not BUCKET or not item.get('colmapCacheKey') or item.get('inputType', 'video') != input_type:
+        return False
+    previous = item.get('settings') or {}
+    if any(str(previous.get(k)) != str(settings.get(k)) for k in COLMAP_SETTINGS):
+        return False
+    try:
+        s3.head_object(Bucket=BUCKET, Key=f"colmap/{item['id']}/sparse/0/points3D.bin")
+    except ClientError:
+        return False
+    return True
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def parse_settings(body: dict, input_type: str):
+    """Settings for a job request with defaults applied; returns (settings, error message)."""
     settings = {
         'iterations': body.get('iterations', DEFAULTS['iterations']),
         'densifyUntilIter': body.get('densifyUntilIter', DEFAULTS['densifyUntilIter']),
-        'densificationInterval': body.get('densificationInterval', DEFAULTS['densificationInterval'])
+        'densificationInterval': body.get('densificationInterval', DEFAULTS['densificationInterval']),
+        'maxGaussians': body.get('maxGaussians', DEFAULTS['maxGaussians']),
+        'sfmMapper': body.get('sfmMapper', DEFAULTS['sfmMapper']),
+        'resumeFrom': body.get('resumeFrom', DEFAULTS['resumeFrom']),
+        'compression': body.get('compression', DEFAULTS['compression']),
+        'chunkedSplat': bool(body.get('chunkedSplat', DEFAULTS['chunkedSplat'])),
+        'pruneMinOpacity': body.get('pruneMinOpacity', DEFAULTS['pruneMinOpacity']),
+        'pruneScaleSigma': body.get('pruneScaleSigma', DEFAULTS['pruneScaleSigma']),
+        'pruneOutliers': bool(body.get('pruneOutliers', DEFAULTS['pruneOutliers']))
     }
+    if not _is_int(settings['iterations']) or settings['iterations'] < 1:
+        return None, 'iterations must be a positive integer'
+    if not _is_int(settings['densifyUntilIter']) or settings['densifyUntilIter'] < 0:
+        return None, 'densifyUntilIter must be a non-negative integer'
+    if not _is_int(settings['densificationInterval']) or settings['densificationInterval'] < 1:
+        return None, 'densificationInterval must be a positive integer'
+    if settings['sfmMapper'] not in SFM_MAPPERS:
+        return None, f"sfmMapper must be one of {', '.join(SFM_MAPPERS)}"
+    if not _is_int(settings['maxGaussians']) or settings['maxGaussians'] < 0:
+        return None, 'maxGaussians must be a non-negative integer (0 = uncapped)'
+    if settings['compression'] not in COMPRESSION_OPTIONS:
+        return None, f"compression must be one of {', '.join(COMPRESSION_OPTIONS)}"
+    if not _is_number(settings['pruneMinOpacity']) or not 0 <= settings['pruneMinOpacity'] < 1:
+        return None, 'pruneMinOpacity must be in [0, 1)'
+    if not _is_number(settings['pruneScaleSigma']) or settings['pruneScaleSigma'] < 0:
+        return None, 'pruneScaleSigma must be >= 0 (0 disables scale pruning)'
+    if settings['resumeFrom'] not in RESUME_OPTIONS:
+        return None, "resumeFrom must be 'latest' or empty"
     if input_type == 'video':
         settings['fps'] = body.get('fps', DEFAULTS['fps'])
-    
-    table = dynamodb.Table(TABLE)
-    table.update_item(
-        Key={'id': scene_id},
-        UpdateExpression='SET #s = :status, settings = :settings',
-        ExpressionAttributeNames={'#s': 'status'},
-        ExpressionAttributeValues={':status': 'processing', ':settings': settings}
-    )
-    
+        settings['maxFrames'] = body.get('maxFrames', DEFAULTS['maxFrames'])
+        if not _is_number(settings['fps']) or settings['fps'] <= 0:
+            return None, 'fps must be a positive number'
+        if not _is_int(settings['maxFrames']) or settings['maxFrames'] < 1:
+            return None, 'maxFrames must be a positive integer'
+    return settings, None
+
+def check_resume(item: dict, settings: dict, colmap_cached: bool):
+    """Error message if resumeFrom is set but the scene cannot resume, else None."""
+    if not settings['resumeFrom']:
+        return None
+    # Resuming trains on the exact same dataset, so the sparse model must be reused
+    if not colmap_cached or 'checkpointStep' not in item:
+        return 'No checkpoint to resume from with these settings'
+    if int(settings['iterations']) <= int(item['checkpointStep']) + 1:
+        return f"iterations must exceed the checkpoint step ({int(item['checkpointStep']) + 1})"
+    return None
+
+def build_sfn_input(scene_id: str, input_type: str, colmap_cached: bool, settings: dict, video_key: str = None) -> dict:
     sfn_input = {
         'sceneId': scene_id,
         'inputType': input_type,
+        'colmapCached': colmap_cached,
         **settings
     }
     if input_type == 'video':
-        sfn_input['videoKey'] = body['videoKey']
-    
+        sfn_input['videoKey'] = video_key
+    return sfn_input
+
+def start_execution(scene_id: str, sfn_input: dict) -> str:
     response = sfn.start_execution(
         stateMachineArn=STATE_MACHINE_ARN,
-        name=f'scene-{scene_id}',
+        # Two starts for one scene can land in the same second
+        name=f'scene-{scene_id}-{int(time.time())}-{uuid.uuid4().hex[:8]}',
         input=json.dumps(sfn_input)
     )
+    return response['executionArn']
+
+def handler(event, context):
+    if event.get('rawPath') == '/jobs/batch':
+        return submit_batch(event)
+    
+    body = json.loads(event.get('body', '{}'))
+    scene_id = body['sceneId']
+    input_type = body.get('inputType', 'video')
+    
+    settings, error = parse_settings(body, input_type)
+    if error:
+        return _error(400, error)
+    
+    table = dynamodb.Table(TABLE)
+    item = table.get_item(Key={'id': scene_id}).get('Item') or {}
+    colmap_cached = colmap_is_cached(item, input_type, settings)
+    error = check_resume(item, settings, colmap_cached)
+    if error:
+        return _error(400, error)
+    
+    # Metrics and progress from the previous run would mix with this one's
+    update = 'SET #s = :status, settings = :settings ADD version :one REMOVE #m, trainingProgress'
+    if not colmap_cached:
+        update += ', colmapCacheKey'
+    table.update_item(
+        Key={'id': scene_id},
+        UpdateExpression=update,
+        ExpressionAttributeNames={'#s': 'status', '#m': 'metrics'},
+        ExpressionAttributeValues={
+            ':status': 'processing',
+            ':one': 1,
+            ':settings': json.loads(json.dumps(settings), parse_float=Decimal)
+        }
+    )
+    
+    video_key = body['videoKey'] if input_type == 'video' else None
+    sfn_input = build_sfn_input(scene_id, input_type, colmap_cached, settings, video_key)
+    execution_arn = start_execution(scene_id, sfn_input)
     
     return {
         'statusCode': 202,
         'headers': {'Content-Type': 'application/json'},
         'body': json.dumps({
             'sceneId': scene_id,
-            'executionArn': response['executionArn'],
+            'executionArn': execution_arn,
             'status': 'processing'
         })
     }
+
+def batch_get_scenes(scene_ids: list) -> dict:
+    """Existing items by id, fetched 100 keys per BatchGetItem."""
+    items = {}
+    for i in range(0, len(scene_ids), 100):
+        request = {TABLE: {'Keys': [{'id': sid} for sid in scene_ids[i:i + 100]]}}
+        for attempt in range(5):
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response['Responses'].get(TABLE, []):
+                items[item['id']] = item
+            request = response.get('UnprocessedKeys')
+            if not request:
+                break
+            time.sleep(0.1 * 2 ** attempt)
+        else:
+            raise RuntimeError('BatchGetItem left unprocessed keys after retries')
+    return items
+
+def prepare_batch_job(body: dict, existing: dict, user_id: str, now: int):
+    """Validate one batch entry; returns (item to write, sfn input, error message)."""
+    scene_id = body['sceneId']
+    input_type = body.get('inputType', 'video')
+    if input_type not in ('video', 'images'):
+        return None, None, "inputType must be 'video' or 'images'"
+    if existing and existing.get('userId') != user_id:
+        return None, None, 'Not authorized'
+    if existing.get('status') in ('processing', 'deleting'):
+        return None, None, f"Scene is already {existing['status']}"
+    
+    settings, error = parse_settings(body, input_type)
+    if error:
+        return None, None, error
+    video_key = body.get('videoKey') or existing.get('videoKey')
+    if input_type == 'video' and not video_key:
+        return None, None, 'videoKey is required for video scenes'
+    
+    colmap_cached = colmap_is_cached(existing, input_type, settings)
+    error = check_resume(existing, settings, colmap_cached)
+    if error:
+        return None, None, error
+    
+    # BatchWriteItem only puts whole items, so carry over what the scene already has
+    item = {
+        **existing,
+        'id': scene_id,
+        'userId': user_id,
+        'name': body.get('name') or existing.get('name', 'Untitled'),
+        'status': 'processing',
+        'processingStage': 'pending',
+        'inputType': input_type,
+        'createdAt': existing.get('createdAt', now),
+        'settings': json.loads(json.dumps(settings), parse_float=Decimal),
+        'version': int(existing.get('version', 0)) + 1
+    }
+    item.pop('error', None)
+    item.pop('metrics', None)
+    item.pop('trainingProgress', None)
+    if not colmap_cached:
+        item.pop('colmapCacheKey', None)
+    if input_type == 'video':
+        item['videoKey'] = video_key
+    
+    return item, build_sfn_input(scene_id, input_type, colmap_cached, settings, video_key), None
+
+def put_if_unchanged(table, item: dict, existing: dict = None):
+    """Write a prepared batch item only if the scene is still as batch_get_scenes read it.
+    
+    Raises ConditionalCheckFailedException if the scene was created, deleted or
+    updated (every user-visible write bumps version) in the meantime.
+    """
+    if not existing:
+        condition, values = 'attribute_not_exists(id)', {}
+    elif 'version' in existing:
+        condition, values = 'version = :read', {':read': existing['version']}
+    else:
+        condition, values = 'attribute_exists(id) AND attribute_not_exists(version)', {}
+    table.put_item(Item=item, ConditionExpression=condition, **({'ExpressionAttributeValues': values} if values else {}))
+
+def mark_failed(table, scene_id: str, message: str):
+    table.update_item(
+        Key={'id': scene_id},
+        UpdateExpression='SET #s = :status, processingStage = :stage, #e = :error ADD version :one',
+        ExpressionAttributeNames={'#s': 'status', '#e': 'error'},
+        ExpressionAttributeValues={':status': 'failed', ':stage': 'failed', ':error': message, ':one': 1}
+    )
+
+def submit_batch(event):
+    """Create or reprocess up to MAX_BATCH_JOBS scenes in one request.
+    
+    Each entry takes the same fields as POST /jobs plus an optional name, and
+    creates the scene if it does not exist. Entries are validated independently
+    and each is written only if its scene has not changed since it was read;
+    the response lists a result per scene and is 207 if any were rejected or
+    failed to start.
+    """
+    body = json.loads(event.get('body') or '{}')
+    user_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
+    jobs = body.get('jobs')
+    if not isinstance(jobs, list) or not jobs:
+        return _error(400, 'jobs must be a non-empty list')
+    if len(jobs) > MAX_BATCH_JOBS:
+        return _error(400, f'At most {MAX_BATCH_JOBS} jobs per batch')
+    scene_ids = [job.get('sceneId') if isinstance(job, dict) else None for job in jobs]
+    if not all(isinstance(sid, str) and sid for sid in scene_ids):
+        return _error(400, 'Every job needs a sceneId')
+    if len(set(scene_ids)) != len(scene_ids):
+        return _error(400, 'Duplicate sceneId in batch')
+    
+    table = dynamodb.Table(TABLE)
+    existing = batch_get_scenes(scene_ids)
+    now = int(time.time())
+    
+    # colmap_is_cached makes an S3 request per scene, so validate concurrently
+    with ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY) as pool:
+        prepared = list(pool.map(
+            lambda job: prepare_batch_job(job, existing.get(job['sceneId'], {}), user_id, now), jobs
+        ))
+    
+    results = {sid: {'sceneId': sid} for sid in scene_ids}
+    accepted = []
+    for sid, (item, sfn_input, error) in zip(scene_ids, prepared):
+        if error:
+            results[sid].update(status='rejected', error=error)
+        else:
+            accepted.append((sid, item, sfn_input))
+    
+    def start(job):
+        sid, item, sfn_input = job
+        try:
+            put_if_unchanged(table, item, existing.get(sid))
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                results[sid].update(status='rejected', error='Scene changed while the batch was submitted; retry')
+            else:
+                results[sid].update(status='failed', error=f"Failed to save: {e.response['Error']['Code']}")
+            return
+        try:
+            results[sid].update(status='processing', executionArn=start_execution(sid, sfn_input))
+        except Exception as e:
+            # The item is already written, so any failure must leave it 'failed' rather than 'processing'
+            code = e.response['Error']['Code'] if isinstance(e, ClientError) else type(e).__name__
+            message = f'Failed to start: {code}'
+            print(f"StartExecution failed for {sid}: {e!r}")
+            results[sid].update(status='failed', error=message)
+            try:
+                mark_failed(table, sid, message)
+            except Exception as mark_error:
+                print(f"Could not mark {sid} failed: {mark_error!r}")
+    
+    # Bounded so a large batch does not exhaust the StartExecution token bucket
+    with ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY) as pool:
+        list(pool.map(start, accepted))
+    
+    started = sum(1 for r in results.values() if r['status'] == 'processing')
+    return {
+        'statusCode': 202 if started == len(jobs) else 207,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({
+            'started': started,
+            'failed': len(jobs) - started,
+            'results': [results[sid] for sid in scene_ids]
+        })
+    }
+
+
+def _error(status, msg):
+    return {
+        'statusCode': status,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({'error': msg})
+    }
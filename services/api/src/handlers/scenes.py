@@ -1,14 +1,81 @@
 import json
+import math
 import os
 import time
+import base64
+import hashlib
+import binascii
 import boto3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
+from botocore.exceptions import ClientError
+from shared.transfer import delete_prefix
 
 dynamodb = boto3.resource('dynamodb')
 s3 = boto3.client('s3')
+lambda_client = boto3.client('lambda')
 table = dynamodb.Table(os.environ['SCENES_TABLE'])
 BUCKET = os.environ.get('ASSETS_BUCKET')
 
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+# Completed scenes only change when reprocessed or deleted, both of which bump
+# version, so a cached body is served only after a projected version read
+# confirms it; gallery pages go stale as new scenes complete and are kept briefly
+SCENE_CACHE_TTL = int(os.environ.get('SCENE_CACHE_TTL', '60'))
+LIST_CACHE_TTL = int(os.environ.get('LIST_CACHE_TTL', '15'))
+CACHE_SIZE = 512
+
+# Scenes with more objects than this are deleted by an async self-invocation
+ASYNC_DELETE_THRESHOLD = int(os.environ.get('ASYNC_DELETE_THRESHOLD', '2000'))
+# A scene still 'deleting' this long after the request (past the async retries
+# of a 120s function) is assumed lost, and another DELETE starts it again
+DELETE_RETRY_SECONDS = int(os.environ.get('DELETE_RETRY_SECONDS', '900'))
+
+# Long-poll /scenes/{id}/events: writers bump the item's version counter, and
+# the request holds until it passes ?since= (API Gateway caps requests at 30s)
+EVENTS_MAX_WAIT = int(os.environ.get('EVENTS_MAX_WAIT', '25'))
+EVENTS_POLL_MIN = 0.5
+EVENTS_POLL_MAX = 4.0
+# /scenes/mine/events watches a whole job list from one request (BatchGetItem's key limit)
+EVENTS_MAX_SCENES = 100
+
+class TTLCache:
+    """Per-instance LRU whose entries expire ttl seconds after they are set."""
+    
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+    
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+    
+    def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def pop(self, key):
+        self._data.pop(key, None)
+    
+    def clear(self):
+        self._data.clear()
+
+scene_cache = TTLCache(CACHE_SIZE, SCENE_CACHE_TTL)
+list_cache = TTLCache(CACHE_SIZE, LIST_CACHE_TTL)
+
 class DecimalEncoder(json.JSONEncoder):
     def default(self, o):
         if isinstance(o, Decimal):
@@ -16,13 +83,20 @@ class DecimalEncoder(json.JSONEncoder):
         return super().default(o)
 
 def handler(event, context):
+    if 'deleteScene' in event:
+        return delete_scene_data(event['deleteScene'])
+    
     method = event['requestContext']['http']['method']
     path = event['rawPath']
     
     if method == 'GET' and path == '/scenes/mine':
         return list_user_scenes(event)
+    elif method == 'GET' and path == '/scenes/mine/events':
+        return my_scene_events(event, context)
     elif method == 'GET' and path == '/scenes':
         return list_scenes(event)
+    elif method == 'GET' and path.startswith('/scenes/') and path.endswith('/events'):
+        return scene_events(event, context)
     elif method == 'GET' and path.startswith('/scenes/'):
         return get_scene(event)
     elif method == 'POST' and path == '/scenes':
@@ -33,41 +107,221 @@ def handler(event, context):
     return {'statusCode': 404, 'body': 'Not found'}
 
 def list_scenes(event):
-    response = table.scan(
-        FilterExpression='#s = :status',
-        ExpressionAttributeNames={'#s': 'status'},
-        ExpressionAttributeValues={':status': 'completed'}
-    )
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json'},
-        'body': json.dumps(response['Items'], cls=DecimalEncoder)
-    }
+    """Completed scenes, newest first, one page at a time."""
+    return query_page(event, {
+        'IndexName': 'status-createdAt-index',
+        'KeyConditionExpression': '#s = :status',
+        'ExpressionAttributeNames': {'#s': 'status'},
+        'ExpressionAttributeValues': {':status': 'completed'}
+    }, cache=list_cache, cache_control=f'public, max-age={LIST_CACHE_TTL}')
 
 def list_user_scenes(event):
+    """The caller's scenes in any status, newest first, one page at a time."""
     user_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
-    response = table.query(
-        IndexName='userId-index',
-        KeyConditionExpression='userId = :uid',
-        ExpressionAttributeValues={':uid': user_id},
-        ScanIndexForward=False
-    )
-    items = sorted(response['Items'], key=lambda x: x.get('createdAt', 0), reverse=True)
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json'},
-        'body': json.dumps(items, cls=DecimalEncoder)
-    }
+    return query_page(event, {
+        'IndexName': 'userId-createdAt-index',
+        'KeyConditionExpression': 'userId = :uid',
+        'ExpressionAttributeValues': {':uid': user_id}
+    })
+
+def query_page(event, query: dict, cache: TTLCache = None, cache_control: str = 'private, no-cache'):
+    """Run one newest-first GSI query page from ?limit=&nextToken= and return {items, nextToken}."""
+    params = event.get('queryStringParameters') or {}
+    try:
+        limit = min(max(int(params.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return _error(400, 'limit must be an integer')
+    cache_key = (limit, params.get('nextToken'))
+    body = cache.get(cache_key) if cache else None
+    if body is not None:
+        return cached_response(event, body, cache_control)
+    query = {**query, 'ScanIndexForward': False, 'Limit': limit}
+    if params.get('nextToken'):
+        try:
+            query['ExclusiveStartKey'] = decode_token(params['nextToken'])
+        except (ValueError, binascii.Error):
+            return _error(400, 'Invalid nextToken')
+    
+    try:
+        response = table.query(**query)
+    except ClientError as e:
+        # A token from another listing or user fails key validation
+        if e.response['Error']['Code'] == 'ValidationException':
+            return _error(400, 'Invalid nextToken')
+        raise
+    last_key = response.get('LastEvaluatedKey')
+    body = json.dumps({
+        'items': response['Items'],
+        'nextToken': encode_token(last_key) if last_key else None
+    }, cls=DecimalEncoder)
+    if cache:
+        cache.set(cache_key, body)
+    return cached_response(event, body, cache_control)
+
+def cached_response(event, body: str, cache_control: str):
+    """200 with an ETag over body, or 304 when it matches If-None-Match."""
+    etag = '"' + hashlib.md5(body.encode(), usedforsecurity=False).hexdigest() + '"'
+    headers = {'Content-Type': 'application/json', 'ETag': etag, 'Cache-Control': cache_control}
+    if_none_match = (event.get('headers') or {}).get('if-none-match', '')
+    if etag in (t.strip() for t in if_none_match.split(',')) or if_none_match.strip() == '*':
+        return {'statusCode': 304, 'headers': headers, 'body': ''}
+    return {'statusCode': 200, 'headers': headers, 'body': body}
+
+def encode_token(key: dict) -> str:
+    """Opaque cursor for a LastEvaluatedKey; numbers must round-trip exactly."""
+    raw = json.dumps(key, default=lambda o: int(o) if o == o.to_integral_value() else str(o))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_token(token: str) -> dict:
+    key = json.loads(base64.urlsafe_b64decode(token.encode()), parse_float=Decimal)
+    if not isinstance(key, dict):
+        raise ValueError('nextToken must encode an object')
+    return key
 
 def get_scene(event):
     scene_id = event['pathParameters']['id']
+    cached = scene_cache.get(scene_id)
+    if cached is not None:
+        # Another instance may have reprocessed or deleted the scene since it was cached
+        response = table.get_item(Key={'id': scene_id}, ProjectionExpression='version')
+        if 'Item' not in response:
+            scene_cache.pop(scene_id)
+            return {'statusCode': 404, 'body': 'Scene not found'}
+        version, body = cached
+        if int(response['Item'].get('version', 0)) == version:
+            return cached_response(event, body, 'no-cache')
+        scene_cache.pop(scene_id)
+    
     response = table.get_item(Key={'id': scene_id})
     if 'Item' not in response:
         return {'statusCode': 404, 'body': 'Scene not found'}
+    item = response['Item']
+    body = json.dumps(item, cls=DecimalEncoder)
+    if item.get('status') == 'completed':
+        scene_cache.set(scene_id, (int(item.get('version', 0)), body))
+    # No scene is immutable, so browsers and CloudFront revalidate every time (cheap with the ETag)
+    return cached_response(event, body, 'no-cache')
+
+def scene_events(event, context):
+    """Wait until the scene's version passes ?since=, then return the full item.
+    
+    Responds with {"changed": false} after ?wait= seconds (max EVENTS_MAX_WAIT)
+    so clients can simply reconnect with the same version.
+    """
+    scene_id = event['pathParameters']['id']
+    params = event.get('queryStringParameters') or {}
+    try:
+        since = int(params.get('since', -1))
+        deadline = events_deadline(params, context)
+    except ValueError:
+        return _error(400, 'since and wait must be numbers')
+    
+    delay = EVENTS_POLL_MIN
+    while True:
+        response = table.get_item(
+            Key={'id': scene_id},
+            ProjectionExpression='version'
+        )
+        if 'Item' not in response:
+            return {'statusCode': 404, 'body': 'Scene not found'}
+        version = int(response['Item'].get('version', 0))
+        if version > since:
+            break
+        if time.time() + delay > deadline:
+            return events_response({'changed': False, 'version': since})
+        time.sleep(delay)
+        delay = min(delay * 2, EVENTS_POLL_MAX)
+    
+    item = table.get_item(Key={'id': scene_id}, ConsistentRead=True).get('Item')
+    if item is None:
+        return {'statusCode': 404, 'body': 'Scene not found'}
+    return events_response({'changed': True, 'version': int(item.get('version', 0)), 'scene': item})
+
+def my_scene_events(event, context):
+    """Long-poll several of the caller's scenes from one request.
+    
+    ?since=id:version,... lists the scenes to watch and ?from= (the oldest
+    one's createdAt) bounds the userId-createdAt-index query that checks their
+    versions, so each poll reads only the small projected index entries.
+    Responds with the watched scenes whose version passed since and the ids
+    that no longer exist, or {"changed": false} after ?wait= seconds.
+    """
+    user_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
+    params = event.get('queryStringParameters') or {}
+    try:
+        since = {}
+        for pair in filter(None, params.get('since', '').split(',')):
+            scene_id, version = pair.rsplit(':', 1)
+            since[scene_id] = int(version)
+        created_from = int(params.get('from', 0))
+        deadline = events_deadline(params, context)
+    except ValueError:
+        return _error(400, 'since must be id:version pairs; from and wait must be numbers')
+    if not since or len(since) > EVENTS_MAX_SCENES:
+        return _error(400, f'since must list 1 to {EVENTS_MAX_SCENES} scenes')
+    
+    delay = EVENTS_POLL_MIN
+    while True:
+        versions = user_scene_versions(user_id, created_from)
+        # A scene missing from the index may be deleted; the consistent read below decides
+        candidates = [sid for sid, version in since.items() if versions.get(sid, version + 1) > version]
+        if candidates:
+            items = get_scenes_consistent(candidates)
+            changed = [item for sid, item in items.items()
+                       if item.get('userId') == user_id and int(item.get('version', 0)) > since[sid]]
+            deleted = [sid for sid in candidates if sid not in items or items[sid].get('userId') != user_id]
+            if changed or deleted:
+                return events_response({'changed': True, 'scenes': changed, 'deleted': deleted})
+        if time.time() + delay > deadline:
+            return events_response({'changed': False, 'scenes': [], 'deleted': []})
+        time.sleep(delay)
+        delay = min(delay * 2, EVENTS_POLL_MAX)
+
+def events_deadline(params: dict, context) -> float:
+    """Absolute deadline for ?wait=, clamped to [0, EVENTS_MAX_WAIT]; ValueError if not a finite number."""
+    wait = float(params.get('wait', EVENTS_MAX_WAIT))
+    if not math.isfinite(wait):
+        raise ValueError('wait must be finite')
+    # Leave headroom to respond before the Lambda itself times out
+    wait = min(max(wait, 0), EVENTS_MAX_WAIT, context.get_remaining_time_in_millis() / 1000 - 2)
+    return time.time() + wait
+
+def user_scene_versions(user_id: str, created_from: int) -> dict:
+    """{id: version} for the user's scenes created at or after created_from."""
+    versions = {}
+    query = {
+        'IndexName': 'userId-createdAt-index',
+        'KeyConditionExpression': 'userId = :uid AND createdAt >= :from',
+        'ProjectionExpression': 'id, version',
+        'ExpressionAttributeValues': {':uid': user_id, ':from': created_from}
+    }
+    while True:
+        response = table.query(**query)
+        for item in response['Items']:
+            versions[item['id']] = int(item.get('version', 0))
+        if 'LastEvaluatedKey' not in response:
+            return versions
+        query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def get_scenes_consistent(scene_ids: list) -> dict:
+    """Current items by id (at most 100), read with BatchGetItem."""
+    items = {}
+    request = {table.name: {'Keys': [{'id': sid} for sid in scene_ids], 'ConsistentRead': True}}
+    for attempt in range(5):
+        response = dynamodb.batch_get_item(RequestItems=request)
+        for item in response['Responses'].get(table.name, []):
+            items[item['id']] = item
+        request = response.get('UnprocessedKeys')
+        if not request:
+            return items
+        time.sleep(0.1 * 2 ** attempt)
+    raise RuntimeError('BatchGetItem left unprocessed keys after retries')
+
+def events_response(body: dict) -> dict:
     return {
         'statusCode': 200,
-        'headers': {'Content-Type': 'application/json'},
-        'body': json.dumps(response['Item'], cls=DecimalEncoder)
+        'headers': {'Content-Type': 'application/json', 'Cache-Control': 'no-store'},
+        'body': json.dumps(body, cls=DecimalEncoder)
     }
 
 def create_scene(event):
@@ -81,6 +335,7 @@ def create_scene(event):
         'name': body.get('name', 'Untitled'),
         'status': 'pending',
         'processingStage': 'pending',
+        'version': 0,
         'inputType': input_type,
         'createdAt': int(time.time())
     }
@@ -108,16 +363,87 @@ def delete_scene(event):
     if scene.get('userId') != user_id:
         return {'statusCode': 403, 'body': 'Not authorized'}
     
-    # Delete S3 objects
-    if BUCKET:
-        prefixes = [f'uploads/{scene_id}/', f'frames/{scene_id}/', f'colmap/{scene_id}/', f'outputs/{scene_id}/']
-        for prefix in prefixes:
-            paginator = s3.get_paginator('list_objects_v2')
-            for page in paginator.paginate(Bucket=BUCKET, Prefix=prefix):
-                for obj in page.get('Contents', []):
-                    s3.delete_object(Bucket=BUCKET, Key=obj['Key'])
-    
-    # Delete DynamoDB record
-    table.delete_item(Key={'id': scene_id})
+    if scene.get('status') == 'deleting':
+        if time.time() - int(scene.get('deleteRequestedAt', 0)) < DELETE_RETRY_SECONDS:
+            return deleting_response(scene_id)
+        print(f"Retrying stalled delete of scene {scene_id}")
+        return start_async_delete(scene_id)
     
+    if BUCKET and count_scene_objects(scene_id, ASYNC_DELETE_THRESHOLD) > ASYNC_DELETE_THRESHOLD:
+        return start_async_delete(scene_id)
+    
+    delete_scene_data(scene_id)
     return {'statusCode': 204, 'body': ''}
+
+def start_async_delete(scene_id: str) -> dict:
+    """Mark the scene 'deleting' and hand its deletion to an async self-invocation."""
+    table.update_item(
+        Key={'id': scene_id},
+        UpdateExpression='SET #s = :status, deleteRequestedAt = :now ADD version :one',
+        ExpressionAttributeNames={'#s': 'status'},
+        ExpressionAttributeValues={':status': 'deleting', ':now': int(time.time()), ':one': 1}
+    )
+    scene_cache.pop(scene_id)
+    list_cache.clear()
+    try:
+        lambda_client.invoke(
+            FunctionName=os.environ['AWS_LAMBDA_FUNCTION_NAME'],
+            InvocationType='Event',
+            Payload=json.dumps({'deleteScene': scene_id})
+        )
+    except ClientError:
+        # Let the next DELETE retry straight away instead of waiting out DELETE_RETRY_SECONDS
+        table.update_item(
+            Key={'id': scene_id},
+            UpdateExpression='SET deleteRequestedAt = :zero',
+            ExpressionAttributeValues={':zero': 0}
+        )
+        raise
+    return deleting_response(scene_id)
+
+def deleting_response(scene_id: str) -> dict:
+    return {
+        'statusCode': 202,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({'sceneId': scene_id, 'status': 'deleting'})
+    }
+
+def scene_prefixes(scene_id: str) -> list:
+    return [f'uploads/{scene_id}/', f'frames/{scene_id}/', f'colmap/{scene_id}/', f'outputs/{scene_id}/']
+
+def count_scene_objects(scene_id: str, limit: int) -> int:
+    """Count objects under the scene prefixes; each prefix stops listing once it passes limit."""
+    def count(prefix):
+        total = 0
+        paginator = s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=BUCKET, Prefix=prefix):
+            total += page.get('KeyCount', 0)
+            if total > limit:
+                break
+        return total
+    
+    prefixes = scene_prefixes(scene_id)
+    with ThreadPoolExecutor(max_workers=len(prefixes)) as pool:
+        return sum(pool.map(count, prefixes))
+
+def delete_scene_data(scene_id: str) -> dict:
+    """Delete the scene's S3 prefixes concurrently, then its DynamoDB record."""
+    deleted = 0
+    if BUCKET:
+        prefixes = scene_prefixes(scene_id)
+        with ThreadPoolExecutor(max_workers=len(prefixes)) as pool:
+            deleted = sum(pool.map(lambda prefix: delete_prefix(BUCKET, prefix, s3=s3), prefixes))
+    
+    table.delete_item(Key={'id': scene_id})
+    scene_cache.pop(scene_id)
+    list_cache.clear()
+    print(f"Deleted scene {scene_id} and {deleted} objects")
+    return {'sceneId': scene_id, 'deletedObjects': deleted}
+
+
+def _error(status, msg):
+    return {
+        'statusCode': status,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({'error': msg})
+    }
@@ -0,0 +1,172 @@
+import os
+import json
+import math
+import struct
+import boto3
+from decimal import Decimal
+from shared.helpers import emit_metric
+from shared.transfer import make_client, list_keys
+
+s3 = make_client()
+dynamodb = boto3.resource('dynamodb')
+BUCKET = os.environ['ASSETS_BUCKET']
+TABLE = os.environ.get('SCENES_TABLE')
+
+GPU_QUEUE = os.environ['GPU_QUEUE']        # g6e (L40S 48GB) for standard/large training
+FAST_QUEUE = os.environ['FAST_QUEUE']      # high-priority lane on the small GPU tier
+COLMAP_QUEUE = os.environ['COLMAP_QUEUE']  # small GPU tier (L4 24GB); overflows to g6e
+
+# Scenes at or below both limits skip the standard queue entirely
+FAST_LANE_MAX_FRAMES = int(os.environ.get('FAST_LANE_MAX_FRAMES', '80'))
+FAST_LANE_MAX_MINUTES = float(os.environ.get('FAST_LANE_MAX_MINUTES', '15'))
+# Above either limit training moves to g6e.4xlarge for the extra host memory and vCPUs
+LARGE_MIN_FRAMES = int(os.environ.get('LARGE_MIN_FRAMES', '400'))
+LARGE_MIN_MEMORY_MIB = 28 * 1024
+COLMAP_LARGE_MIN_FRAMES = 300
+
+# Set from the same Terraform locals as the containers: gsplat halves images to
+# <= TARGET_MAX_DIM, COLMAP resizes to SIFT_MAX_DIM, and the matcher is picked by image count
+TARGET_MAX_DIM = int(os.environ['TARGET_MAX_DIM'])
+SIFT_MAX_DIM = int(os.environ['SIFT_MAX_DIM'])
+EXHAUSTIVE_MAX_IMAGES = int(os.environ['EXHAUSTIVE_MAX_IMAGES'])
+SEQUENTIAL_OVERLAP = int(os.environ['SEQUENTIAL_OVERLAP'])
+VOCAB_TREE_NEIGHBORS = 100
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png')
+
+# Rough per-unit timings; they only need to rank scenes, not predict wall time
+SIFT_SECONDS_PER_MP = 0.05
+MATCH_SECONDS_PER_PAIR = 0.01
+MAPPER_SECONDS = {'incremental': 0.05, 'global': 0.01}  # x frames^1.5
+TRAIN_SECONDS_PER_ITER = 0.01
+TRAIN_SECONDS_PER_ITER_MP = 0.03
+HOST_BASE_MIB = 6 * 1024
+HOST_BYTES_PER_PIXEL = 6  # uint8 RGB image cache plus dataloader copies
+
+# (vCPUs, memory MiB, instance it lands on); memory leaves room for the ECS agent
+SIZES = {
+    'small': (4, 14 * 1024, 'g6.xlarge'),
+    'medium': (8, 28 * 1024, 'g6.2xlarge'),
+    'standard': (8, 32 * 1024, 'g6e.2xlarge'),
+    'large': (16, 112 * 1024, 'g6e.4xlarge'),
+}
+# us-east-1 on-demand list prices; Spot is usually well under these
+HOURLY_USD = {'g6.xlarge': 0.805, 'g6.2xlarge': 0.978, 'g6e.2xlarge': 2.242, 'g6e.4xlarge': 3.004}
+
+def handler(event, context):
+    scene_id = event['sceneId']
+    frames, width, height = probe_frames(scene_id)
+    schedule = plan(
+        frames, width, height,
+        iterations=int(event.get('iterations', 7000)),
+        input_type=event.get('inputType', 'video'),
+        sfm_mapper=event.get('sfmMapper', 'incremental'),
+    )
+    print(f"Scheduled {scene_id}: {json.dumps(schedule['estimate'])}")
+
+    emit_metric('EstimatedCostUsd', schedule['estimate']['costUsd'], Stage='schedule', Tier=schedule['tier'])
+    if TABLE:
+        dynamodb.Table(TABLE).update_item(
+            Key={'id': scene_id},
+            UpdateExpression='SET schedule = :schedule',
+            ExpressionAttributeValues={
+                ':schedule': json.loads(json.dumps({'tier': schedule['tier'], **schedule['estimate']}), parse_float=Decimal)
+            }
+        )
+    return schedule
+
+def probe_frames(scene_id: str):
+    """Frame count and the first frame's dimensions (from its header only)."""
+    keys = [key for key, _ in list_keys(BUCKET, f'frames/{scene_id}/', s3)
+            if key.lower().endswith(IMAGE_SUFFIXES)]
+    if not keys:
+        raise ValueError(f'No frames found for scene {scene_id}')
+    head = s3.get_object(Bucket=BUCKET, Key=sorted(keys)[0], Range='bytes=0-65535')['Body'].read()
+    width, height = image_size(head)
+    return len(keys), width, height
+
+def image_size(data: bytes):
+    """(width, height) from a PNG IHDR or JPEG SOF header."""
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return struct.unpack('>II', data[16:24])
+    if data[:2] != b'\xff\xd8':
+        raise ValueError('Unsupported image format')
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            pos += 1
+            continue
+        marker = data[pos + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+            pos += 1 if marker == 0xFF else 2
+            continue
+        length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+        # SOF0-15, excluding DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+            return width, height
+        pos += 2 + length
+    raise ValueError('JPEG frame header not found in the first 64KB')
+
+def downscale(width: int, height: int, max_dim: int) -> float:
+    """Megapixels after halving until the long side is <= max_dim."""
+    factor = 1
+    while max(width, height) / factor > max_dim:
+        factor *= 2
+    return (width / factor) * (height / factor) / 1e6
+
+def match_pairs(frames: int, input_type: str) -> int:
+    if input_type == 'video':
+        return frames * SEQUENTIAL_OVERLAP
+    if frames <= EXHAUSTIVE_MAX_IMAGES:
+        return frames * (frames - 1) // 2
+    return frames * VOCAB_TREE_NEIGHBORS
+
+def resources(size: str) -> list:
+    vcpus, memory, _ = SIZES[size]
+    return [
+        {'Type': 'VCPU', 'Value': str(vcpus)},
+        {'Type': 'MEMORY', 'Value': str(memory)},
+        {'Type': 'GPU', 'Value': '1'},
+    ]
+
+def plan(frames: int, width: int, height: int, iterations: int, input_type: str, sfm_mapper: str) -> dict:
+    """Pick a queue and container size for COLMAP and training from the scene's size."""
+    sift_mp = width * height * min(1.0, SIFT_MAX_DIM / max(width, height)) ** 2 / 1e6
+    train_mp = downscale(width, height, TARGET_MAX_DIM)
+
+    colmap_seconds = (frames * sift_mp * SIFT_SECONDS_PER_MP
+                      + match_pairs(frames, input_type) * MATCH_SECONDS_PER_PAIR
+                      + MAPPER_SECONDS.get(sfm_mapper, MAPPER_SECONDS['incremental']) * frames ** 1.5)
+    train_seconds = iterations * (TRAIN_SECONDS_PER_ITER + TRAIN_SECONDS_PER_ITER_MP * train_mp)
+    host_mib = HOST_BASE_MIB + frames * train_mp * 1e6 * HOST_BYTES_PER_PIXEL / 2 ** 20
+
+    if frames <= FAST_LANE_MAX_FRAMES and train_seconds / 60 <= FAST_LANE_MAX_MINUTES and host_mib <= SIZES['small'][1]:
+        tier = 'fast'
+        colmap_queue, colmap_size = FAST_QUEUE, 'small'
+        train_queue, train_size = FAST_QUEUE, 'small'
+    else:
+        large = frames >= LARGE_MIN_FRAMES or host_mib > LARGE_MIN_MEMORY_MIB
+        tier = 'large' if large else 'standard'
+        colmap_queue = COLMAP_QUEUE
+        colmap_size = 'medium' if frames >= COLMAP_LARGE_MIN_FRAMES else 'small'
+        train_queue, train_size = GPU_QUEUE, tier
+
+    cost = (colmap_seconds * HOURLY_USD[SIZES[colmap_size][2]]
+            + train_seconds * HOURLY_USD[SIZES[train_size][2]]) / 3600
+    return {
+        'tier': tier,
+        'colmap': {'jobQueue': colmap_queue, 'resourceRequirements': resources(colmap_size)},
+        'training': {'jobQueue': train_queue, 'resourceRequirements': resources(train_size)},
+        'estimate': {
+            'frames': frames,
+            'width': width,
+            'height': height,
+            'trainingMegapixels': round(train_mp, 2),
+            'colmapMinutes': round(colmap_seconds / 60, 1),
+            'trainingMinutes': round(train_seconds / 60, 1),
+            'hostMemoryMiB': math.ceil(host_mib),
+            'colmapInstance': SIZES[colmap_size][2],
+            'trainingInstance': SIZES[train_size][2],
+            'costUsd': round(cost, 3),
+        },
+    }
@@ -11,8 +11,8 @@ def handler(event, context):
     table = dynamodb.Table(TABLE)
     table.update_item(
         Key={'id': scene_id},
-        UpdateExpression='SET processingStage = :stage',
-        ExpressionAttributeValues={':stage': stage}
+        UpdateExpression='SET processingStage = :stage ADD version :one',
+        ExpressionAttributeValues={':stage': stage, ':one': 1}
     )
     
     return event
@@ -1,14 +1,52 @@
 import json
+import math
 import os
+import re
 import uuid
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 
-s3 = boto3.client('s3')
+# SigV4 signs the content-length header, so S3 rejects any body of another size
+s3 = boto3.client(
+    's3',
+    region_name=os.environ.get('AWS_REGION'),
+    config=Config(signature_version='s3v4', s3={'addressing_style': 'virtual'})
+)
 BUCKET = os.environ['ASSETS_BUCKET']
 MAX_IMAGE_SIZE = 50 * 1024 * 1024  # 50MB
+URL_EXPIRY = 3600
+
+MB = 1024 * 1024
+# What extract_frames can download and decode within its 15-minute timeout
+MAX_VIDEO_SIZE = 2 * 1024 * MB
+# Videos above this are uploaded as parts so a dropped connection only loses one part
+MULTIPART_THRESHOLD = 64 * MB
+MIN_PART_SIZE = 16 * MB
+MAX_PARTS = 10000  # S3 limit
+
+UPLOAD_KEY_RE = re.compile(r'^uploads/[0-9a-f-]{36}/[^/]+$')
+# Written beside a multipart upload when it starts: the owner and declared
+# size that /upload/parts, /complete and /abort check against
+UPLOAD_RECORD = '.multipart.json'
 
 def handler(event, context):
-    body = json.loads(event.get('body', '{}'))
+    path = event.get('rawPath', '/upload')
+    user_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
+    try:
+        body = json.loads(event.get('body') or '{}')
+    except json.JSONDecodeError:
+        return _error(400, 'Invalid JSON body')
+
+    if path == '/upload/parts':
+        return list_parts(body, user_id)
+    if path == '/upload/complete':
+        return complete_upload(body, user_id)
+    if path == '/upload/abort':
+        return abort_upload(body, user_id)
+    return create_upload(body, user_id)
+
+def create_upload(body, user_id: str):
     input_type = body.get('inputType', 'video')
     scene_id = str(uuid.uuid4())
 
@@ -16,7 +54,14 @@ def handler(event, context):
         files = body.get('files', [])
         if not files:
             return _error(400, 'No files provided')
+        for f in files:
+            size = f.get('size')
+            if not isinstance(size, int) or size <= 0:
+                return _error(400, f"size is required for {f.get('filename')}")
+            if size > MAX_IMAGE_SIZE:
+                return _error(400, f"{f['filename']} exceeds the {MAX_IMAGE_SIZE // MB}MB image limit")
 
+        # Presigning is local HMAC work with no round trips, so one pass is enough
         uploads = []
         for f in files:
             key = f"frames/{scene_id}/{f['filename']}"
@@ -25,27 +70,181 @@ def handler(event, context):
                 Params={
                     'Bucket': BUCKET,
                     'Key': key,
-                    'ContentType': f.get('contentType', 'image/jpeg')
+                    'ContentType': f.get('contentType', 'image/jpeg'),
+                    'ContentLength': f['size']
                 },
-                ExpiresIn=3600
+                ExpiresIn=URL_EXPIRY
             )
             uploads.append({'filename': f['filename'], 'uploadUrl': url, 'key': key})
 
         return _json(200, {'sceneId': scene_id, 'uploads': uploads})
 
     # Default: single video upload
-    filename = body.get('filename', 'video.mp4')
+    filename = os.path.basename(body.get('filename', 'video.mp4'))
+    if filename == UPLOAD_RECORD:
+        filename = 'video.mp4'
     content_type = body.get('contentType', 'video/mp4')
+    size = body.get('size')
     key = f"uploads/{scene_id}/{filename}"
 
+    # Every URL is signed for this exact length, so the limit cannot be bypassed
+    if not isinstance(size, int) or size <= 0:
+        return _error(400, 'size is required')
+    if size > MAX_VIDEO_SIZE:
+        return _error(400, f'Video exceeds the {MAX_VIDEO_SIZE // (1024 * MB)}GB limit')
+
+    if size > MULTIPART_THRESHOLD:
+        upload = s3.create_multipart_upload(Bucket=BUCKET, Key=key, ContentType=content_type)
+        s3.put_object(
+            Bucket=BUCKET,
+            Key=record_key(key),
+            Body=json.dumps({'userId': user_id, 'uploadId': upload['UploadId'], 'size': size}),
+            ContentType='application/json'
+        )
+        part_size = choose_part_size(size)
+        return _json(200, {
+            'sceneId': scene_id,
+            'key': key,
+            'uploadId': upload['UploadId'],
+            'partSize': part_size,
+            'parts': sign_parts(key, upload['UploadId'], size, part_size)
+        })
+
     presigned = s3.generate_presigned_url(
         'put_object',
-        Params={'Bucket': BUCKET, 'Key': key, 'ContentType': content_type},
-        ExpiresIn=3600
+        Params={'Bucket': BUCKET, 'Key': key, 'ContentType': content_type, 'ContentLength': size},
+        ExpiresIn=URL_EXPIRY
     )
 
     return _json(200, {'sceneId': scene_id, 'uploadUrl': presigned, 'key': key})
 
+def choose_part_size(size: int) -> int:
+    """Smallest whole-MB part size >= MIN_PART_SIZE that fits within MAX_PARTS."""
+    return max(MIN_PART_SIZE, math.ceil(size / MAX_PARTS / MB) * MB)
+
+def part_count(size: int, part_size: int) -> int:
+    return max(1, math.ceil(size / part_size))
+
+def sign_parts(key: str, upload_id: str, size: int, part_size: int, part_numbers=None) -> list:
+    """Presigned upload_part URLs, each bound to that part's exact length."""
+    count = part_count(size, part_size)
+    parts = []
+    for number in part_numbers or range(1, count + 1):
+        length = min(part_size, size - (number - 1) * part_size)
+        url = s3.generate_presigned_url(
+            'upload_part',
+            Params={
+                'Bucket': BUCKET,
+                'Key': key,
+                'UploadId': upload_id,
+                'PartNumber': number,
+                'ContentLength': length
+            },
+            ExpiresIn=URL_EXPIRY
+        )
+        parts.append({'partNumber': number, 'url': url})
+    return parts
+
+def uploaded_parts(key: str, upload_id: str) -> list:
+    parts = []
+    paginator = s3.get_paginator('list_parts')
+    for page in paginator.paginate(Bucket=BUCKET, Key=key, UploadId=upload_id):
+        for part in page.get('Parts', []):
+            parts.append({'partNumber': part['PartNumber'], 'etag': part['ETag'], 'size': part['Size']})
+    return parts
+
+def record_key(key: str) -> str:
+    return f'{os.path.dirname(key)}/{UPLOAD_RECORD}'
+
+def _multipart_request(body, user_id: str):
+    """Validate {key, uploadId} against the caller's upload record.
+    
+    Returns (key, upload_id, record, error response).
+    """
+    key = body.get('key', '')
+    upload_id = body.get('uploadId', '')
+    if not UPLOAD_KEY_RE.match(key) or not upload_id or key == record_key(key):
+        return key, upload_id, None, _error(400, 'key and uploadId are required')
+    try:
+        record = json.loads(s3.get_object(Bucket=BUCKET, Key=record_key(key))['Body'].read())
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return key, upload_id, None, _error(404, 'Upload not found')
+        raise
+    # Reported as not found so other users' upload ids cannot be probed
+    if record.get('userId') != user_id or record.get('uploadId') != upload_id:
+        return key, upload_id, None, _error(404, 'Upload not found')
+    return key, upload_id, record, None
+
+def list_parts(body, user_id: str):
+    """Resume an interrupted upload: report finished parts and re-sign the rest.
+    
+    Parts are re-signed for the size declared when the upload was created, not
+    one sent with the resume request.
+    """
+    key, upload_id, record, error = _multipart_request(body, user_id)
+    if error:
+        return error
+    size = int(record['size'])
+
+    try:
+        done = uploaded_parts(key, upload_id)
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'NoSuchUpload':
+            return _error(404, 'Upload not found')
+        raise
+
+    part_size = choose_part_size(size)
+    finished = {p['partNumber'] for p in done}
+    missing = [n for n in range(1, part_count(size, part_size) + 1) if n not in finished]
+    return _json(200, {
+        'key': key,
+        'uploadId': upload_id,
+        'partSize': part_size,
+        'uploaded': done,
+        'parts': sign_parts(key, upload_id, size, part_size, missing) if missing else []
+    })
+
+def complete_upload(body, user_id: str):
+    key, upload_id, _, error = _multipart_request(body, user_id)
+    if error:
+        return error
+
+    try:
+        # Client ETags are optional; S3's own list is authoritative after a resume
+        parts = body.get('parts') or uploaded_parts(key, upload_id)
+        if not parts:
+            return _error(400, 'No parts uploaded')
+        s3.complete_multipart_upload(
+            Bucket=BUCKET,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': [
+                {'PartNumber': int(p['partNumber']), 'ETag': p['etag']}
+                for p in sorted(parts, key=lambda p: int(p['partNumber']))
+            ]}
+        )
+    except ClientError as e:
+        code = e.response['Error']['Code']
+        if code in ('NoSuchUpload', 'InvalidPart', 'InvalidPartOrder', 'EntityTooSmall'):
+            return _error(400, f'Cannot complete upload: {code}')
+        raise
+
+    s3.delete_object(Bucket=BUCKET, Key=record_key(key))
+    return _json(200, {'key': key})
+
+def abort_upload(body, user_id: str):
+    key, upload_id, _, error = _multipart_request(body, user_id)
+    if error:
+        return error
+    try:
+        s3.abort_multipart_upload(Bucket=BUCKET, Key=key, UploadId=upload_id)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'NoSuchUpload':
+            raise
+    s3.delete_object(Bucket=BUCKET, Key=record_key(key))
+    return {'statusCode': 204, 'body': ''}
+
 
 def _json(status, body):
     return {
@@ -0,0 +1,11 @@
+import os
+import sys
+
+# Lambdas import their module-level clients and settings at import time
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-west-2')
+os.environ.setdefault('ASSETS_BUCKET', 'test-assets')
+os.environ.setdefault('SCENES_TABLE', 'test-scenes')
+
+SRC = os.path.join(os.path.dirname(__file__), '..', 'src')
+# Handlers are deployed as single files next to the shared layer package
+sys.path[:0] = [os.path.join(SRC, 'handlers'), SRC]
@@ -0,0 +1,179 @@
+import shutil
+import struct
+import numpy as np
+import pytest
+import convert
+
+PLY_FIELDS = (
+    ['x', 'y', 'z', 'nx', 'ny', 'nz', 'f_dc_0', 'f_dc_1', 'f_dc_2']
+    + [f'f_rest_{i}' for i in range(45)]
+    + ['opacity', 'scale_0', 'scale_1', 'scale_2', 'rot_0', 'rot_1', 'rot_2', 'rot_3']
+)
+
+def make_gaussians(count: int, seed: int = 0) -> np.ndarray:
+    """Random vertices in the layout 3DGS training writes."""
+    rng = np.random.default_rng(seed)
+    vertex = np.zeros(count, dtype=[(name, '<f4') for name in PLY_FIELDS])
+    for name in ('x', 'y', 'z'):
+        vertex[name] = rng.normal(0, 5, count)
+    for i in range(3):
+        vertex[f'scale_{i}'] = rng.normal(-4, 1.5, count)
+        vertex[f'f_dc_{i}'] = rng.normal(0, 1, count)
+    for i in range(4):
+        vertex[f'rot_{i}'] = rng.normal(0, 1, count)
+    for i in range(45):
+        vertex[f'f_rest_{i}'] = rng.normal(0, 0.1, count)
+    vertex['opacity'] = rng.normal(0, 3, count)
+    return vertex
+
+def write_ply(path, vertex: np.ndarray):
+    header = ['ply', 'format binary_little_endian 1.0', f'element vertex {len(vertex)}']
+    header += [f'property float {name}' for name in vertex.dtype.names]
+    header.append('end_header')
+    with open(path, 'wb') as f:
+        f.write(('\n'.join(header) + '\n').encode('ascii'))
+        vertex.tofile(f)
+
+def scalar_splat(vertex: np.ndarray) -> bytes:
+    """The original per-row struct.pack encoder, kept as the parity reference."""
+    positions = np.stack([vertex['x'], vertex['y'], vertex['z']], axis=-1)
+    scales = np.stack([vertex['scale_0'], vertex['scale_1'], vertex['scale_2']], axis=-1)
+    rotations = np.stack([vertex['rot_0'], vertex['rot_1'], vertex['rot_2'], vertex['rot_3']], axis=-1)
+    opacity = vertex['opacity']
+    sh_dc = np.stack([vertex['f_dc_0'], vertex['f_dc_1'], vertex['f_dc_2']], axis=-1)
+
+    scales_sum = np.exp(scales).sum(axis=-1)
+    sort_indices = np.argsort(-scales_sum)
+
+    out = bytearray()
+    for idx in sort_indices:
+        out += struct.pack('fff', *positions[idx])
+        out += struct.pack('fff', *np.exp(scales[idx]))
+        color = (sh_dc[idx] * 0.28209479177387814 + 0.5).clip(0, 1)
+        alpha = 1 / (1 + np.exp(-opacity[idx]))
+        out += struct.pack('BBBB', int(color[0]*255), int(color[1]*255), int(color[2]*255), int(alpha*255))
+        rot = rotations[idx] / np.linalg.norm(rotations[idx])
+        out += struct.pack('BBBB', *[int((r*0.5+0.5)*255) for r in rot])
+    return bytes(out)
+
+@pytest.mark.parametrize('count', [0, 1, 257, 5000])
+def test_splat_matches_scalar_encoder(tmp_path, count):
+    vertex = make_gaussians(count)
+    write_ply(tmp_path / 'in.ply', vertex)
+
+    written = convert.convert_ply_to_splat(str(tmp_path / 'in.ply'), str(tmp_path / 'out.splat'))
+
+    assert written == count
+    assert (tmp_path / 'out.splat').read_bytes() == scalar_splat(vertex)
+
+def test_splat_parity_across_encode_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(convert, 'CHUNK_SIZE', 64)
+    vertex = make_gaussians(1000, seed=1)
+    write_ply(tmp_path / 'in.ply', vertex)
+
+    convert.convert_ply_to_splat(str(tmp_path / 'in.ply'), str(tmp_path / 'out.splat'))
+
+    assert (tmp_path / 'out.splat').read_bytes() == scalar_splat(vertex)
+
+def morton_sorted(vertex: np.ndarray) -> np.ndarray:
+    positions = np.stack([vertex[n] for n in ('x', 'y', 'z')], axis=-1)
+    return vertex[convert.morton_order(positions)]
+
+@pytest.mark.parametrize('include_sh', [False, True])
+def test_splatc_round_trip_within_quantization_error(tmp_path, include_sh):
+    vertex = make_gaussians(3000, seed=2)
+    write_ply(tmp_path / 'in.ply', vertex)
+
+    count = convert.write_compressed_splat(str(tmp_path / 'in.ply'), str(tmp_path / 'out.splatc'), include_sh)
+    decoded = convert.read_compressed_splat(str(tmp_path / 'out.splatc'))
+    expected = morton_sorted(vertex)
+
+    assert count == len(vertex)
+
+    # Positions: half a uint16 step of their chunk's extent on each axis
+    positions = np.stack([expected[n] for n in ('x', 'y', 'z')], axis=-1).astype(np.float64)
+    chunk_of = np.arange(count) // convert.SPLATC_CHUNK
+    starts = np.arange(0, count, convert.SPLATC_CHUNK)
+    extent = (np.maximum.reduceat(positions, starts) - np.minimum.reduceat(positions, starts))[chunk_of]
+    assert np.all(np.abs(decoded['positions'] - positions) <= extent / 65535 / 2 + 1e-5)
+
+    # Log-scales: half a uint8 step of the scene-wide range
+    scales = np.stack([expected[f'scale_{i}'] for i in range(3)], axis=-1).astype(np.float64)
+    step = (scales.max() - scales.min()) / 255
+    assert np.all(np.abs(decoded['scales'] - scales) <= step / 2 + 1e-5)
+
+    # Rotations: q and -q are the same rotation; 10-bit components are within ~1e-3
+    rotations = np.stack([expected[f'rot_{i}'] for i in range(4)], axis=-1).astype(np.float64)
+    rotations /= np.linalg.norm(rotations, axis=-1, keepdims=True)
+    sign = np.sign((decoded['rotations'] * rotations).sum(axis=-1, keepdims=True))
+    assert np.all(np.abs(decoded['rotations'] * sign - rotations) <= 2e-3)
+    assert np.all(np.abs(np.linalg.norm(decoded['rotations'], axis=-1) - 1) <= 1e-3)
+
+    # Colour and opacity: rounded to the nearest uint8
+    sh_dc = np.stack([expected[f'f_dc_{i}'] for i in range(3)], axis=-1).astype(np.float64)
+    rgb = (sh_dc * 0.28209479177387814 + 0.5).clip(0, 1) * 255
+    alpha = 1 / (1 + np.exp(-expected['opacity'].astype(np.float64))) * 255
+    assert np.all(np.abs(decoded['rgba'][:, :3] - rgb) <= 0.5 + 1e-3)
+    assert np.all(np.abs(decoded['rgba'][:, 3] - alpha) <= 0.5 + 1e-3)
+
+    if include_sh:
+        sh = np.stack([expected[f'f_rest_{i}'] for i in range(45)], axis=-1).astype(np.float64)
+        step = (sh.max() - sh.min()) / 255
+        assert decoded['sh_rest'].shape == sh.shape
+        assert np.all(np.abs(decoded['sh_rest'] - sh) <= step / 2 + 1e-5)
+    else:
+        assert 'sh_rest' not in decoded
+
+def test_splatc_is_about_half_the_size_of_splat(tmp_path):
+    vertex = make_gaussians(20000, seed=3)
+    write_ply(tmp_path / 'in.ply', vertex)
+
+    convert.convert_ply_to_splat(str(tmp_path / 'in.ply'), str(tmp_path / 'out.splat'))
+    convert.write_compressed_splat(str(tmp_path / 'in.ply'), str(tmp_path / 'out.splatc'))
+
+    # 17 bytes per Gaussian before gzip, against 32 for .splat
+    ratio = (tmp_path / 'out.splat').stat().st_size / (tmp_path / 'out.splatc').stat().st_size
+    assert ratio >= 1.8
+
+def test_prune_ply_can_remove_every_gaussian(tmp_path):
+    vertex = make_gaussians(100)
+    vertex['opacity'] = -10
+    write_ply(tmp_path / 'in.ply', vertex)
+
+    stats = convert.prune_ply(str(tmp_path / 'in.ply'), str(tmp_path / 'out.ply'), min_opacity=0.5, scale_sigma=2)
+
+    assert stats['before'] == 100 and stats['after'] == 0
+    assert len(convert.read_ply_vertices(str(tmp_path / 'out.ply'))) == 0
+
+def test_handler_fails_clearly_when_pruning_leaves_nothing(tmp_path, monkeypatch):
+    vertex = make_gaussians(100)
+    vertex['opacity'] = -10
+    write_ply(tmp_path / 'in.ply', vertex)
+
+    class FakeS3:
+        def download_file(self, bucket, key, path):
+            shutil.copy(tmp_path / 'in.ply', path)
+
+    monkeypatch.setattr(convert, 's3', FakeS3())
+    monkeypatch.setattr(convert, 'TABLE', None)
+    monkeypatch.setattr(convert, 'update_processing_stage', lambda *args: None)
+
+    with pytest.raises(ValueError, match='Pruning removed all 100 Gaussians'):
+        convert.handler({'sceneId': 'scene', 'pruneMinOpacity': 0.5}, None)
+
+def test_lod_levels_are_prefixes_of_one_importance_ordered_file(tmp_path):
+    vertex = make_gaussians(1000, seed=4)
+    write_ply(tmp_path / 'in.ply', vertex)
+
+    counts = convert.write_splat_lods(str(tmp_path / 'in.ply'), str(tmp_path / 'lod.splat'), (10, 30, 100))
+    coarse = convert.write_splat_lods(str(tmp_path / 'in.ply'), str(tmp_path / 'lod10.splat'), (10,))
+
+    assert counts == [100, 300, 1000]
+    data = (tmp_path / 'lod.splat').read_bytes()
+    assert len(data) == 1000 * convert.SPLAT_DTYPE.itemsize
+    assert (tmp_path / 'lod10.splat').read_bytes() == data[:coarse[0] * convert.SPLAT_DTYPE.itemsize]
+    # Most important first: sigmoid(opacity) x volume never increases along the file
+    order = convert.importance_order(vertex)
+    importance = (np.exp(sum(vertex[f'scale_{i}'].astype(np.float64) for i in range(3)))
+                  / (1 + np.exp(-vertex['opacity'].astype(np.float64))))[order]
+    assert np.all(np.diff(importance) <= 1e-6 * importance[:-1])